@@ -1,11 +1,28 @@
+import hashlib
 import os
 import time
+import logging
 import subprocess
 import shlex
 import string
-from flask import Flask, request, jsonify, send_from_directory, redirect, Response
+from flask import Flask, request, jsonify, redirect, Response, g
 
+from probe_responder import CaptiveProbeResponder
+from server import ServerConfig, serve
+from static_cache import StaticAssetCache
+import service
 from service import FanService, WiFiService
+from service.client_state import ClientStateTable
+from service.connectivity_monitor import ConnectivityMonitor
+from service.hostapd_config import HostapdConfig
+from service.instrumentation import observe_request, registry, timed_command
+from service.event_hub import EventHub, format_sse
+from service.job_manager import JobManager
+from service.metrics_sampler import MetricsSampler
+from service.net_inspect import inspect_interface
+from service.probe_executor import ProbeExecutor
+from service.registry import ServiceRegistry
+from service.service_watcher import ServiceStateWatcher
 from service.system_monitor import SystemMonitor
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -13,19 +30,168 @@ FRONTEND_DIR = os.path.abspath(os.path.join(BASE_DIR, "..", "frontend"))
 AP_IFACE = "p2p0"     
 CLIENT_IFACE = "wlan0"   
 
-app = Flask(__name__, static_folder=None)
+logger = logging.getLogger(__name__)
 
-# Initialize services
-fan_service = FanService()
-wifi_service = WiFiService(client_iface=CLIENT_IFACE, ap_iface=AP_IFACE)
-system_monitor = SystemMonitor()
+app = Flask(__name__, static_folder=None)
+static_cache = StaticAssetCache(FRONTEND_DIR)
 
 class Config:
     MAX_CONNECTION_ATTEMPTS = 3
     CONNECTION_TIMEOUT = 45
     SCAN_TIMEOUT = 15
+    # Seconds a scan result is served before a background rescan
+    SCAN_CACHE_TTL = 20
+    # "auto" prefers NetworkManager over D-Bus and falls back to nmcli
+    WIFI_BACKEND = os.environ.get("WIFI_BACKEND", "auto")
+    # Per-probe deadline for /api/status; slower probes report "timeout"
+    STATUS_PROBE_DEADLINE = 2.5
+    # Internet reachability: probe methods in order, TCP target as host:port
+    # "dns" alone can succeed from a resolver cache with the uplink down, and
+    # the DNS host must not be one dnsmasq hijacks to the portal
+    CONNECTIVITY_METHODS = os.environ.get("CONNECTIVITY_METHODS", "tcp").split(",")
+    CONNECTIVITY_TCP_TARGET = os.environ.get("CONNECTIVITY_TCP_TARGET", "8.8.8.8:53")
+    CONNECTIVITY_DNS_HOST = os.environ.get("CONNECTIVITY_DNS_HOST", "example.com")
+    # System metrics history: one sample every interval, capacity samples kept
+    METRICS_INTERVAL = 5
+    METRICS_CAPACITY = 720
+    # /api/events polling interval per topic, in seconds
+    EVENTS_SYSTEM_INTERVAL = 3
+    EVENTS_FAN_INTERVAL = 2
+    EVENTS_CONNECTION_INTERVAL = 5
+    EVENTS_SAVED_INTERVAL = 10
+    EVENTS_SCAN_INTERVAL = 2
+    EVENTS_KEEPALIVE = 15
+    # Open /api/events streams each hold a server thread; beyond this many
+    # clients get 503 and poll instead, keeping threads free for probes
+    EVENTS_MAX_SUBSCRIBERS = int(
+        os.environ.get("EVENTS_MAX_SUBSCRIBERS", max(1, ServerConfig.THREADS // 4))
+    )
+    # Fan hardware and thermal auto mode
+    # hwmon device is found by name; FAN_HWMON_PATH pins a directory instead
+    FAN_HWMON_NAMES = os.environ.get("FAN_HWMON_NAMES", "pwmfan").split(",")
+    FAN_HWMON_PATH = os.environ.get("FAN_HWMON_PATH") or None
+    FAN_THERMAL_PATH = os.environ.get("FAN_THERMAL_PATH", "/sys/class/thermal")
+    FAN_AUTO = os.environ.get("FAN_AUTO", "0") == "1"
+    # Light PWM output: "auto", "gpio", "sysfs" or "simulated"; fade in seconds
+    LIGHT_BACKEND = os.environ.get("LIGHT_BACKEND", "auto")
+    LIGHT_FADE = 0.3
+    # "id=pin" for a dimmable light, "id=red/green/blue" for an RGB light,
+    # comma separated; unset keeps the built-in main (17) and secondary (18)
+    LIGHT_PINS = os.environ.get("LIGHT_PINS", "")
+    BLUETOOTH_SCAN_DURATION = 10
+    HOSTAPD_CONF = "/etc/hostapd/hostapd.conf"
+    # systemd units whose state is cached for /api/status and /api/health
+    WATCHED_UNITS = os.environ.get("WATCHED_UNITS", "hostapd,dnsmasq,NetworkManager").split(",")
+    SERVICE_WATCH_INTERVAL = 10
+    # Answer OS connectivity probes in WSGI middleware instead of Flask routes
+    PROBE_RESPONDER = os.environ.get("PROBE_RESPONDER", "1") != "0"
+    # Seconds a client that completed /api/connect gets "online" probe answers
+    PROVISIONED_CLIENT_TTL = 3600
+
+# Initialize services
+fan_service = FanService(
+    hwmon_names=[n.strip() for n in Config.FAN_HWMON_NAMES if n.strip()],
+    hwmon_path=Config.FAN_HWMON_PATH,
+    thermal_path=Config.FAN_THERMAL_PATH
+)
+fan_service.start()
+if Config.FAN_AUTO:
+    fan_service.set_auto(True)
+wifi_service = WiFiService(
+    client_iface=CLIENT_IFACE,
+    ap_iface=AP_IFACE,
+    backend=Config.WIFI_BACKEND,
+    scan_ttl=Config.SCAN_CACHE_TTL,
+    scan_timeout=Config.SCAN_TIMEOUT
+)
+system_monitor = SystemMonitor()
+probe_executor = ProbeExecutor()
+# Connects get the default worker (they serialize on the radio anyway); the
+# minutes-long fan calibration and Bluetooth scans share their own worker so
+# they can never hold up a connect
+job_manager = JobManager(workers=1, lanes={"device": (1, ("fan_calibrate", "bluetooth_scan"))})
+
+# Built on first use: LightService probes GPIO/PWM and BluetoothService runs
+# bluetoothctl, neither of which needs to happen for captive clients; their
+# modules are only imported then too
+services = ServiceRegistry()
+def create_light_service():
+    from service.light_service import LightService, parse_light_pins
+    return LightService(
+        lights=parse_light_pins(Config.LIGHT_PINS) or None,
+        backend=Config.LIGHT_BACKEND,
+        fade=Config.LIGHT_FADE
+    )
+
+services.register("lights", create_light_service)
+services.register("bluetooth", lambda: service.BluetoothService())
+services.register("temperature", lambda: service.TemperatureService(system_monitor))
+
+tcp_host, _, tcp_port = Config.CONNECTIVITY_TCP_TARGET.rpartition(":")
+connectivity_monitor = ConnectivityMonitor(
+    methods=[m.strip() for m in Config.CONNECTIVITY_METHODS if m.strip()],
+    tcp_target=(tcp_host, int(tcp_port)),
+    dns_host=Config.CONNECTIVITY_DNS_HOST
+)
+connectivity_monitor.start()
+
+# Connection changes made outside the portal also trigger a reachability check
+wifi_service.tracker.on_change(lambda state: connectivity_monitor.kick())
+wifi_service.tracker.start()
+
+metrics_sampler = MetricsSampler(
+    system_monitor,
+    fan_service,
+    interval=Config.METRICS_INTERVAL,
+    capacity=Config.METRICS_CAPACITY
+)
+metrics_sampler.start()
+
+# The Flask probe routes below stay as the fallback when this is disabled
+client_state = ClientStateTable(iface=AP_IFACE, ttl=Config.PROVISIONED_CLIENT_TTL)
+probe_responder = CaptiveProbeResponder(app.wsgi_app, clients=client_state)
+if Config.PROBE_RESPONDER:
+    app.wsgi_app = probe_responder
+
+def system_info():
+    """System summary with CPU usage from the metrics sampler, which is the
+    only caller of get_cpu_usage() so their measurement windows don't overlap"""
+    sample = metrics_sampler.latest()
+    return system_monitor.get_system_info(cpu_usage=sample["cpu"] if sample else None)
+
+def connection_state():
+    result = wifi_service.get_current_connection()
+    if not result.get("success"):
+        return {"ok": False}
+    return {
+        "ok": True,
+        "connected": bool(result.get("connected")),
+        "ssid": result.get("ssid"),
+        "signal": result.get("signal"),
+        "interface": result.get("interface")
+    }
+
+def saved_networks_state():
+    result = wifi_service.get_saved_networks()
+    return {"ok": bool(result.get("success")), "networks": result.get("networks", [])}
+
+def scan_state():
+    result, age = wifi_service.scan_cache.peek()
+    if result is None:
+        return {"networks": None}
+    return {"networks": result.get("networks", []), "age": round(age, 1)}
+
+# One shared producer for /api/events; every source here must be cheap
+event_hub = EventHub({
+    "system": (system_info, Config.EVENTS_SYSTEM_INTERVAL),
+    "fan": (fan_service.get_status, Config.EVENTS_FAN_INTERVAL),
+    "connection": (connection_state, Config.EVENTS_CONNECTION_INTERVAL),
+    "saved": (saved_networks_state, Config.EVENTS_SAVED_INTERVAL),
+    "scan": (scan_state, Config.EVENTS_SCAN_INTERVAL)
+}, max_subscribers=Config.EVENTS_MAX_SUBSCRIBERS)
 
 # Helper function for AP password management (keep only what's needed)
+@timed_command
 def run_command(cmd: str, timeout=30):
     """Execute shell command - used only for system operations"""
     p = None
@@ -43,6 +209,14 @@ def run_command(cmd: str, timeout=30):
     except Exception as e:
         return -1, "", str(e)
 
+hostapd_config = HostapdConfig(run_command, path=Config.HOSTAPD_CONF, ap_iface=AP_IFACE)
+service_watcher = ServiceStateWatcher(
+    run_command,
+    units=[u.strip() for u in Config.WATCHED_UNITS if u.strip()],
+    interval=Config.SERVICE_WATCH_INTERVAL
+)
+service_watcher.start()
+
 def sanitize_ap_password(password):
     """Sanitize and validate password for hostapd.conf"""
     if not password:
@@ -64,10 +238,23 @@ def sanitize_ap_password(password):
     
     return password
 
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_timing(response):
+    started = g.pop("request_started", None)
+    if started is not None:
+        endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+        observe_request(endpoint, request.method, response.status_code, time.perf_counter() - started)
+    return response
+
 @app.get("/api/scan")
 def api_scan():
     try:
-        result = wifi_service.scan_networks(timeout=Config.SCAN_TIMEOUT)
+        refresh = request.args.get("refresh") == "1"
+        result = wifi_service.get_scan_results(refresh=refresh)
         
         if not result["success"]:
             return jsonify({"ok": False, "error": "Scan failed"}), 500
@@ -84,14 +271,28 @@ def api_scan():
         if current_ssid:
             networks = [net for net in networks if net.get("ssid", "").strip() != current_ssid]
         
-        return jsonify({"ok": True, "networks": networks})
+        return jsonify({"ok": True, "networks": networks, "age": result.get("age")})
         
     except Exception as e:
         print(f"Error in api_scan: {e}")
         return jsonify({"ok": False, "error": "Scan failed"}), 500
 
+# Per-process salt so connect job keys never hold a plain password hash
+CONNECT_KEY_SALT = os.urandom(16)
+
+def connect_key(password):
+    return hashlib.sha256(CONNECT_KEY_SALT + password.encode()).hexdigest()
+
+def connect_finished(result, client_ip):
+    """Job completion hook, run once per requester that joined the job:
+    recheck internet, release that client's captive sheet"""
+    connectivity_monitor.kick()
+    if result.get("success"):
+        client_state.mark_provisioned(client_ip)
+
 @app.post("/api/connect")
 def api_connect():
+    """Start a connect job; progress is polled via /api/jobs/<id>"""
     try:
         data = request.get_json(silent=True) or {}
         ssid = (data.get("ssid") or "").strip()
@@ -100,46 +301,123 @@ def api_connect():
         if not ssid:
             return jsonify({"ok": False, "error": "SSID required"}), 400
 
-        result = wifi_service.connect_network(ssid, pwd, timeout=40)
+        client_ip = request.remote_addr
+        # A retry with a different password must not join the running attempt
+        job, created = job_manager.submit(
+            "connect",
+            (ssid, connect_key(pwd)),
+            lambda progress: wifi_service.connect_network(
+                ssid, pwd, timeout=Config.CONNECTION_TIMEOUT, progress=progress
+            ),
+            on_done=lambda result: connect_finished(result, client_ip)
+        )
         
-        if result["success"]:
-            return jsonify({"ok": True, "message": result["message"]}), 200
-        else:
-            return jsonify({"ok": False, "error": result["error"]}), 400
+        return jsonify({
+            "ok": True,
+            "job_id": job["id"],
+            "status": job["status"],
+            "deduplicated": not created
+        }), 202
     except Exception as e:
         print(f"Error in api_connect: {e}")
         return jsonify({"ok": False, "error": "Connection failed"}), 500
 
+# Result keys a finished job exposes under "result", per job kind
+JOB_RESULT_KEYS = {
+    "bluetooth_scan": ("devices",),
+    "fan_calibrate": ("calibration",)
+}
+
+@app.get("/api/jobs/<job_id>")
+def api_job_status(job_id):
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({"ok": False, "error": "Job not found"}), 404
+    
+    result = job["result"] or {}
+    payload = {key: result[key] for key in JOB_RESULT_KEYS.get(job["kind"], ()) if key in result}
+    return jsonify({
+        "ok": True,
+        "job": {
+            "id": job["id"],
+            "kind": job["kind"],
+            "status": job["status"],
+            "phase": job["phase"],
+            "phases": job["phases"],
+            "message": result.get("message"),
+            "error": result.get("error"),
+            "result": payload or None
+        }
+    })
+
+def format_addresses(network):
+    """`ip -br addr`-style summary of an inspect_interface() result"""
+    return " ".join(
+        [network["interface"], network["operstate"].upper()] + network["ipv4"] + network["ipv6"]
+    )
+
+def format_default_route(network):
+    """`ip route show default`-style summary of the IPv4 default routes"""
+    return "\n".join(
+        f"default via {r['gateway']} dev {r['iface']} metric {r['metric']}"
+        for r in network["default_routes"] if r["family"] == "ipv4"
+    )
+
+def format_wireless(network, ssid=None):
+    """`iwconfig`-style summary of the wireless link stats"""
+    link = network["wireless"]
+    if link is None:
+        return f'{network["interface"]}  ESSID:off/any'
+    return (
+        f'{network["interface"]}  ESSID:"{ssid or ""}"  '
+        f'Link Quality={link["quality"]:g}/70  Signal level={link["level"]:g} dBm  '
+        f'Noise level={link["noise"]:g} dBm'
+    )
+
 @app.get("/api/status")
 def api_status():
     try:
-        code_ip, out_ip, _ = run_command(f"ip -br addr show dev {CLIENT_IFACE}")
-        code_rt, out_rt, _ = run_command("ip route show default")
-        code_ping, _, _ = run_command("ping -c1 -w2 8.8.8.8")
-        code_conn, out_conn, _ = run_command("nmcli -t connection show --active")
+        results = probe_executor.run({
+            "active_connections": lambda: run_command("nmcli -t connection show --active", timeout=3),
+            "client_connected": wifi_service.get_current_connection
+        }, default_deadline=Config.STATUS_PROBE_DEADLINE)
         
-        code_wifi, out_wifi, _ = run_command(f"iwconfig {CLIENT_IFACE}")
+        def output(name):
+            value = results[name]["value"]
+            return value[1] if value else None
         
-        code_ap, _, _ = run_command("sudo systemctl is-active hostapd")
-        ap_active = (code_ap == 0)
+        network = inspect_interface(CLIENT_IFACE)
+        internet = connectivity_monitor.get_verdict()
         
-        conn_result = wifi_service.get_current_connection()
-        client_connected = conn_result.get("success") and conn_result.get("connected", False)
+        conn_result = results["client_connected"]["value"]
+        client_connected = None
+        if conn_result is not None:
+            client_connected = bool(conn_result.get("success") and conn_result.get("connected", False))
         
         return jsonify({
             "ok": True, 
             "client_iface": CLIENT_IFACE,
             "ap_iface": AP_IFACE,
-            "ap_mode": ap_active,
+            "ap_mode": service_watcher.is_active("hostapd"),
             "client_connected": client_connected,
-            "ip": out_ip,
-            "default_route": out_rt,
-            "internet": code_ping == 0,
-            "active_connections": out_conn,
-            "wifi_connection": out_wifi
+            "ip": format_addresses(network),
+            "default_route": format_default_route(network),
+            "internet": internet["online"],
+            "internet_check": internet,
+            "active_connections": output("active_connections"),
+            "wifi_connection": format_wireless(
+                network, conn_result.get("ssid") if client_connected else None
+            ),
+            "network": network,
+            "services": service_watcher.snapshot(),
+            "probes": {
+                name: {"status": r["status"], "elapsed_ms": r.get("elapsed_ms")}
+                for name, r in results.items()
+            }
         })
     
     except Exception as e:
+        print(f"Error in api_status: {e}")
         return jsonify({"ok": False, "error": "Status check failed"}), 500
 
 @app.get("/api/health")
@@ -147,8 +425,9 @@ def api_health():
     conn_result = wifi_service.get_current_connection()
     client_connected = conn_result.get("success") and conn_result.get("connected", False)
     
-    code_ap, _, _ = run_command("sudo systemctl is-active hostapd")
-    ap_active = (code_ap == 0)
+    ap_active = service_watcher.is_active("hostapd")
+    
+    internet = connectivity_monitor.get_verdict()
     
     return jsonify({
         "status": "healthy",
@@ -158,23 +437,49 @@ def api_health():
         "ap_mode": ap_active,
         "ap_interface": AP_IFACE,
         "client_interface": CLIENT_IFACE,
-        "client_connected": client_connected
+        "client_connected": client_connected,
+        "internet": internet["online"],
+        "internet_age": internet["age"]
     })
 
+@app.get("/metrics")
+def metrics():
+    """Prometheus exposition of request and external command timings"""
+    return Response(registry.render(), mimetype="text/plain; version=0.0.4")
+
+@app.get("/api/radio/metrics")
+def api_radio_metrics():
+    """Radio scheduler contention: queue depth and wait times per kind"""
+    return jsonify({"ok": True, "radio": wifi_service.radio.metrics()})
+
+def provisioned_probe_response(kind):
+    """The OS's success answer for a provisioned client, else None.
+
+    Fallback for PROBE_RESPONDER=0: the routes below then see the probes,
+    and answer them the way the middleware would.
+    """
+    if not probe_responder.provisioned(request.environ):
+        return None
+    status, headers, body = probe_responder.success[kind]
+    return Response(body, status=status, headers=headers)
+
 @app.get("/generate_204")
 def generate_204():
-    return redirect("/", code=302)
+    return provisioned_probe_response("android") or redirect("/", code=302)
 
 @app.get("/gen_204")
 def gen_204():
-    return redirect("/", code=302)
+    return provisioned_probe_response("android") or redirect("/", code=302)
 
 @app.get("/library/test/success.html")
 def library_test_success():
-    return redirect("/", code=302)
+    return provisioned_probe_response("apple") or redirect("/", code=302)
 
 @app.get("/hotspot-detect.html")
 def hotspot_detect_html():
+    provisioned = provisioned_probe_response("apple_html")
+    if provisioned:
+        return provisioned
     html_content = """
     <!DOCTYPE html>
     <html>
@@ -191,31 +496,31 @@ def hotspot_detect_html():
 
 @app.get("/hotspot-detect")
 def hotspot_detect():
-    return redirect("/", code=302)
+    return provisioned_probe_response("apple") or redirect("/", code=302)
 
 @app.get("/ncsi.txt")
 def ncsi_txt():
-    return redirect("/", code=302)
+    return provisioned_probe_response("windows_ncsi") or redirect("/", code=302)
 
 @app.get("/connecttest.txt")
 def connecttest_txt():
-    return redirect("/", code=302)
+    return provisioned_probe_response("windows_connecttest") or redirect("/", code=302)
 
 @app.get("/redirect")
 def redirect_captive():
-    return redirect("/", code=302)
+    return provisioned_probe_response("generic") or redirect("/", code=302)
 
 @app.get("/captiveportal")
 def captiveportal():
-    return redirect("/", code=302)
+    return provisioned_probe_response("generic") or redirect("/", code=302)
 
 @app.get("/fs/captiveportal")
 def fs_captiveportal():
-    return redirect("/", code=302)
+    return provisioned_probe_response("generic") or redirect("/", code=302)
 
 @app.get("/success.txt")
 def success_txt():
-    return redirect("/", code=302)
+    return provisioned_probe_response("firefox") or redirect("/", code=302)
 
 @app.get("/api/current-connection")
 def api_current_connection():
@@ -262,6 +567,7 @@ def api_forget_network():
             return jsonify({"ok": False, "error": "SSID required"}), 400
         
         result = wifi_service.forget_network(ssid)
+        connectivity_monitor.kick()
         
         if result["success"]:
             return jsonify({"ok": True, "message": result["message"]})
@@ -275,6 +581,10 @@ def api_forget_network():
 def api_disconnect_current():
     try:
         result = wifi_service.disconnect_current()
+        connectivity_monitor.kick()
+        if result["success"]:
+            # Without an uplink every client is captive again
+            client_state.clear()
         
         if result["success"]:
             return jsonify({"ok": True, "message": result["message"]})
@@ -305,41 +615,14 @@ def api_change_ap_password():
             return jsonify({"ok": False, "error": "Password contains invalid characters"}), 400
     
     try:
-        hostapd_conf = "/etc/hostapd/hostapd.conf"
-        
-        with open(hostapd_conf, 'r') as f:
-            lines = f.readlines()
-        
-        updated = False
-        new_lines = []
-        for line in lines:
-            if line.strip().startswith('wpa_passphrase='):
-                new_lines.append(f'wpa_passphrase={sanitized_password}\n')
-                updated = True
-            else:
-                new_lines.append(line)
-        
-        if not updated:
-            return jsonify({"ok": False, "error": "Configuration error"}), 500
+        result = hostapd_config.apply({"wpa_passphrase": sanitized_password})
+        service_watcher.kick()
         
-        import tempfile
-        with tempfile.NamedTemporaryFile(mode='w', delete=False, dir='/etc/hostapd') as tmp_file:
-            tmp_file.writelines(new_lines)
-            tmp_path = tmp_file.name
-        
-        import shutil
-        shutil.move(tmp_path, hostapd_conf)
-        
-        os.chmod(hostapd_conf, 0o600)
-        
-        run_command("sudo systemctl restart hostapd", timeout=10)
-        time.sleep(2)
+        if not result["success"]:
+            return jsonify({"ok": False, "error": result["error"]}), 500
         
         return jsonify({"ok": True, "message": "AP password updated successfully"})
     
-    except PermissionError:
-        print("Permission denied: Cannot modify hostapd.conf")
-        return jsonify({"ok": False, "error": "Permission denied"}), 500
     except Exception as e:
         print(f"Error in api_change_ap_password: {e}")
         return jsonify({"ok": False, "error": "Failed to update AP password"}), 500
@@ -348,18 +631,9 @@ def api_change_ap_password():
 def api_ap_info():
     """Get current AP information (SSID only, not password)"""
     try:
-        hostapd_conf = "/etc/hostapd/hostapd.conf"
-        
-        ssid = None
-        with open(hostapd_conf, 'r') as f:
-            for line in f:
-                if line.strip().startswith('ssid='):
-                    ssid = line.split('=', 1)[1].strip()
-                    break
-        
         return jsonify({
             "ok": True,
-            "ssid": ssid or "Unknown",
+            "ssid": hostapd_config.get("ssid") or "Unknown",
             "interface": AP_IFACE
         })
     
@@ -414,28 +688,302 @@ def api_fan_toggle():
         print(f"Error in api_fan_toggle: {e}")
         return jsonify({"ok": False, "error": "Failed to toggle fan"}), 500
 
+@app.post("/api/fan/auto")
+def api_fan_auto():
+    """Enable or disable thermal auto mode"""
+    try:
+        data = request.get_json(silent=True) or {}
+        enabled = data.get("enabled")
+        
+        if not isinstance(enabled, bool):
+            return jsonify({"ok": False, "error": "enabled must be true or false"}), 400
+        
+        result = fan_service.set_auto(enabled)
+        
+        if result.get("success"):
+            return jsonify({"ok": True, "fan": result})
+        else:
+            return jsonify({"ok": False, "error": result.get("error")}), 409
+    
+    except Exception as e:
+        print(f"Error in api_fan_auto: {e}")
+        return jsonify({"ok": False, "error": "Failed to change fan mode"}), 500
+
+@app.post("/api/fan/calibrate")
+def api_fan_calibrate():
+    """Start a PWM-to-RPM calibration sweep; progress is polled via /api/jobs/<id>"""
+    try:
+        job, created = job_manager.submit(
+            "fan_calibrate",
+            "fan",
+            lambda progress: fan_service.calibrate(progress=progress)
+        )
+        
+        return jsonify({
+            "ok": True,
+            "job_id": job["id"],
+            "status": job["status"],
+            "deduplicated": not created
+        }), 202
+    except Exception as e:
+        print(f"Error in api_fan_calibrate: {e}")
+        return jsonify({"ok": False, "error": "Failed to start calibration"}), 500
+
+# Light APIs
+@app.get("/api/lights/status")
+def api_lights_status():
+    """Get status of all lights"""
+    try:
+        status = services.get("lights").get_status()
+        return jsonify({"ok": True, "lights": status})
+    except Exception as e:
+        print(f"Error in api_lights_status: {e}")
+        return jsonify({"ok": False, "error": "Failed to get lights status"}), 500
+
+@app.post("/api/lights/<light_id>/toggle")
+def api_light_toggle(light_id):
+    """Toggle one light on/off"""
+    try:
+        result = services.get("lights").toggle_light(light_id)
+        
+        if result.get("success"):
+            return jsonify({"ok": True, "light": result})
+        else:
+            return jsonify({"ok": False, "error": result.get("error")}), 400
+    
+    except Exception as e:
+        print(f"Error in api_light_toggle: {e}")
+        return jsonify({"ok": False, "error": "Failed to toggle light"}), 500
+
+@app.post("/api/lights/<light_id>/brightness")
+def api_light_brightness(light_id):
+    """Set one light's brightness (0-100)"""
+    try:
+        data = request.get_json(silent=True) or {}
+        brightness = data.get("brightness")
+        
+        if brightness is None:
+            return jsonify({"ok": False, "error": "Brightness required"}), 400
+        
+        result = services.get("lights").set_brightness(light_id, brightness)
+        
+        if result.get("success"):
+            return jsonify({"ok": True, "light": result})
+        else:
+            return jsonify({"ok": False, "error": result.get("error")}), 400
+    
+    except Exception as e:
+        print(f"Error in api_light_brightness: {e}")
+        return jsonify({"ok": False, "error": "Failed to set brightness"}), 500
+
+@app.post("/api/lights/<light_id>/color")
+def api_light_color(light_id):
+    """Set one light's color"""
+    try:
+        data = request.get_json(silent=True) or {}
+        color = data.get("color")
+        
+        if not color:
+            return jsonify({"ok": False, "error": "Color required"}), 400
+        
+        result = services.get("lights").set_color(light_id, color)
+        
+        if result.get("success"):
+            return jsonify({"ok": True, "light": result})
+        else:
+            return jsonify({"ok": False, "error": result.get("error")}), 400
+    
+    except Exception as e:
+        print(f"Error in api_light_color: {e}")
+        return jsonify({"ok": False, "error": "Failed to set color"}), 500
+
+@app.post("/api/lights/scene")
+def api_lights_scene():
+    """Apply {"lights": {id: {"state", "brightness", "color"}}, "fade": s} in one batch"""
+    try:
+        data = request.get_json(silent=True) or {}
+        changes = data.get("lights")
+        fade = data.get("fade")
+        
+        if not isinstance(changes, dict) or not changes:
+            return jsonify({"ok": False, "error": "lights must be a non-empty object"}), 400
+        if not all(isinstance(change, dict) for change in changes.values()):
+            return jsonify({"ok": False, "error": "Each light change must be an object"}), 400
+        if fade is not None and (isinstance(fade, bool) or not isinstance(fade, (int, float)) or not 0 <= fade <= 10):
+            return jsonify({"ok": False, "error": "fade must be between 0 and 10 seconds"}), 400
+        
+        result = services.get("lights").apply_scene(changes, fade=fade)
+        
+        if result.get("success"):
+            return jsonify({"ok": True, "scene": result})
+        else:
+            return jsonify({"ok": False, "error": result.get("error")}), 400
+    
+    except Exception as e:
+        print(f"Error in api_lights_scene: {e}")
+        return jsonify({"ok": False, "error": "Failed to apply scene"}), 500
+
+# Bluetooth APIs
+@app.get("/api/bluetooth/status")
+def api_bluetooth_status():
+    """Get Bluetooth power state and paired devices"""
+    try:
+        status = services.get("bluetooth").get_status()
+        return jsonify({"ok": True, "bluetooth": status})
+    except Exception as e:
+        print(f"Error in api_bluetooth_status: {e}")
+        return jsonify({"ok": False, "error": "Failed to get Bluetooth status"}), 500
+
+@app.post("/api/bluetooth/toggle")
+def api_bluetooth_toggle():
+    """Toggle Bluetooth power"""
+    try:
+        result = services.get("bluetooth").toggle()
+        
+        if result.get("success"):
+            return jsonify({"ok": True, "bluetooth": result})
+        else:
+            return jsonify({"ok": False, "error": result.get("error")}), 503
+    
+    except Exception as e:
+        print(f"Error in api_bluetooth_toggle: {e}")
+        return jsonify({"ok": False, "error": "Failed to toggle Bluetooth"}), 500
+
+@app.post("/api/bluetooth/scan")
+def api_bluetooth_scan():
+    """Start a device scan; results are polled via /api/jobs/<id>"""
+    try:
+        bluetooth_service = services.get("bluetooth")
+        if not bluetooth_service.is_available:
+            return jsonify({"ok": False, "error": "Bluetooth not available"}), 503
+        
+        job, created = job_manager.submit(
+            "bluetooth_scan",
+            "bluetooth",
+            lambda progress: bluetooth_service.scan_devices(Config.BLUETOOTH_SCAN_DURATION)
+        )
+        
+        return jsonify({
+            "ok": True,
+            "job_id": job["id"],
+            "status": job["status"],
+            "deduplicated": not created
+        }), 202
+    except Exception as e:
+        print(f"Error in api_bluetooth_scan: {e}")
+        return jsonify({"ok": False, "error": "Failed to start Bluetooth scan"}), 500
+
+# Temperature APIs
+@app.get("/api/temperature/status")
+def api_temperature_status():
+    """Get current and target temperature"""
+    try:
+        status = services.get("temperature").get_status()
+        return jsonify({"ok": True, "temperature": status})
+    except Exception as e:
+        print(f"Error in api_temperature_status: {e}")
+        return jsonify({"ok": False, "error": "Failed to get temperature"}), 500
+
+@app.post("/api/temperature/target")
+def api_temperature_target():
+    """Set target temperature (16-35 C)"""
+    try:
+        data = request.get_json(silent=True) or {}
+        temperature = data.get("temperature")
+        
+        if temperature is None:
+            return jsonify({"ok": False, "error": "Temperature required"}), 400
+        
+        result = services.get("temperature").set_temperature(temperature)
+        
+        if result.get("success"):
+            return jsonify({"ok": True, "temperature": result})
+        else:
+            return jsonify({"ok": False, "error": result.get("error")}), 400
+    
+    except Exception as e:
+        print(f"Error in api_temperature_target: {e}")
+        return jsonify({"ok": False, "error": "Failed to set temperature"}), 500
+
 # System Monitor APIs
 @app.get("/api/system/status")
 def api_system_status():
     """Get system status"""
     try:
-        print("[DEBUG] Getting system info...")
-        status = system_monitor.get_system_info()
-        print(f"[DEBUG] Status result: {status}")
+        status = system_info()
+        logger.debug(f"System status: {status}")
         
         if "error" in status:
-            print(f"[ERROR] {status['error']}")
+            logger.error(f"System status failed: {status['error']}")
             return jsonify({"ok": False, "error": status["error"]}), 500
         
-        result = {"ok": True, "system": status}
-        print(f"[DEBUG] Returning: {result}")
-        return jsonify(result)
+        return jsonify({"ok": True, "system": status})
     except Exception as e:
-        print(f"[ERROR] Exception in api_system_status: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"Exception in api_system_status: {e}")
         return jsonify({"ok": False, "error": f"Failed to get system status: {str(e)}"}), 500
 
+@app.get("/api/system/history")
+def api_system_history():
+    """Downsampled history of one metric (min/max/avg per bucket)"""
+    metric = request.args.get("metric", "cpu")
+    try:
+        window = float(request.args.get("window", 600))
+        buckets = int(request.args.get("buckets", 60))
+    except ValueError:
+        return jsonify({"ok": False, "error": "Invalid window or buckets"}), 400
+    
+    if not 0 < window <= Config.METRICS_INTERVAL * Config.METRICS_CAPACITY or not 0 < buckets <= 500:
+        return jsonify({"ok": False, "error": "Window or buckets out of range"}), 400
+    
+    try:
+        series = metrics_sampler.history(metric, window=window, buckets=buckets)
+    except KeyError:
+        return jsonify({
+            "ok": False,
+            "error": "Unknown metric",
+            "metrics": metrics_sampler.metrics
+        }), 400
+    
+    return jsonify({
+        "ok": True,
+        "metric": metric,
+        "window": window,
+        "interval": metrics_sampler.interval,
+        "series": series
+    })
+
+@app.get("/api/events")
+def api_events():
+    """Server-Sent Events stream of system, fan, connection, saved and
+    scan state. The first event per topic is the full state, later ones
+    only carry the keys that changed."""
+    subscriber = event_hub.subscribe()
+    if subscriber is None:
+        # The frontend falls back to polling when the stream is refused
+        return jsonify({"ok": False, "error": "Too many live update streams"}), 503, {"Retry-After": "60"}
+    
+    def stream():
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                events = subscriber.next(timeout=Config.EVENTS_KEEPALIVE)
+                if not events:
+                    yield ": keepalive\n\n"
+                    continue
+                for topic, data in events:
+                    yield format_sse(topic, data)
+        finally:
+            event_hub.unsubscribe(subscriber)
+    
+    response = Response(
+        stream(),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+    # Frees the slot even if the client goes away before the stream starts
+    response.call_on_close(lambda: event_hub.unsubscribe(subscriber))
+    return response
+
 @app.get("/canonical.html")
 def canonical_html():
     html_content = """
@@ -454,30 +1002,36 @@ def canonical_html():
 
 @app.get("/")
 def serve_index():
-    return Response(
-        open(os.path.join(FRONTEND_DIR, "index.html")).read(),
-        mimetype="text/html"
-    )
+    return static_cache.response("index.html", request) or ("Not found", 404)
+
 @app.route("/success.html")
 def serve_success():
-    return send_from_directory(FRONTEND_DIR, "success.html")
+    return static_cache.response("success.html", request) or ("Not found", 404)
 
 @app.route("/public/<path:filename>")
 def serve_static(filename):
-    return send_from_directory(os.path.join(FRONTEND_DIR, "public"), filename)
+    return static_cache.response(f"public/{filename}", request) or ("Not found", 404)
 
 @app.route("/<path:path>")
 def serve_frontend(path):
-    if ".." in path or path.startswith("/"):
-        return send_from_directory(FRONTEND_DIR, "index.html")
-    
-    full_path = os.path.join(FRONTEND_DIR, path)
-    if not os.path.abspath(full_path).startswith(os.path.abspath(FRONTEND_DIR)):
-        return send_from_directory(FRONTEND_DIR, "index.html")
-    
-    if os.path.exists(full_path):
-        return send_from_directory(FRONTEND_DIR, path)
-    return send_from_directory(FRONTEND_DIR, "index.html")
+    response = static_cache.response(path, request)
+    if response is None:
+        response = static_cache.response("index.html", request)
+    return response or ("Not found", 404)
+
+def shutdown_services():
+    """Stop background workers before the process exits"""
+    connectivity_monitor.stop()
+    fan_service.stop()
+    wifi_service.tracker.stop()
+    service_watcher.stop()
+    metrics_sampler.stop()
+    probe_executor.shutdown()
+    job_manager.shutdown()
+    light_service = services.peek("lights")
+    if light_service is not None:
+        light_service.cleanup()
 
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=80, debug=False)
+    logging.basicConfig(level=logging.INFO)
+    serve(app, on_shutdown=[shutdown_services])
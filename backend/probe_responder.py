@@ -0,0 +1,120 @@
+"""
+WSGI middleware answering OS captive-portal probes before Flask dispatch.
+
+Probe requests make up most of the portal's traffic, so they are matched
+by path against a precomputed table and answered with pre-rendered byte
+responses; everything else passes through to the app. The Host header is
+not consulted: DNS on the AP points every name at the portal, and each
+probe path maps to the same response whichever host it was sent to.
+Clients that finished provisioning get each OS's success response instead.
+"""
+
+PORTAL_HTML = b"""<!DOCTYPE html>
+<html>
+<head>
+    <meta http-equiv="refresh" content="0;url=/">
+    <title>%s</title>
+</head>
+<body>
+    <p>Redirecting to authentication page...</p>
+</body>
+</html>
+"""
+
+APPLE_SUCCESS = b"<HTML><HEAD><TITLE>Success</TITLE></HEAD><BODY>Success</BODY></HTML>"
+
+FIREFOX_CANONICAL = (
+    b'<meta http-equiv="refresh" content="0;url=https://support.mozilla.org/kb/captive-portal"/>'
+)
+
+# Probe path -> the kind of client that sends it
+PROBE_PATHS = {
+    "/generate_204": "android",
+    "/gen_204": "android",
+    "/hotspot-detect.html": "apple_html",
+    "/hotspot-detect": "apple",
+    "/library/test/success.html": "apple",
+    "/ncsi.txt": "windows_ncsi",
+    "/connecttest.txt": "windows_connecttest",
+    "/redirect": "generic",
+    "/captiveportal": "generic",
+    "/fs/captiveportal": "generic",
+    "/success.txt": "firefox",
+    "/canonical.html": "firefox_html"
+}
+
+def _render(status, body=b"", content_type="text/plain", extra=()):
+    headers = [
+        ("Content-Type", content_type),
+        ("Content-Length", str(len(body))),
+        ("Cache-Control", "no-cache, no-store, must-revalidate")
+    ]
+    headers.extend(extra)
+    return status, headers, body
+
+
+def _captive_responses(portal_url):
+    redirect = _render("302 Found", extra=[("Location", portal_url)])
+    return {
+        "android": redirect,
+        "apple": redirect,
+        "apple_html": _render(
+            "200 OK", PORTAL_HTML % b"Network Authentication Required", "text/html; charset=utf-8"
+        ),
+        "windows_ncsi": redirect,
+        "windows_connecttest": redirect,
+        "generic": redirect,
+        "firefox": redirect,
+        "firefox_html": _render("200 OK", PORTAL_HTML % b"Redirecting", "text/html; charset=utf-8")
+    }
+
+
+def _success_responses():
+    no_content = _render("204 No Content")
+    apple = _render("200 OK", APPLE_SUCCESS, "text/html")
+    return {
+        "android": no_content,
+        "apple": apple,
+        "apple_html": apple,
+        "windows_ncsi": _render("200 OK", b"Microsoft NCSI"),
+        "windows_connecttest": _render("200 OK", b"Microsoft Connect Test"),
+        "generic": no_content,
+        "firefox": _render("200 OK", b"success\n"),
+        "firefox_html": _render("200 OK", FIREFOX_CANONICAL, "text/html")
+    }
+
+
+class CaptiveProbeResponder:
+    """Answers probes with the captive response, or with the OS's expected
+    success body for clients that `clients.is_provisioned(ip)` reports as
+    done, so their devices stop re-probing.
+    """
+
+    def __init__(self, app, portal_url="/", clients=None):
+        self.app = app
+        self.clients = clients
+        self.responses = _captive_responses(portal_url)
+        self.success = _success_responses()
+
+    def lookup(self, path):
+        """Probe kind for a request path, or None if it is not a probe"""
+        return PROBE_PATHS.get(path)
+
+    def provisioned(self, environ):
+        """Whether the requesting client should get success answers"""
+        return self.clients is not None and self.clients.is_provisioned(environ.get("REMOTE_ADDR"))
+
+    def respond(self, kind, environ):
+        if self.provisioned(environ):
+            return self.success[kind]
+        return self.responses[kind]
+
+    def __call__(self, environ, start_response):
+        method = environ.get("REQUEST_METHOD")
+        if method == "GET" or method == "HEAD":
+            kind = self.lookup(environ.get("PATH_INFO", ""))
+            if kind is not None:
+                status, headers, body = self.respond(kind, environ)
+                start_response(status, list(headers))
+                return [body if method == "GET" else b""]
+        return self.app(environ, start_response)
@@ -0,0 +1,80 @@
+"""
+Production serving for the portal.
+
+Runs the Flask app under waitress with a fixed worker thread pool, so a
+slow /api/connect or /api/scan only occupies one thread while captive
+probes from other clients keep being answered. Falls back to Werkzeug's
+threaded server when waitress is not installed.
+"""
+
+import logging
+import os
+import signal
+
+logger = logging.getLogger(__name__)
+
+class ServerConfig:
+    HOST = os.environ.get("PORTAL_HOST", "0.0.0.0")
+    PORT = int(os.environ.get("PORTAL_PORT", "80"))
+    # Worker threads; each open /api/events stream holds one, so app.py caps
+    # concurrent streams at a quarter of them (EVENTS_MAX_SUBSCRIBERS)
+    THREADS = int(os.environ.get("PORTAL_THREADS", "16"))
+    # Open connections accepted before new ones wait in the listen backlog
+    CONNECTION_LIMIT = int(os.environ.get("PORTAL_CONNECTION_LIMIT", "200"))
+    # Seconds an idle keep-alive connection is held open
+    KEEPALIVE_TIMEOUT = int(os.environ.get("PORTAL_KEEPALIVE_TIMEOUT", "15"))
+    BACKLOG = int(os.environ.get("PORTAL_BACKLOG", "256"))
+
+
+def _raise_exit(signum, frame):
+    raise SystemExit(0)
+
+
+def serve(app, on_shutdown=(), config=ServerConfig):
+    """Serve `app` until SIGTERM/SIGINT, then run the `on_shutdown` hooks.
+
+    On shutdown new connections are refused and in-flight requests get a
+    few seconds to finish before the process exits.
+    """
+    signal.signal(signal.SIGTERM, _raise_exit)
+    signal.signal(signal.SIGINT, _raise_exit)
+
+    try:
+        from waitress.server import create_server
+    except ImportError:
+        create_server = None
+
+    try:
+        if create_server is not None:
+            server = create_server(
+                app,
+                host=config.HOST,
+                port=config.PORT,
+                threads=config.THREADS,
+                connection_limit=config.CONNECTION_LIMIT,
+                channel_timeout=config.KEEPALIVE_TIMEOUT,
+                backlog=config.BACKLOG,
+                ident="wifi-portal"
+            )
+            logger.info(
+                f"Serving on {config.HOST}:{config.PORT} with waitress, {config.THREADS} threads"
+            )
+            # Returns after SystemExit, once the worker threads have drained
+            server.run()
+        else:
+            from werkzeug.serving import make_server
+            logger.warning("waitress not installed, falling back to Werkzeug's threaded server")
+            server = make_server(config.HOST, config.PORT, app, threaded=True)
+            try:
+                server.serve_forever()
+            except SystemExit:
+                pass
+            finally:
+                server.server_close()
+    finally:
+        for hook in on_shutdown:
+            try:
+                hook()
+            except Exception as e:
+                logger.error(f"Shutdown hook failed: {e}")
+        logger.info("Server stopped")
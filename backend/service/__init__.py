@@ -1,8 +1,27 @@
 """
 Service layer for WiFi Captive Portal
+
+Services are imported on first attribute access so that importing the
+package (or one of its submodules) does not pull in every service and
+its dependencies.
 """
 
-from .fan_service import FanService
-from .wifi_service import WiFiService
+import importlib
+
+_SERVICES = {
+    'BluetoothService': '.bluetooth_service',
+    'FanService': '.fan_service',
+    'LightService': '.light_service',
+    'TemperatureService': '.temperature_service',
+    'WiFiService': '.wifi_service'
+}
+
+__all__ = sorted(_SERVICES)
 
-__all__ = ['FanService', 'WiFiService']
+def __getattr__(name):
+    module = _SERVICES.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
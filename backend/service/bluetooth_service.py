@@ -3,6 +3,8 @@ import re
 import logging
 import time
 
+from . import instrumentation
+
 logger = logging.getLogger(__name__)
 
 class BluetoothService:
@@ -12,7 +14,7 @@ class BluetoothService:
     def check_bluetooth_available(self):
         """Check if Bluetooth is available on the system"""
         try:
-            result = subprocess.run(['bluetoothctl', '--version'], 
+            result = instrumentation.run(['bluetoothctl', '--version'], 
                                   capture_output=True, text=True, timeout=5)
             return result.returncode == 0
         except (subprocess.TimeoutExpired, FileNotFoundError, Exception):
@@ -28,7 +30,7 @@ class BluetoothService:
                     "devices": []
                 }
             
-            power_result = subprocess.run(
+            power_result = instrumentation.run(
                 ['bluetoothctl', 'show'], 
                 capture_output=True, 
                 text=True, 
@@ -39,7 +41,7 @@ class BluetoothService:
             powered_match = re.search(r'Powered:\s+(\w+)', power_result.stdout)
             enabled = powered_match.group(1) == 'yes' if powered_match else False
             
-            devices_result = subprocess.run(
+            devices_result = instrumentation.run(
                 ['bluetoothctl', 'devices', 'Paired'], 
                 capture_output=True, 
                 text=True, 
@@ -56,7 +58,7 @@ class BluetoothService:
                         mac = match.group(1)
                         name = match.group(2)
                         
-                        info_result = subprocess.run(
+                        info_result = instrumentation.run(
                             ['bluetoothctl', 'info', mac],
                             capture_output=True,
                             text=True,
@@ -103,7 +105,7 @@ class BluetoothService:
             status = self.get_status()
             new_state = "off" if status["enabled"] else "on"
             
-            result = subprocess.run(
+            result = instrumentation.run(
                 ['bluetoothctl', 'power', new_state], 
                 check=True,
                 capture_output=True,
@@ -130,7 +132,7 @@ class BluetoothService:
                 return {"success": False, "error": "Bluetooth not available"}
             
             # Start scan
-            subprocess.run(
+            instrumentation.run(
                 ['bluetoothctl', 'scan', 'on'], 
                 check=True,
                 capture_output=True,
@@ -141,7 +143,7 @@ class BluetoothService:
             time.sleep(scan_duration)
             
             # Get scan results - sửa lỗi ở đây
-            scan_result = subprocess.run(
+            scan_result = instrumentation.run(
                 ['bluetoothctl', 'devices'], 
                 capture_output=True, 
                 text=True, 
@@ -150,7 +152,7 @@ class BluetoothService:
             )
             
             # Stop scan
-            subprocess.run(
+            instrumentation.run(
                 ['bluetoothctl', 'scan', 'off'], 
                 check=True,
                 capture_output=True,
@@ -176,7 +178,7 @@ class BluetoothService:
             }
             
         except subprocess.TimeoutExpired:
-            subprocess.run(['bluetoothctl', 'scan', 'off'], capture_output=True)
+            instrumentation.run(['bluetoothctl', 'scan', 'off'], capture_output=True)
             logger.error("Timeout scanning Bluetooth devices")
             return {"success": False, "error": "Timeout"}
         except Exception as e:
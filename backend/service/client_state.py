@@ -0,0 +1,78 @@
+import threading
+import time
+
+from .net_inspect import get_neighbors
+
+class ClientStateTable:
+    """Which AP clients have finished provisioning.
+
+    Clients are keyed by MAC address, resolved from the kernel neighbour
+    table for the AP interface, so the entry survives a DHCP renumbering;
+    an IP that has no neighbour entry is used as the key as is. Entries
+    expire `ttl` seconds after they were marked. The table only holds
+    key -> expiry, and lookups for unprovisioned clients return without
+    taking the lock while the table is empty.
+    """
+
+    def __init__(self, iface=None, ttl=3600, neighbor_ttl=5.0, max_clients=256):
+        self.iface = iface
+        self.ttl = ttl
+        self.neighbor_ttl = neighbor_ttl
+        self.max_clients = max_clients
+        self._lock = threading.Lock()
+        self._expiry = {}
+        self._neighbors = {}
+        self._neighbors_at = 0.0
+
+    def _key(self, ip):
+        # Caller holds self._lock
+        now = time.monotonic()
+        if now - self._neighbors_at >= self.neighbor_ttl:
+            self._neighbors = get_neighbors(self.iface)
+            self._neighbors_at = now
+        return self._neighbors.get(ip) or ip
+
+    def mark_provisioned(self, ip):
+        if not ip:
+            return
+        with self._lock:
+            now = time.monotonic()
+            # Force a fresh neighbour lookup: the client may be new
+            self._neighbors_at = 0.0
+            self._expiry[self._key(ip)] = now + self.ttl
+            if len(self._expiry) > self.max_clients:
+                self._prune(now)
+
+    def is_provisioned(self, ip):
+        if not self._expiry or not ip:
+            return False
+        with self._lock:
+            key = self._key(ip)
+            expiry = self._expiry.get(key)
+            if expiry is None:
+                return False
+            if expiry <= time.monotonic():
+                del self._expiry[key]
+                return False
+            return True
+
+    def clear(self, ip=None):
+        """Forget one client, or every client when `ip` is None"""
+        with self._lock:
+            if ip is None:
+                self._expiry.clear()
+            else:
+                self._expiry.pop(self._key(ip), None)
+
+    def snapshot(self):
+        with self._lock:
+            now = time.monotonic()
+            self._prune(now)
+            return {key: round(expiry - now) for key, expiry in self._expiry.items()}
+
+    def _prune(self, now):
+        # Caller holds self._lock
+        for key in [k for k, expiry in self._expiry.items() if expiry <= now]:
+            del self._expiry[key]
+        while len(self._expiry) > self.max_clients:
+            del self._expiry[min(self._expiry, key=self._expiry.get)]
@@ -0,0 +1,99 @@
+import time
+
+WIFI_TYPES = ("wifi", "802-11-wireless")
+
+
+def split_terse(line):
+    """Split an `nmcli -t` line on unescaped ':' and unescape '\\:' / '\\\\'"""
+    fields = []
+    current = []
+    escaped = False
+    for char in line:
+        if escaped:
+            current.append(char)
+            escaped = False
+        elif char == "\\":
+            escaped = True
+        elif char == ":":
+            fields.append("".join(current))
+            current = []
+        else:
+            current.append(char)
+    fields.append("".join(current))
+    return fields
+
+
+class ConnectionSnapshot:
+    """In-memory index of NetworkManager connection profiles.
+
+    Active WiFi profiles carry the "bssid" of the associated AP when the
+    backend reports it.
+    """
+
+    def __init__(self, connections):
+        self.connections = connections
+        self.created_at = time.monotonic()
+        self.by_name = {}
+        self.by_ssid = {}
+        for conn in connections:
+            self.by_name[conn["name"]] = conn
+            if conn.get("ssid"):
+                self.by_ssid.setdefault(conn["ssid"], []).append(conn)
+
+    def age(self):
+        return time.monotonic() - self.created_at
+
+    def ssid_for(self, name):
+        conn = self.by_name.get(name)
+        return conn.get("ssid") if conn else None
+
+    def names_for(self, ssid):
+        return [conn["name"] for conn in self.by_ssid.get(ssid, [])]
+
+    def wifi_connections(self):
+        return [conn for conn in self.connections if conn["type"] in WIFI_TYPES]
+
+    def active_on(self, device):
+        """Return the active connection bound to `device`, if any"""
+        for conn in self.connections:
+            if conn.get("device") == device:
+                return conn
+        return None
+
+    @classmethod
+    def from_nmcli(cls, listing, details):
+        """Build a snapshot from two terse nmcli outputs.
+
+        `listing` is `nmcli -t -f NAME,UUID,TYPE,DEVICE connection show`,
+        `details` is `nmcli -t -f connection.uuid,802-11-wireless.ssid
+        connection show uuid <a> uuid <b> ...` for the WiFi profiles.
+        """
+        connections = []
+        by_uuid = {}
+        for line in listing.splitlines():
+            parts = split_terse(line)
+            if len(parts) < 4:
+                continue
+            conn = {
+                "name": parts[0],
+                "uuid": parts[1],
+                "type": parts[2],
+                "device": parts[3] or None,
+                "ssid": None,
+                "bssid": None
+            }
+            connections.append(conn)
+            by_uuid[conn["uuid"]] = conn
+
+        current = None
+        for line in details.splitlines():
+            parts = split_terse(line)
+            if len(parts) < 2:
+                continue
+            key, value = parts[0], ":".join(parts[1:])
+            if key == "connection.uuid":
+                current = by_uuid.get(value.strip())
+            elif key == "802-11-wireless.ssid" and current is not None:
+                current["ssid"] = value.strip() or None
+
+        return cls(connections)
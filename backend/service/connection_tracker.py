@@ -0,0 +1,175 @@
+import logging
+import re
+import subprocess
+import threading
+import time
+
+from .net_inspect import get_addresses
+
+logger = logging.getLogger(__name__)
+
+USING_CONNECTION = re.compile(r"^using connection '(.*)'$")
+DEVICE_STATE = re.compile(r"^([a-z -]+?)(?: \((.*)\))?$")
+
+class ConnectionTracker:
+    """Current client-interface connection, kept in memory.
+
+    Follows `nmcli device monitor <iface>` on a background thread. Each
+    output line goes through `feed()`, which can also be called directly
+    to replay recorded monitor output. `resolve()` is called whenever
+    the device becomes connected (and once at start) and should return the
+    active connection dict (with "name" and "ssid") or None; it is the only
+    place state is read from NetworkManager. Listeners registered with
+    `on_change` are called with the new state after every transition.
+    """
+
+    def __init__(self, iface, resolve=None, restart_delay=2.0, max_restart_delay=60.0):
+        self.iface = iface
+        self.resolve = resolve
+        self.restart_delay = restart_delay
+        self.max_restart_delay = max_restart_delay
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._process = None
+        self._listeners = []
+        self._live = False
+        self._state = {
+            "state": "unknown",
+            "detail": None,
+            "connection": None,
+            "ssid": None,
+            "ipv4": [],
+            "changed_at": None
+        }
+
+    def on_change(self, callback):
+        self._listeners.append(callback)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name="connection-tracker", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        process = self._process
+        if process is not None and process.poll() is None:
+            process.terminate()
+
+    def get(self):
+        """Copy of the current state; "live" is False while not following NM"""
+        with self._lock:
+            state = dict(self._state)
+            state["ipv4"] = list(self._state["ipv4"])
+            state["live"] = self._live
+        return state
+
+    def seed(self):
+        """Initialise from `resolve()`; the monitor only reports transitions"""
+        active = self._resolve()
+        self._update(
+            state="connected" if active else "disconnected",
+            detail=None,
+            connection=active["name"] if active else None,
+            ssid=active.get("ssid") if active else None,
+            ipv4=get_addresses(self.iface)["ipv4"] if active else []
+        )
+
+    def feed(self, line):
+        """Apply one line of `nmcli device monitor` / `nmcli monitor` output"""
+        line = line.strip()
+        name, sep, message = line.partition(": ")
+        if not sep or name != self.iface:
+            return
+
+        match = USING_CONNECTION.match(message)
+        if match:
+            self._update(connection=match.group(1))
+            return
+        if message in ("device removed", "device disappeared"):
+            self._update(state="unavailable", detail=None, connection=None, ssid=None, ipv4=[])
+            return
+
+        match = DEVICE_STATE.match(message)
+        if not match:
+            return
+        state, detail = match.group(1), match.group(2)
+        if state == "connected":
+            active = self._resolve()
+            self._update(
+                state=state,
+                detail=detail,
+                connection=active["name"] if active else self.get()["connection"],
+                ssid=active.get("ssid") if active else None,
+                ipv4=get_addresses(self.iface)["ipv4"]
+            )
+        elif state in ("disconnected", "unavailable", "unmanaged"):
+            self._update(state=state, detail=detail, connection=None, ssid=None, ipv4=[])
+        else:
+            self._update(state=state, detail=detail)
+
+    def _resolve(self):
+        if self.resolve is None:
+            return None
+        try:
+            return self.resolve()
+        except Exception as e:
+            logger.warning(f"Could not resolve active connection on {self.iface}: {e}")
+            return None
+
+    def _update(self, **fields):
+        with self._lock:
+            changed = any(self._state.get(k) != v for k, v in fields.items())
+            if not changed:
+                return
+            previous = self._state["state"]
+            self._state.update(fields)
+            self._state["changed_at"] = time.time()
+            state = dict(self._state)
+        if state["state"] != previous:
+            logger.info(f"{self.iface}: {state['state']} ({state['ssid'] or state['connection'] or '-'})")
+        for callback in self._listeners:
+            try:
+                callback(state)
+            except Exception as e:
+                logger.error(f"Connection tracker listener failed: {e}")
+
+    def _run(self):
+        delay = self.restart_delay
+        while not self._stop.is_set():
+            try:
+                self._process = subprocess.Popen(
+                    ["nmcli", "device", "monitor", self.iface],
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.DEVNULL,
+                    text=True,
+                    bufsize=1
+                )
+            except FileNotFoundError:
+                logger.warning("nmcli not found, connection tracking disabled")
+                return
+            except Exception as e:
+                logger.error(f"Failed to start nmcli monitor: {e}")
+            else:
+                started = time.monotonic()
+                # Transitions before the monitor attached are not replayed
+                self.seed()
+                with self._lock:
+                    self._live = True
+                for line in self._process.stdout:
+                    self.feed(line)
+                self._process.wait()
+                with self._lock:
+                    self._live = False
+                if time.monotonic() - started > self.max_restart_delay:
+                    delay = self.restart_delay
+
+            if self._stop.is_set():
+                break
+            logger.warning(f"nmcli monitor exited, restarting in {delay:.0f}s")
+            if self._stop.wait(delay):
+                break
+            delay = min(delay * 2, self.max_restart_delay)
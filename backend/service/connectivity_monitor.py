@@ -0,0 +1,132 @@
+import ipaddress
+import logging
+import socket
+import subprocess
+import threading
+import time
+
+from . import instrumentation
+
+logger = logging.getLogger(__name__)
+
+class ConnectivityMonitor:
+    """Background internet-reachability checker.
+
+    Probes on an adaptive schedule: every `fast_interval` seconds for
+    `fast_rounds` rounds after `kick()` or a verdict change, otherwise every
+    `slow_interval` seconds. Readers get the latest verdict without
+    triggering any network traffic.
+
+    "dns" only shows that some resolver answers, possibly from its cache or
+    the portal's own dnsmasq hijack list, so it is not used by default and
+    answers pointing at private or loopback addresses never count.
+    """
+
+    METHODS = ("tcp", "dns", "icmp")
+
+    def __init__(self, methods=("tcp",), tcp_target=("8.8.8.8", 53),
+                 dns_host="example.com", icmp_host="8.8.8.8",
+                 timeout=2.0, fast_interval=2.0, slow_interval=30.0, fast_rounds=5):
+        unknown = set(methods) - set(self.METHODS)
+        if unknown:
+            raise ValueError(f"Unknown probe methods: {sorted(unknown)}")
+        self.methods = tuple(methods)
+        self.tcp_target = tcp_target
+        self.dns_host = dns_host
+        self.icmp_host = icmp_host
+        self.timeout = timeout
+        self.fast_interval = fast_interval
+        self.slow_interval = slow_interval
+        self.fast_rounds = fast_rounds
+
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._fast_remaining = fast_rounds
+        self._verdict = {"online": None, "method": None, "latency_ms": None}
+        self._checked_at = None
+        self._checked_mono = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name="connectivity-monitor", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def kick(self):
+        """Re-probe now and stay on the fast schedule for a while.
+
+        Call after anything that can change the uplink (connect,
+        disconnect, forget).
+        """
+        with self._lock:
+            self._fast_remaining = self.fast_rounds
+        self._wake.set()
+
+    def get_verdict(self):
+        with self._lock:
+            verdict = dict(self._verdict)
+            verdict["checked_at"] = self._checked_at
+            verdict["age"] = (
+                round(time.monotonic() - self._checked_mono, 1)
+                if self._checked_mono is not None else None
+            )
+        return verdict
+
+    def check(self):
+        """Run one probe round; the first method that succeeds wins"""
+        for method in self.methods:
+            start = time.monotonic()
+            try:
+                if getattr(self, f"_probe_{method}")():
+                    latency = round((time.monotonic() - start) * 1000)
+                    return {"online": True, "method": method, "latency_ms": latency}
+            except Exception as e:
+                logger.debug(f"Connectivity probe {method} failed: {e}")
+        return {"online": False, "method": None, "latency_ms": None}
+
+    def _probe_tcp(self):
+        with socket.create_connection(self.tcp_target, timeout=self.timeout):
+            return True
+
+    def _probe_dns(self):
+        for info in socket.getaddrinfo(self.dns_host, 80, proto=socket.IPPROTO_TCP):
+            address = ipaddress.ip_address(info[4][0].split("%", 1)[0])
+            if not (address.is_private or address.is_loopback or address.is_link_local
+                    or address.is_unspecified):
+                return True
+        return False
+
+    def _probe_icmp(self):
+        result = instrumentation.run(
+            ["ping", "-c1", f"-W{max(1, int(self.timeout))}", self.icmp_host],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            timeout=self.timeout + 1
+        )
+        return result.returncode == 0
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.clear()
+            verdict = self.check()
+
+            with self._lock:
+                if verdict["online"] != self._verdict["online"]:
+                    logger.info(f"Internet reachability changed: online={verdict['online']}")
+                    self._fast_remaining = self.fast_rounds
+                self._verdict = verdict
+                self._checked_at = time.time()
+                self._checked_mono = time.monotonic()
+                if self._fast_remaining > 0:
+                    self._fast_remaining -= 1
+                    interval = self.fast_interval
+                else:
+                    interval = self.slow_interval
+
+            self._wake.wait(interval)
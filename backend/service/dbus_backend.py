@@ -0,0 +1,344 @@
+import logging
+import threading
+import time
+import uuid as uuid_lib
+
+from .connection_snapshot import ConnectionSnapshot
+
+try:
+    import dbus
+except ImportError:
+    dbus = None
+
+logger = logging.getLogger(__name__)
+
+NM_BUS = "org.freedesktop.NetworkManager"
+NM_PATH = "/org/freedesktop/NetworkManager"
+NM_SETTINGS_PATH = "/org/freedesktop/NetworkManager/Settings"
+NM_IFACE = NM_BUS
+NM_SETTINGS_IFACE = NM_BUS + ".Settings"
+NM_CONNECTION_IFACE = NM_BUS + ".Settings.Connection"
+NM_DEVICE_IFACE = NM_BUS + ".Device"
+NM_WIRELESS_IFACE = NM_BUS + ".Device.Wireless"
+NM_AP_IFACE = NM_BUS + ".AccessPoint"
+NM_ACTIVE_IFACE = NM_BUS + ".Connection.Active"
+PROPS_IFACE = "org.freedesktop.DBus.Properties"
+
+# NMActiveConnectionState
+ACTIVE_STATE_ACTIVATED = 2
+ACTIVE_STATE_DEACTIVATED = 4
+
+# NMDeviceState
+DEVICE_STATE_IP_CONFIG = 70
+
+# NM80211ApFlags / NM80211ApSecurityFlags
+AP_FLAGS_PRIVACY = 0x1
+AP_SEC_KEY_MGMT_PSK = 0x100
+AP_SEC_KEY_MGMT_802_1X = 0x200
+AP_SEC_KEY_MGMT_SAE = 0x400
+
+# NMWepKeyType
+WEP_KEY_TYPE_KEY = 1
+WEP_KEY_TYPE_PASSPHRASE = 2
+
+
+def _to_str(value):
+    """Decode a D-Bus byte array (ay) SSID into text"""
+    return bytes(bytearray(int(b) for b in value)).decode("utf-8", "replace")
+
+
+def _byte_array(text):
+    data = text.encode("utf-8")
+    return dbus.ByteArray(data) if dbus is not None else data
+
+
+def _uint32(value):
+    return dbus.UInt32(value) if dbus is not None else value
+
+
+def _is_wep_key(password):
+    """40/104-bit WEP keys: 5/13 ASCII characters or 10/26 hex digits"""
+    if len(password) in (5, 13):
+        return True
+    return len(password) in (10, 26) and all(c in "0123456789abcdefABCDEF" for c in password)
+
+
+class DBusBackend:
+    """NetworkManager access over the system D-Bus.
+
+    Keeps one bus connection for the process lifetime. `bus` may be any
+    object exposing `get_object(service, path)` whose proxies accept the
+    `dbus_interface=` keyword, so a fake service can stand in for a real
+    NetworkManager.
+    """
+
+    name = "dbus"
+
+    def __init__(self, bus=None, poll_interval=0.5):
+        self._bus = bus
+        self._lock = threading.Lock()
+        self.poll_interval = poll_interval
+
+    @classmethod
+    def is_available(cls):
+        if dbus is None:
+            return False
+        try:
+            backend = cls()
+            backend._get(backend._nm(), NM_IFACE, "Version")
+            return True
+        except Exception as e:
+            logger.info(f"NetworkManager D-Bus backend unavailable: {e}")
+            return False
+
+    def _get_bus(self):
+        with self._lock:
+            if self._bus is None:
+                if dbus is None:
+                    raise RuntimeError("dbus-python is not installed")
+                self._bus = dbus.SystemBus()
+            return self._bus
+
+    def _object(self, path):
+        return self._get_bus().get_object(NM_BUS, path)
+
+    def _nm(self):
+        return self._object(NM_PATH)
+
+    def _get(self, obj, iface, prop):
+        return obj.Get(iface, prop, dbus_interface=PROPS_IFACE)
+
+    def _device(self, iface):
+        path = self._nm().GetDeviceByIpIface(iface, dbus_interface=NM_IFACE)
+        return path, self._object(path)
+
+    def _access_points(self, device):
+        access_points = []
+        for ap_path in device.GetAllAccessPoints(dbus_interface=NM_WIRELESS_IFACE):
+            props = self._object(ap_path).GetAll(NM_AP_IFACE, dbus_interface=PROPS_IFACE)
+            access_points.append((ap_path, props))
+        return access_points
+
+    def _security(self, props):
+        flags = int(props.get("Flags", 0))
+        wpa_flags = int(props.get("WpaFlags", 0))
+        rsn_flags = int(props.get("RsnFlags", 0))
+
+        security = []
+        if flags & AP_FLAGS_PRIVACY and not wpa_flags and not rsn_flags:
+            security.append("WEP")
+        if wpa_flags:
+            security.append("WPA1")
+        if rsn_flags:
+            security.append("WPA2")
+        if (wpa_flags | rsn_flags) & AP_SEC_KEY_MGMT_802_1X:
+            security.append("802.1X")
+        return " ".join(security)
+
+    def scan(self, iface, timeout=15):
+        _, device = self._device(iface)
+
+        try:
+            last_scan = self._get(device, NM_WIRELESS_IFACE, "LastScan")
+        except Exception:
+            last_scan = None
+
+        try:
+            device.RequestScan({}, dbus_interface=NM_WIRELESS_IFACE)
+            # RequestScan only queues the scan; wait for LastScan to move on
+            deadline = time.monotonic() + min(timeout, 10)
+            while last_scan is not None and time.monotonic() < deadline:
+                if self._get(device, NM_WIRELESS_IFACE, "LastScan") != last_scan:
+                    break
+                time.sleep(self.poll_interval)
+        except Exception as e:
+            # NM refuses back-to-back scans; the cached AP list is still valid
+            logger.debug(f"RequestScan rejected: {e}")
+
+        networks = []
+        for _, props in self._access_points(device):
+            ssid = _to_str(props.get("Ssid", b""))
+            if not ssid:
+                continue
+            networks.append({
+                "ssid": ssid,
+                "bssid": str(props.get("HwAddress", "")).lower(),
+                "signal": int(props.get("Strength", 0)),
+                "security": self._security(props)
+            })
+        return networks
+
+    def _security_settings(self, props, password):
+        """802-11-wireless-security settings for an AP, or None if it is open.
+
+        `props` is the AP's properties, or None when it is not in the scan
+        list (hidden), in which case a password implies WPA-PSK. Raises
+        ValueError for networks that cannot be joined with a password alone.
+        """
+        if props is None:
+            return {"key-mgmt": "wpa-psk", "psk": password} if password else None
+
+        flags = int(props.get("Flags", 0))
+        key_mgmt = int(props.get("WpaFlags", 0)) | int(props.get("RsnFlags", 0))
+        if not key_mgmt and not flags & AP_FLAGS_PRIVACY:
+            return None
+        if key_mgmt & AP_SEC_KEY_MGMT_802_1X:
+            raise ValueError("Enterprise (802.1X) networks are not supported")
+        if not password:
+            raise ValueError("Password required for this network")
+        if key_mgmt & AP_SEC_KEY_MGMT_SAE and not key_mgmt & AP_SEC_KEY_MGMT_PSK:
+            return {"key-mgmt": "sae", "psk": password}
+        if key_mgmt:
+            return {"key-mgmt": "wpa-psk", "psk": password}
+        key_type = WEP_KEY_TYPE_KEY if _is_wep_key(password) else WEP_KEY_TYPE_PASSPHRASE
+        return {"key-mgmt": "none", "wep-key0": password, "wep-key-type": _uint32(key_type)}
+
+    def connect(self, iface, ssid, password="", timeout=40, progress=None):
+        """Activate `ssid` on `iface`; True once activated.
+
+        A saved profile for the SSID is reused (its secrets updated when a
+        password is given) rather than adding a duplicate. Raises ValueError
+        when the network needs credentials that were not supplied.
+        """
+        device_path, device = self._device(iface)
+        nm = self._nm()
+
+        ap_path, ap_props = "/", None
+        for path, props in self._access_points(device):
+            if _to_str(props.get("Ssid", b"")) == ssid:
+                ap_path, ap_props = path, props
+                break
+
+        existing = None
+        for conn in self.load_snapshot().by_ssid.get(ssid, []):
+            existing = conn
+            break
+
+        created_path = None
+        if existing is not None:
+            if password:
+                profile = self._object(existing["path"])
+                settings = profile.GetSettings(dbus_interface=NM_CONNECTION_IFACE)
+                security = self._security_settings(ap_props, password)
+                if security is None:
+                    settings.pop("802-11-wireless-security", None)
+                else:
+                    settings["802-11-wireless-security"] = security
+                profile.Update(settings, dbus_interface=NM_CONNECTION_IFACE)
+            active_path = nm.ActivateConnection(
+                existing["path"], device_path, "/", dbus_interface=NM_IFACE
+            )
+        else:
+            settings = {
+                "connection": {
+                    "id": ssid,
+                    "uuid": str(uuid_lib.uuid4()),
+                    "type": "802-11-wireless"
+                },
+                "802-11-wireless": {
+                    "ssid": _byte_array(ssid),
+                    "mode": "infrastructure"
+                },
+                "ipv4": {"method": "auto"},
+                "ipv6": {"method": "auto"}
+            }
+            security = self._security_settings(ap_props, password)
+            if security is not None:
+                settings["802-11-wireless-security"] = security
+            created_path, active_path = nm.AddAndActivateConnection(
+                settings, device_path, ap_path, dbus_interface=NM_IFACE
+            )
+
+        if self._wait_activated(active_path, device, timeout, progress):
+            return True
+
+        if created_path is not None:
+            # Match nmcli: do not leave a half-configured profile behind
+            try:
+                self._object(created_path).Delete(dbus_interface=NM_CONNECTION_IFACE)
+            except Exception as e:
+                logger.warning(f"Could not remove failed profile for {ssid}: {e}")
+        return False
+
+    def _wait_activated(self, active_path, device, timeout, progress=None):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            try:
+                state = int(self._get(self._object(active_path), NM_ACTIVE_IFACE, "State"))
+            except Exception:
+                # The active connection object vanishes when activation fails
+                return False
+            if progress is not None:
+                try:
+                    if int(self._get(device, NM_DEVICE_IFACE, "State")) >= DEVICE_STATE_IP_CONFIG:
+                        progress("dhcp")
+                except Exception:
+                    pass
+            if state == ACTIVE_STATE_ACTIVATED:
+                return True
+            if state == ACTIVE_STATE_DEACTIVATED:
+                return False
+            time.sleep(self.poll_interval)
+        return False
+
+    def _active_bssid(self, device):
+        """BSSID of the AP a WiFi device is associated with, or None"""
+        try:
+            ap_path = str(self._get(device, NM_WIRELESS_IFACE, "ActiveAccessPoint"))
+            if ap_path == "/":
+                return None
+            return str(self._get(self._object(ap_path), NM_AP_IFACE, "HwAddress")).lower() or None
+        except Exception:
+            # Not a WiFi device, or the AP went away meanwhile
+            return None
+
+    def load_snapshot(self):
+        nm = self._nm()
+
+        devices_by_conn = {}
+        bssids_by_conn = {}
+        for active_path in self._get(nm, NM_IFACE, "ActiveConnections"):
+            active = self._object(active_path)
+            try:
+                conn_path = str(self._get(active, NM_ACTIVE_IFACE, "Connection"))
+                device_paths = self._get(active, NM_ACTIVE_IFACE, "Devices")
+                if device_paths:
+                    device = self._object(device_paths[0])
+                    devices_by_conn[conn_path] = str(self._get(device, NM_DEVICE_IFACE, "Interface"))
+                    bssids_by_conn[conn_path] = self._active_bssid(device)
+            except Exception as e:
+                # Active connections can disappear while we walk them
+                logger.debug(f"Skipping active connection {active_path}: {e}")
+
+        settings = self._object(NM_SETTINGS_PATH)
+        connections = []
+        for path in settings.ListConnections(dbus_interface=NM_SETTINGS_IFACE):
+            try:
+                config = self._object(path).GetSettings(dbus_interface=NM_CONNECTION_IFACE)
+            except Exception as e:
+                logger.debug(f"Skipping connection {path}: {e}")
+                continue
+            conn = config.get("connection", {})
+            wireless = config.get("802-11-wireless", {})
+            connections.append({
+                "name": str(conn.get("id", "")),
+                "uuid": str(conn.get("uuid", "")),
+                "type": str(conn.get("type", "")),
+                "device": devices_by_conn.get(str(path)),
+                "ssid": _to_str(wireless["ssid"]) if "ssid" in wireless else None,
+                "bssid": bssids_by_conn.get(str(path)),
+                "path": str(path)
+            })
+        return ConnectionSnapshot(connections)
+
+    def delete_connection(self, uuid):
+        settings = self._object(NM_SETTINGS_PATH)
+        path = settings.GetConnectionByUuid(uuid, dbus_interface=NM_SETTINGS_IFACE)
+        self._object(path).Delete(dbus_interface=NM_CONNECTION_IFACE)
+        return True
+
+    def set_managed(self, iface, managed):
+        _, device = self._device(iface)
+        value = dbus.Boolean(managed) if dbus is not None else bool(managed)
+        device.Set(NM_DEVICE_IFACE, "Managed", value, dbus_interface=PROPS_IFACE)
+        return True
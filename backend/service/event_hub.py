@@ -0,0 +1,127 @@
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+class Subscriber:
+    """Per-client mailbox that keeps only the newest pending event per topic"""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._pending = OrderedDict()
+
+    def push(self, topic, data):
+        with self._cond:
+            if topic in self._pending and isinstance(data, dict):
+                # Coalesce deltas the client has not picked up yet
+                merged = dict(self._pending.pop(topic))
+                merged.update(data)
+                data = merged
+            self._pending[topic] = data
+            self._cond.notify()
+
+    def next(self, timeout=None):
+        """Wait for pending events and return them as [(topic, data), ...]"""
+        with self._cond:
+            if not self._pending:
+                self._cond.wait(timeout)
+            events = list(self._pending.items())
+            self._pending.clear()
+            return events
+
+
+class EventHub:
+    """Single producer that polls cheap state sources and fans out
+    change-only deltas to every subscriber.
+
+    `sources` maps a topic to `(callable, interval)`; each callable must
+    return a JSON-serialisable dict. Polling only runs while at least one
+    subscriber is connected, so backend cost does not grow with the number
+    of open browsers.
+
+    Each open stream ties up a server worker thread, so at most
+    `max_subscribers` are accepted; `subscribe()` returns None beyond that.
+    """
+
+    def __init__(self, sources, tick=1.0, max_subscribers=None):
+        self.sources = sources
+        self.tick = tick
+        self.max_subscribers = max_subscribers
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self._state = {}
+        self._due = {}
+        self._wake = threading.Event()
+        self._thread = None
+
+    def subscribe(self):
+        """New subscriber, or None when `max_subscribers` are already connected"""
+        subscriber = Subscriber()
+        with self._lock:
+            if self.max_subscribers is not None and len(self._subscribers) >= self.max_subscribers:
+                return None
+            self._subscribers.add(subscriber)
+            # New clients start from the full current state
+            for topic, state in self._state.items():
+                subscriber.push(topic, state)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="event-hub", daemon=True)
+                self._thread.start()
+        self._wake.set()
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def subscriber_count(self):
+        with self._lock:
+            return len(self._subscribers)
+
+    def publish(self, topic, state):
+        """Record a new state for `topic` and push what changed"""
+        with self._lock:
+            previous = self._state.get(topic, {})
+            delta = {
+                key: value for key, value in state.items()
+                if key not in previous or _encode(previous[key]) != _encode(value)
+            }
+            for key in previous:
+                if key not in state:
+                    delta[key] = None
+            self._state[topic] = state
+            if not delta:
+                return
+            for subscriber in self._subscribers:
+                subscriber.push(topic, delta)
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if not self._subscribers:
+                    self._thread = None
+                    return
+
+            now = time.monotonic()
+            for topic, (source, interval) in self.sources.items():
+                if self._due.get(topic, 0.0) > now:
+                    continue
+                self._due[topic] = now + interval
+                try:
+                    self.publish(topic, source())
+                except Exception as e:
+                    logger.error(f"Event source {topic} failed: {e}")
+
+            self._wake.clear()
+            self._wake.wait(self.tick)
+
+
+def _encode(value):
+    return json.dumps(value, sort_keys=True, default=str)
+
+
+def format_sse(topic, data):
+    return f"event: {topic}\ndata: {json.dumps(data)}\n\n"
@@ -1,49 +1,227 @@
+import glob
 import logging
 import os
+import threading
+
+from .fan_tach import FanTachometer
+from .hwmon import HWMON_ROOT, HwmonDevice, NoDeviceError
 
 logger = logging.getLogger(__name__)
 
+# (temperature in C, PWM) points, linearly interpolated
+DEFAULT_CURVE = ((45, 0), (55, 85), (65, 170), (75, 255))
+
+def curve_pwm(curve, temperature):
+    """PWM for `temperature` on a piecewise-linear curve"""
+    if temperature <= curve[0][0]:
+        return curve[0][1]
+    for (t0, p0), (t1, p1) in zip(curve, curve[1:]):
+        if temperature <= t1:
+            return int(round(p0 + (p1 - p0) * (temperature - t0) / (t1 - t0)))
+    return curve[-1][1]
+
 class FanService:
-    def __init__(self):
-        self.hwmon_path = "/sys/class/hwmon/hwmon7"
-        self.pwm_file = os.path.join(self.hwmon_path, "pwm1")
-        self.pwm_enable_file = os.path.join(self.hwmon_path, "pwm1_enable")
+    """PWM fans on a hwmon device, manual (0-3) or thermal auto mode.
+    
+    The hwmon device is found by `name` (`hwmon_names`) unless
+    `hwmon_path` pins it; every `pwmN` it exposes is driven together and
+    `fanN_input` is reported as RPM where present. Status comes from the
+    tachometer's cached samples once `start()` has been called.
+    
+    In auto mode a background loop reads the hottest thermal zone every
+    `interval` seconds and moves the PWM towards the curve's value. Falling
+    temperatures are evaluated `hysteresis` degrees higher so the fan does
+    not hunt around a curve point, each step changes PWM by at most
+    `max_step`, any non-zero PWM is raised to `min_spin_pwm` so the fan
+    never sits below its stall point, and sysfs is written only when the
+    value changes. `control_step()` runs one iteration of the loop.
+    """
+    
+    def __init__(self, hwmon_names=("pwmfan",), hwmon_path=None, hwmon_root=HWMON_ROOT,
+                 thermal_path="/sys/class/thermal", curve=DEFAULT_CURVE, hysteresis=3.0,
+                 max_step=25, min_spin_pwm=60, interval=2.0, tach_interval=1.0):
+        self.device = HwmonDevice(hwmon_names, root=hwmon_root, path=hwmon_path)
+        self.thermal_path = thermal_path
         
         self.speed_map = {0: 0, 1: 85, 2: 170, 3: 255}
         
+        self.curve = tuple(sorted(curve))
+        self.hysteresis = hysteresis
+        self.max_step = max_step
+        self.min_spin_pwm = min_spin_pwm
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._auto = False
+        self._pwm = None
+        self._temperature = None
+        self._target = None
+        self._fans = (None, [1])
+        self._manual_path = None
+        self.tach = FanTachometer(self, interval=tach_interval)
+        
         self._enable_manual_control()
     
+    @property
+    def fans(self):
+        """Fan indices (N of pwmN) on the current device"""
+        path = self.device.path
+        if path != self._fans[0]:
+            self._fans = (path, self.device.indices("pwm") or [1])
+        return self._fans[1]
+    
     def _enable_manual_control(self):
-        try:
-            if os.path.exists(self.pwm_enable_file):
-                with open(self.pwm_enable_file, 'w') as f:
-                    f.write('1')
-        except Exception as e:
-            logger.warning(f"Could not enable manual control: {e}")
+        path = self.device.path
+        if not path:
+            logger.warning("No hwmon fan device found")
+            return
+        for fan in self.fans:
+            try:
+                if self.device.has(f"pwm{fan}_enable"):
+                    self.device.attr(f"pwm{fan}_enable").write_int(1)
+            except Exception as e:
+                logger.warning(f"Could not enable manual control of pwm{fan}: {e}")
+        self._manual_path = path
     
-    def _read_pwm(self):
+    def _read_pwm(self, fan=None):
         try:
-            if os.path.exists(self.pwm_file):
-                with open(self.pwm_file, 'r') as f:
-                    return int(f.read().strip())
+            return self.device.attr(f"pwm{fan or self.fans[0]}").read_int()
+        except NoDeviceError:
             return 0
         except Exception as e:
             logger.error(f"Error reading PWM: {e}")
             return 0
     
-    def _write_pwm(self, value):
-        """Write PWM value (0-255)"""
+    def _read_rpm(self, fan=None):
         try:
-            if os.path.exists(self.pwm_file):
-                with open(self.pwm_file, 'w') as f:
-                    f.write(str(value))
-                return True
-            else:
-                logger.error(f"PWM file not found: {self.pwm_file}")
+            return self.device.attr(f"fan{fan or self.fans[0]}_input").read_int()
+        except (OSError, ValueError):
+            return None
+    
+    def _write_pwm(self, value):
+        """Write PWM value (0-255) to every fan"""
+        if self.device.path != self._manual_path:
+            # New or re-enumerated device: its pwm*_enable is back to the driver default
+            self._enable_manual_control()
+        ok = True
+        for fan in self.fans:
+            try:
+                self.device.attr(f"pwm{fan}").write_int(value)
+            except NoDeviceError:
                 return False
-        except Exception as e:
-            logger.error(f"Error writing PWM: {e}")
-            return False
+            except Exception as e:
+                logger.error(f"Error writing pwm{fan}: {e}")
+                ok = False
+        if ok and self.device.path != self._manual_path:
+            # The device was re-discovered during the write
+            self._enable_manual_control()
+        return ok
+    
+    def _read_temperature(self):
+        """Hottest thermal zone in degrees Celsius, or None"""
+        hottest = None
+        for zone in glob.glob(os.path.join(self.thermal_path, "thermal_zone*", "temp")):
+            try:
+                with open(zone, 'r') as f:
+                    value = int(f.read().strip()) / 1000.0
+            except (OSError, ValueError):
+                continue
+            if hottest is None or value > hottest:
+                hottest = value
+        return hottest
+    
+    def compute_target(self, temperature, current):
+        """Next PWM for `temperature` given the `current` PWM"""
+        desired = curve_pwm(self.curve, temperature)
+        if desired < current:
+            # Only slow down once the temperature dropped past the hysteresis band
+            desired = min(current, curve_pwm(self.curve, temperature + self.hysteresis))
+        if 0 < desired < self.min_spin_pwm:
+            desired = self.min_spin_pwm
+
+        target = desired
+        if target > current:
+            target = min(target, current + self.max_step)
+        elif target < current:
+            target = max(target, current - self.max_step)
+
+        if 0 < target < self.min_spin_pwm:
+            # Spin up straight to the minimum, or stop instead of stalling
+            target = self.min_spin_pwm if desired > 0 else 0
+        return target
+    
+    def control_step(self):
+        """Run one auto-mode iteration; returns the PWM now applied.
+        
+        Does nothing when auto mode is off, including when it was switched
+        off after the loop decided to run this step.
+        """
+        temperature = self._read_temperature()
+        with self._lock:
+            if not self._auto:
+                return self._pwm
+            if self._pwm is None:
+                self._pwm = self._read_pwm()
+            if temperature is None:
+                logger.warning("No thermal zone readable, setting fan to full speed")
+                target = 255
+            else:
+                target = self.compute_target(temperature, self._pwm)
+            
+            self._temperature = temperature
+            self._target = target
+            if target != self._pwm and self._write_pwm(target):
+                self._pwm = target
+            return self._pwm
+    
+    def _run(self):
+        while True:
+            with self._lock:
+                if not self._auto:
+                    self._thread = None
+                    return
+            try:
+                self.control_step()
+            except Exception as e:
+                logger.error(f"Fan control step failed: {e}")
+            self._wake.wait(self.interval)
+            self._wake.clear()
+    
+    def set_auto(self, enabled):
+        """Enable or disable the thermal control loop"""
+        if self.tach.calibrating:
+            return {"success": False, "error": "Fan calibration in progress"}
+        with self._lock:
+            self._auto = bool(enabled)
+            if self._auto:
+                self._pwm = None
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="fan-control", daemon=True)
+                    self._thread.start()
+            else:
+                self._temperature = None
+                self._target = None
+        self._wake.set()
+        
+        return {
+            "success": True,
+            "auto_mode": self._auto,
+            "message": "Fan auto mode enabled" if self._auto else "Fan auto mode disabled"
+        }
+    
+    def start(self):
+        self.tach.start()
+    
+    def stop(self):
+        self.tach.stop()
+        self.set_auto(False)
+    
+    def calibrate(self, progress=None):
+        """Measure RPM across the PWM range; blocks for the whole sweep"""
+        if self.tach.calibrating:
+            return {"success": False, "error": "Fan calibration in progress"}
+        return self.tach.calibrate(progress=progress)
     
     def _pwm_to_speed(self, pwm_value):
         if pwm_value == 0:
@@ -59,8 +237,15 @@ class FanService:
         try:
             speed_labels = {0: "Off", 1: "Low", 2: "Medium", 3: "High"}
             
-            # Read current PWM value
-            pwm_value = self._read_pwm()
+            # Sampled state from the tachometer; read sysfs only if it is not running
+            fans = self.tach.latest(max_age=self.tach.interval * 3)
+            if not fans:
+                fans = [
+                    {"fan": fan, "pwm_value": self._read_pwm(fan), "rpm": self._read_rpm(fan),
+                     "health": "unknown"}
+                    for fan in self.fans
+                ]
+            pwm_value = fans[0]["pwm_value"]
             speed = self._pwm_to_speed(pwm_value)
             running = pwm_value > 0
             
@@ -68,8 +253,15 @@ class FanService:
                 "speed": speed,
                 "speed_label": speed_labels.get(speed, "Unknown"),
                 "running": running,
-                "auto_mode": False,
-                "pwm_value": pwm_value
+                "auto_mode": self._auto,
+                "pwm_value": pwm_value,
+                "rpm": fans[0]["rpm"],
+                "health": fans[0]["health"],
+                "fans": fans,
+                "calibrating": self.tach.calibrating,
+                "calibrated": bool(self.tach.calibration),
+                "temperature": self._temperature,
+                "target_pwm": self._target
             }
             
         except Exception as e:
@@ -86,8 +278,11 @@ class FanService:
         """Set fan speed (0-3)"""
         try:
             speed = int(speed)
+            if self.tach.calibrating:
+                return {"success": False, "error": "Fan calibration in progress"}
             if 0 <= speed <= 3:
                 pwm_value = self.speed_map[speed]
+                self.set_auto(False)
                 
                 if self._write_pwm(pwm_value):
                     speed_labels = {0: "Off", 1: "Low", 2: "Medium", 3: "High"}
@@ -124,6 +319,9 @@ class FanService:
     def toggle(self):
         """Toggle fan on/off"""
         try:
+            if self.tach.calibrating:
+                return {"success": False, "error": "Fan calibration in progress"}
+            self.set_auto(False)
             current_pwm = self._read_pwm()
             
             if current_pwm > 0:
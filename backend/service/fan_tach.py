@@ -0,0 +1,203 @@
+import logging
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+def interpolate(points, x):
+    """Linear interpolation over sorted (x, y) points, clamped at both ends"""
+    if not points:
+        return None
+    if x <= points[0][0]:
+        return points[0][1]
+    for (x0, y0), (x1, y1) in zip(points, points[1:]):
+        if x <= x1:
+            return y0 + (y1 - y0) * (x - x0) / (x1 - x0)
+    return points[-1][1]
+
+class FanTachometer:
+    """Rolling PWM/RPM samples per fan with stall and wear detection.
+
+    A background thread samples every fan's PWM and `fanN_input` every
+    `interval` seconds into a `window`-long buffer. Readers get the cached
+    result of the last sample: the RPM averaged over the samples taken at
+    the current PWM once it has settled, and a health verdict:
+
+    - "stopped": PWM is 0
+    - "settling": PWM changed less than `settle` seconds ago
+    - "stalled": PWM is at or above the minimum spin value but the
+      tachometer has read 0 for `stall_after` seconds
+    - "degraded": RPM is below `degraded_ratio` of the calibrated RPM
+    - "ok", or "no_tach" when the fan has no tachometer
+
+    `calibrate()` sweeps the PWM range and records RPM at each step; the
+    resulting table is what "degraded" is judged against.
+
+    While the fan service has no hwmon device the thread only checks for
+    one every `idle_interval` seconds instead of sampling.
+    """
+
+    def __init__(self, fan_service, interval=1.0, window=10, settle=3.0, stall_after=3.0,
+                 degraded_ratio=0.6, idle_interval=30.0):
+        self.fan_service = fan_service
+        self.interval = interval
+        self.window = window
+        self.settle = settle
+        self.stall_after = stall_after
+        self.degraded_ratio = degraded_ratio
+        self.idle_interval = idle_interval
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._samples = {}
+        self._pwm_changed = {}
+        self._states = {}
+        self._sampled_at = None
+        self.calibration = {}
+        self.calibrated_at = None
+        self.calibrating = False
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="fan-tach", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            if not self.fan_service.device.path:
+                self._stop.wait(self.idle_interval)
+                continue
+            try:
+                self.sample()
+            except Exception as e:
+                logger.error(f"Fan tach sampling failed: {e}")
+            self._stop.wait(self.interval)
+
+    def sample(self):
+        """Read every fan once and refresh the cached states"""
+        now = time.monotonic()
+        readings = [
+            (fan, self.fan_service._read_pwm(fan), self.fan_service._read_rpm(fan))
+            for fan in self.fan_service.fans
+        ]
+        with self._lock:
+            for fan, pwm, rpm in readings:
+                samples = self._samples.get(fan)
+                if samples is None:
+                    samples = self._samples[fan] = deque(maxlen=self.window)
+                    # Unknown history: treat the first sample as already settled
+                    self._pwm_changed[fan] = now - self.settle
+                elif samples[-1][1] != pwm:
+                    self._pwm_changed[fan] = now
+                samples.append((now, pwm, rpm))
+
+                state = self._evaluate(fan, now)
+                previous = self._states.get(fan, {}).get("health")
+                if state["health"] != previous and state["health"] in ("stalled", "degraded"):
+                    logger.warning(
+                        f"Fan {fan} {state['health']}: pwm={pwm} rpm={state['rpm']} "
+                        f"expected={state['expected_rpm']}"
+                    )
+                self._states[fan] = state
+            self._sampled_at = now
+
+    def _evaluate(self, fan, now):
+        # Caller holds self._lock
+        samples = self._samples[fan]
+        _, pwm, rpm = samples[-1]
+        settled_at = self._pwm_changed[fan] + self.settle
+        steady = [s for s in samples if s[0] >= settled_at and s[1] == pwm and s[2] is not None]
+        avg_rpm = round(sum(s[2] for s in steady) / len(steady)) if steady else None
+        expected = interpolate(self.calibration.get(fan, []), pwm)
+        expected = round(expected) if expected is not None else None
+
+        if rpm is None:
+            health = "no_tach"
+        elif pwm == 0:
+            health = "stopped"
+        elif now < settled_at or not steady:
+            health = "settling"
+        elif (pwm >= self.fan_service.min_spin_pwm and all(s[2] == 0 for s in steady)
+              and steady[-1][0] - steady[0][0] >= self.stall_after):
+            health = "stalled"
+        elif expected and avg_rpm and avg_rpm < expected * self.degraded_ratio:
+            health = "degraded"
+        else:
+            health = "ok"
+
+        return {
+            "fan": fan,
+            "pwm_value": pwm,
+            "rpm": avg_rpm if avg_rpm is not None else rpm,
+            "rpm_raw": rpm,
+            "expected_rpm": expected,
+            "health": health
+        }
+
+    def latest(self, max_age=None):
+        """Cached per-fan states, or None if nothing was sampled within `max_age`"""
+        with self._lock:
+            if self._sampled_at is None:
+                return None
+            if max_age is not None and time.monotonic() - self._sampled_at > max_age:
+                return None
+            return [dict(self._states[fan]) for fan in sorted(self._states)]
+
+    def calibrate(self, steps=(255, 224, 192, 160, 128, 96, 64), settle=4.0, measure=2.0,
+                  progress=None):
+        """Sweep PWM from high to low, recording the steady RPM of every fan.
+
+        Auto mode is suspended for the sweep and the previous mode or PWM is
+        restored afterwards. Returns `{"success", "calibration"}`.
+        """
+        report = progress or (lambda phase: None)
+        service = self.fan_service
+        was_auto = service.get_status().get("auto_mode")
+        previous_pwm = service._read_pwm()
+        service.set_auto(False)
+        self.calibrating = True
+        table = {fan: [] for fan in service.fans}
+        try:
+            for pwm in steps:
+                report(f"pwm {pwm}")
+                if not service._write_pwm(pwm):
+                    return {"success": False, "error": "Failed to write to PWM device"}
+                if self._stop.wait(settle):
+                    return {"success": False, "error": "Calibration aborted"}
+
+                readings = {fan: [] for fan in table}
+                deadline = time.monotonic() + measure
+                while time.monotonic() < deadline:
+                    for fan in table:
+                        rpm = service._read_rpm(fan)
+                        if rpm is not None:
+                            readings[fan].append(rpm)
+                    if self._stop.wait(0.25):
+                        return {"success": False, "error": "Calibration aborted"}
+
+                for fan, values in readings.items():
+                    if values:
+                        table[fan].append((pwm, round(sum(values) / len(values))))
+        finally:
+            self.calibrating = False
+            if was_auto:
+                service.set_auto(True)
+            else:
+                service._write_pwm(previous_pwm)
+
+        calibration = {fan: sorted(points) for fan, points in table.items() if points}
+        if not calibration:
+            return {"success": False, "error": "No tachometer readings"}
+        with self._lock:
+            self.calibration = calibration
+            self.calibrated_at = time.time()
+        report("done")
+        return {
+            "success": True,
+            "message": "Fan calibration complete",
+            "calibration": {str(fan): points for fan, points in calibration.items()}
+        }
@@ -0,0 +1,228 @@
+import itertools
+import logging
+import os
+import socket
+import tempfile
+import threading
+
+logger = logging.getLogger(__name__)
+
+HOSTAPD_CONF = "/etc/hostapd/hostapd.conf"
+
+class HostapdConfig:
+    """Parsed, cached view of hostapd.conf.
+
+    The file is parsed once and re-parsed only when its mtime, size or
+    inode change. Updates are written atomically (temp file, fsync,
+    rename) with the original line layout and comments preserved, then
+    applied to the running hostapd with `SET` + `RELOAD` on its control
+    socket when every changed key supports it; other changes, or a hostapd
+    without `ctrl_interface`, fall back to a service restart. The control
+    socket is used directly rather than through `hostapd_cli`, so the
+    passphrase never appears on a command line.
+    """
+
+    TYPES = {
+        "interface": str,
+        "driver": str,
+        "ssid": str,
+        "wpa_passphrase": str,
+        "hw_mode": str,
+        "channel": int,
+        "country_code": str,
+        "ieee80211n": int,
+        "wmm_enabled": int,
+        "auth_algs": int,
+        "wpa": int,
+        "wpa_key_mgmt": str,
+        "rsn_pairwise": str,
+        "ignore_broadcast_ssid": int,
+        "max_num_sta": int,
+        "ctrl_interface": str
+    }
+
+    # Keys hostapd picks up from `SET` + `RELOAD` without a restart
+    RELOADABLE = ("ssid", "wpa_passphrase", "ignore_broadcast_ssid", "max_num_sta")
+
+    _client_ids = itertools.count()
+
+    def __init__(self, run_command, path=HOSTAPD_CONF, ap_iface=None, service="hostapd"):
+        self.run_command = run_command
+        self.path = path
+        self.ap_iface = ap_iface
+        self.service = service
+        self._lock = threading.Lock()
+        self._stat = None
+        self._lines = []
+        self._values = {}
+        self._index = {}
+
+    def _signature(self):
+        stat = os.stat(self.path)
+        return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+    def _load(self):
+        # Caller holds self._lock
+        signature = self._signature()
+        if signature == self._stat:
+            return
+        with open(self.path, "r") as f:
+            lines = f.readlines()
+
+        values, index = {}, {}
+        for i, line in enumerate(lines):
+            stripped = line.strip()
+            if not stripped or stripped.startswith("#") or "=" not in stripped:
+                continue
+            key, value = stripped.split("=", 1)
+            values[key] = value
+            index[key] = i
+        self._lines, self._values, self._index = lines, values, index
+        self._stat = signature
+
+    def _convert(self, key, value):
+        kind = self.TYPES.get(key, str)
+        try:
+            return kind(value)
+        except (TypeError, ValueError):
+            return None
+
+    def get(self, key, default=None):
+        """Typed value of `key`, or `default` if unset or unparsable"""
+        with self._lock:
+            self._load()
+            raw = self._values.get(key)
+        if raw is None:
+            return default
+        value = self._convert(key, raw)
+        return default if value is None else value
+
+    def as_dict(self):
+        with self._lock:
+            self._load()
+            raw = dict(self._values)
+        return {key: self._convert(key, value) for key, value in raw.items()}
+
+    def validate(self, key, value):
+        """Normalize `value` for `key`; raises ValueError if it is invalid"""
+        value = self._convert(key, value)
+        if value is None:
+            raise ValueError(f"Invalid value for {key}")
+        text = str(value)
+        if any(c in text for c in "\r\n\0"):
+            raise ValueError(f"Invalid value for {key}")
+        if key == "wpa_passphrase" and not 8 <= len(text) <= 63:
+            raise ValueError("Passphrase must be 8-63 characters")
+        if key == "ssid" and not 1 <= len(text.encode()) <= 32:
+            raise ValueError("SSID must be 1-32 bytes")
+        return text
+
+    def set(self, changes):
+        """Write `changes` ({key: value}) to the file; returns the keys that changed"""
+        changes = {key: self.validate(key, value) for key, value in changes.items()}
+        with self._lock:
+            self._load()
+            changed = [key for key, value in changes.items() if self._values.get(key) != value]
+            if not changed:
+                return []
+
+            lines = list(self._lines)
+            for key in changed:
+                line = f"{key}={changes[key]}\n"
+                if key in self._index:
+                    lines[self._index[key]] = line
+                else:
+                    if lines and not lines[-1].endswith("\n"):
+                        lines[-1] += "\n"
+                    lines.append(line)
+            self._write(lines)
+            self._stat = None
+            self._load()
+        return changed
+
+    def _write(self, lines):
+        directory = os.path.dirname(self.path) or "."
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".hostapd.conf.")
+        try:
+            with os.fdopen(fd, "w") as f:
+                f.writelines(lines)
+                f.flush()
+                os.fsync(f.fileno())
+            os.chmod(tmp_path, 0o600)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+
+        dir_fd = os.open(directory, os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+    def _ctrl_path(self):
+        ctrl_interface = self.get("ctrl_interface")
+        iface = self.get("interface") or self.ap_iface
+        if not ctrl_interface or not iface:
+            return None
+        # "DIR=/path GROUP=name" form or a bare directory
+        if ctrl_interface.startswith("DIR="):
+            ctrl_interface = ctrl_interface[4:].split()[0]
+        return os.path.join(ctrl_interface, iface)
+
+    def _ctrl(self, *args, timeout=5.0):
+        """Send one command to hostapd's control socket; True if it answered OK"""
+        path = self._ctrl_path()
+        if not path:
+            return False
+        # hostapd replies to the sender's address, so the client socket needs a path too
+        local = os.path.join(
+            tempfile.gettempdir(), f"portal_hostapd_{os.getpid()}_{next(self._client_ids)}"
+        )
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        try:
+            sock.bind(local)
+            sock.settimeout(timeout)
+            sock.connect(path)
+            sock.send(" ".join(args).encode())
+            return sock.recv(4096).strip() == b"OK"
+        except OSError as e:
+            # Only the command name: SET arguments may be the passphrase
+            logger.warning(f"hostapd control command {args[0]} failed: {e}")
+            return False
+        finally:
+            sock.close()
+            try:
+                os.unlink(local)
+            except OSError:
+                pass
+
+    def apply(self, changes):
+        """Persist `changes` and push them to the running hostapd"""
+        try:
+            changed = self.set(changes)
+        except ValueError as e:
+            return {"success": False, "error": str(e)}
+        except PermissionError:
+            logger.error(f"Permission denied writing {self.path}")
+            return {"success": False, "error": "Permission denied"}
+        except OSError as e:
+            logger.error(f"Failed to write {self.path}: {e}")
+            return {"success": False, "error": "Failed to write configuration"}
+
+        if not changed:
+            return {"success": True, "changed": [], "method": None}
+
+        if self._ctrl_path() and all(key in self.RELOADABLE for key in changed):
+            if all(self._ctrl("SET", key, str(self.get(key))) for key in changed) and self._ctrl("RELOAD"):
+                return {"success": True, "changed": changed, "method": "reload"}
+            logger.warning("hostapd reload over the control socket failed, restarting hostapd")
+
+        code, _, err = self.run_command(f"sudo systemctl restart {self.service}", timeout=10)
+        if code != 0:
+            logger.error(f"Failed to restart {self.service}: {err}")
+            return {"success": False, "changed": changed, "error": f"Failed to restart {self.service}"}
+        return {"success": True, "changed": changed, "method": "restart"}
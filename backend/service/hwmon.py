@@ -0,0 +1,168 @@
+"""
+hwmon device discovery and persistent sysfs attribute access.
+
+hwmon indices are assigned in probe order and change between boots, so
+devices are located by their `name` attribute. Attribute files are kept
+open and accessed with pread/pwrite on the cached descriptor; when the
+device goes away (driver reload, re-enumeration) the next access
+re-discovers it and re-opens the file once before giving up. When no
+device is present at all, accesses fail fast with NoDeviceError and the
+sysfs scan is repeated at most every `rescan_interval` seconds.
+"""
+
+import errno
+import glob
+import logging
+import os
+import re
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+HWMON_ROOT = "/sys/class/hwmon"
+
+# Errors that mean the descriptor points at a device that no longer exists
+STALE_ERRNOS = (errno.ENODEV, errno.ENOENT, errno.EBADF, errno.ENXIO, errno.ESTALE)
+
+
+class NoDeviceError(FileNotFoundError):
+    """No hwmon device is present; not retried like a stale descriptor"""
+
+
+def find_hwmon(names=(), root=HWMON_ROOT, require="pwm1"):
+    """Path of the first hwmon device whose `name` is in `names`.
+
+    Without a name match, falls back to the first device that has a
+    `require` attribute; returns None if nothing fits.
+    """
+    devices = sorted(
+        glob.glob(os.path.join(root, "hwmon*")),
+        key=lambda p: int(re.sub(r"\D", "", os.path.basename(p)) or 0)
+    )
+    fallback = None
+    for path in devices:
+        try:
+            with open(os.path.join(path, "name"), "r") as f:
+                name = f.read().strip()
+        except OSError:
+            name = None
+        if name in names:
+            return path
+        if fallback is None and require and os.path.exists(os.path.join(path, require)):
+            fallback = path
+    return fallback
+
+
+class HwmonDevice:
+    """One hwmon device, found by name or pinned to a fixed `path`"""
+
+    def __init__(self, names=(), root=HWMON_ROOT, path=None, rescan_interval=30.0):
+        self.names = tuple(names)
+        self.root = root
+        self.fixed_path = path
+        self.rescan_interval = rescan_interval
+        self._lock = threading.Lock()
+        self._path = None
+        self._next_scan = 0.0
+        self._attrs = {}
+
+    @property
+    def path(self):
+        with self._lock:
+            if self._path is None and time.monotonic() >= self._next_scan:
+                path = self.fixed_path or find_hwmon(self.names, self.root)
+                if path and os.path.isdir(path):
+                    self._path = path
+                    logger.info(f"Using hwmon device {path}")
+                else:
+                    self._next_scan = time.monotonic() + self.rescan_interval
+            return self._path
+
+    def invalidate(self):
+        """Forget the device and close every attribute; the next access re-discovers"""
+        with self._lock:
+            self._path = None
+            self._next_scan = 0.0
+            attrs = list(self._attrs.values())
+        for attr in attrs:
+            attr.close()
+
+    def attr(self, name):
+        with self._lock:
+            attr = self._attrs.get(name)
+            if attr is None:
+                attr = self._attrs[name] = SysfsAttr(self, name)
+            return attr
+
+    def has(self, name):
+        path = self.path
+        return bool(path) and os.path.exists(os.path.join(path, name))
+
+    def indices(self, prefix, suffix=""):
+        """Sorted N for which `<prefix>N<suffix>` exists, e.g. ("pwm", "") -> [1, 2]"""
+        path = self.path
+        if not path:
+            return []
+        pattern = re.compile(rf"^{re.escape(prefix)}(\d+){re.escape(suffix)}$")
+        found = []
+        for entry in os.listdir(path):
+            match = pattern.match(entry)
+            if match:
+                found.append(int(match.group(1)))
+        return sorted(found)
+
+    def close(self):
+        self.invalidate()
+
+
+class SysfsAttr:
+    """A sysfs attribute file held open for pread/pwrite"""
+
+    def __init__(self, device, name):
+        self.device = device
+        self.name = name
+        self._lock = threading.Lock()
+        self._fd = None
+
+    def _open(self):
+        # Caller holds self._lock
+        if self._fd is None:
+            path = self.device.path
+            if not path:
+                raise NoDeviceError(errno.ENOENT, "No hwmon device", self.name)
+            try:
+                self._fd = os.open(os.path.join(path, self.name), os.O_RDWR)
+            except PermissionError:
+                self._fd = os.open(os.path.join(path, self.name), os.O_RDONLY)
+        return self._fd
+
+    def close(self):
+        with self._lock:
+            if self._fd is not None:
+                try:
+                    os.close(self._fd)
+                except OSError:
+                    pass
+                self._fd = None
+
+    def _retry(self, operation):
+        try:
+            with self._lock:
+                return operation(self._open())
+        except NoDeviceError:
+            raise
+        except OSError as e:
+            if e.errno not in STALE_ERRNOS:
+                raise
+        logger.warning(f"hwmon attribute {self.name} went stale, re-discovering")
+        self.device.invalidate()
+        with self._lock:
+            return operation(self._open())
+
+    def read_int(self):
+        return int(self._retry(lambda fd: os.pread(fd, 32, 0)).strip())
+
+    def write_int(self, value):
+        data = str(int(value)).encode()
+        self._retry(lambda fd: os.pwrite(fd, data, 0))
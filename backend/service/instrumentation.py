@@ -0,0 +1,186 @@
+"""
+Process-wide latency histograms and counters, rendered for Prometheus.
+
+Recording is a bisect plus a few integer increments under one lock, so it
+stays on in production. External commands are labelled by program name
+only (`sudo` skipped), never by arguments, to keep label cardinality low
+and secrets out of the output.
+"""
+
+import bisect
+import functools
+import os
+import subprocess
+import threading
+import time
+
+# Upper bounds in seconds; +Inf is implicit
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Histogram:
+    __slots__ = ("counts", "total", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.total += seconds
+        self.count += 1
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = {}
+        self._help = {}
+
+    def describe(self, name, kind, text):
+        self._help[name] = (kind, text)
+
+    def observe(self, name, labels, seconds):
+        """Add `seconds` to histogram `name`; `labels` is a tuple of (key, value)"""
+        with self._lock:
+            histogram = self._histograms.get((name, labels))
+            if histogram is None:
+                histogram = self._histograms[(name, labels)] = Histogram()
+            histogram.observe(seconds)
+
+    def inc(self, name, labels, amount=1):
+        with self._lock:
+            key = (name, labels)
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def render(self):
+        """Prometheus text exposition format (version 0.0.4)"""
+        with self._lock:
+            histograms = [
+                (name, labels, list(h.counts), h.total, h.count)
+                for (name, labels), h in self._histograms.items()
+            ]
+            counters = list(self._counters.items())
+
+        lines = []
+        described = set()
+
+        def header(name):
+            if name not in described and name in self._help:
+                kind, text = self._help[name]
+                lines.append(f"# HELP {name} {text}")
+                lines.append(f"# TYPE {name} {kind}")
+                described.add(name)
+
+        for name, labels, counts, total, count in sorted(histograms):
+            header(name)
+            cumulative = 0
+            for bound, bucket_count in zip(BUCKETS + ("+Inf",), counts):
+                cumulative += bucket_count
+                le = bound if bound == "+Inf" else repr(bound)
+                lines.append(f"{name}_bucket{_labels(labels + (('le', le),))} {cumulative}")
+            lines.append(f"{name}_sum{_labels(labels)} {total:.6f}")
+            lines.append(f"{name}_count{_labels(labels)} {count}")
+
+        for (name, labels), value in sorted(counters):
+            header(name)
+            lines.append(f"{name}{_labels(labels)} {value}")
+
+        return "\n".join(lines) + "\n"
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    parts = []
+    for key, value in labels:
+        value = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        parts.append(f'{key}="{value}"')
+    return "{" + ",".join(parts) + "}"
+
+
+registry = MetricsRegistry()
+registry.describe("portal_http_request_duration_seconds", "histogram",
+                  "Flask request handling time by route")
+registry.describe("portal_http_requests_total", "counter",
+                  "Flask requests by route, method and status")
+registry.describe("portal_command_duration_seconds", "histogram",
+                  "External command wall time by program")
+registry.describe("portal_command_forks_total", "counter",
+                  "External commands started, by program")
+registry.describe("portal_command_timeouts_total", "counter",
+                  "External commands killed after their timeout")
+registry.describe("portal_command_failures_total", "counter",
+                  "External commands that exited non-zero or could not start")
+
+
+def command_name(command):
+    """Program name for a command string or argv list"""
+    argv = command.split() if isinstance(command, str) else list(command)
+    while argv and (argv[0] == "sudo" or argv[0].startswith("-")):
+        argv = argv[1:]
+    return os.path.basename(argv[0]) if argv else "unknown"
+
+
+def record_command(command, seconds, outcome):
+    """`outcome` is "ok", "failed", "timeout" or "error" (could not start)"""
+    labels = (("command", command_name(command)),)
+    if outcome != "error":
+        registry.inc("portal_command_forks_total", labels)
+    registry.observe("portal_command_duration_seconds", labels, seconds)
+    if outcome == "timeout":
+        registry.inc("portal_command_timeouts_total", labels)
+    elif outcome in ("failed", "error"):
+        registry.inc("portal_command_failures_total", labels)
+
+
+def timed_command(fn):
+    """Instrument a `run_command(cmd, timeout)` returning `(code, out, err)`"""
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        command = kwargs.get("cmd")
+        if command is None:
+            command = next((a for a in args if isinstance(a, str)), "")
+        start = time.perf_counter()
+        result = fn(*args, **kwargs)
+        code, _, err = result
+        if code == 0:
+            outcome = "ok"
+        elif code == -1 and err == "Command timed out":
+            outcome = "timeout"
+        elif code == -1:
+            outcome = "error"
+        else:
+            outcome = "failed"
+        record_command(command, time.perf_counter() - start, outcome)
+        return result
+    return wrapper
+
+
+def run(args, **kwargs):
+    """`subprocess.run` that records the command's timing and outcome"""
+    start = time.perf_counter()
+    outcome = "error"
+    try:
+        result = subprocess.run(args, **kwargs)
+        outcome = "ok" if result.returncode == 0 else "failed"
+        return result
+    except subprocess.TimeoutExpired:
+        outcome = "timeout"
+        raise
+    except subprocess.CalledProcessError:
+        outcome = "failed"
+        raise
+    finally:
+        record_command(args, time.perf_counter() - start, outcome)
+
+
+def observe_request(endpoint, method, status, seconds):
+    registry.observe(
+        "portal_http_request_duration_seconds", (("endpoint", endpoint), ("method", method)), seconds
+    )
+    registry.inc(
+        "portal_http_requests_total", (("endpoint", endpoint), ("method", method), ("status", status))
+    )
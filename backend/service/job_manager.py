@@ -0,0 +1,122 @@
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+class JobManager:
+    """Runs long radio operations off the request thread.
+
+    `submit` returns immediately with a job id; the work runs on a small
+    worker pool and reports its phases through a `progress(phase)` callback.
+    A job submitted while another job with the same kind and key is still
+    queued or running is deduplicated onto the existing one; its `on_done`
+    still runs when that job finishes.
+
+    `lanes` maps a lane name to `(workers, kinds)`: jobs of those kinds run
+    on that lane's own pool, so they never occupy the default workers.
+    """
+
+    ACTIVE = ("queued", "running")
+
+    def __init__(self, workers=1, retention=600, lanes=None):
+        self.retention = retention
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+        self._lane_pools = {}
+        for lane, (lane_workers, kinds) in (lanes or {}).items():
+            pool = ThreadPoolExecutor(max_workers=lane_workers, thread_name_prefix=f"job-{lane}")
+            for kind in kinds:
+                self._lane_pools[kind] = pool
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._active_keys = {}
+        self._on_done = {}
+
+    def submit(self, kind, key, fn, on_done=None):
+        """Queue `fn(progress)`; returns `(job, created)`"""
+        with self._lock:
+            self._prune()
+            existing = self._active_keys.get((kind, key))
+            if existing is not None:
+                if on_done is not None:
+                    self._on_done[existing].append(on_done)
+                return self._snapshot(self._jobs[existing]), False
+
+            job_id = uuid.uuid4().hex[:12]
+            job = {
+                "id": job_id,
+                "kind": kind,
+                "key": key,
+                "status": "queued",
+                "phase": "queued",
+                "phases": [{"phase": "queued", "at": time.time()}],
+                "result": None,
+                "created_at": time.time(),
+                "finished_at": None
+            }
+            self._jobs[job_id] = job
+            self._active_keys[(kind, key)] = job_id
+            self._on_done[job_id] = [on_done] if on_done is not None else []
+            snapshot = self._snapshot(job)
+
+        self._lane_pools.get(kind, self._pool).submit(self._execute, job, fn)
+        return snapshot, True
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return self._snapshot(job) if job else None
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False)
+        for pool in set(self._lane_pools.values()):
+            pool.shutdown(wait=False)
+
+    def _execute(self, job, fn):
+        def progress(phase):
+            with self._lock:
+                if job["phase"] == phase:
+                    return
+                job["phase"] = phase
+                job["phases"].append({"phase": phase, "at": time.time()})
+
+        with self._lock:
+            job["status"] = "running"
+
+        try:
+            result = fn(progress)
+            status = "succeeded" if result.get("success") else "failed"
+        except Exception as e:
+            logger.error(f"Job {job['id']} ({job['kind']}) crashed: {e}")
+            result = {"success": False, "error": str(e)}
+            status = "failed"
+
+        with self._lock:
+            job["status"] = status
+            job["result"] = result
+            job["finished_at"] = time.time()
+            self._active_keys.pop((job["kind"], job["key"]), None)
+            callbacks = self._on_done.pop(job["id"], [])
+
+        for on_done in callbacks:
+            try:
+                on_done(result)
+            except Exception as e:
+                logger.error(f"Job {job['id']} completion hook failed: {e}")
+
+    def _prune(self):
+        # Caller holds self._lock
+        cutoff = time.time() - self.retention
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job["finished_at"] is not None and job["finished_at"] < cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def _snapshot(self, job):
+        snapshot = dict(job)
+        snapshot["phases"] = list(job["phases"])
+        return snapshot
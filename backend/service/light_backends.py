@@ -0,0 +1,215 @@
+"""
+PWM output backends for LightService.
+
+Each backend drives numbered channels with a duty cycle in percent
+(0-100): GPIO pins through `RPi.GPIO.PWM`, channels of a kernel
+`/sys/class/pwm` chip, or an in-memory simulation.
+"""
+
+import errno
+import logging
+import os
+import threading
+import time
+
+try:
+    import RPi.GPIO as GPIO
+except (ImportError, RuntimeError):
+    GPIO = None
+
+logger = logging.getLogger(__name__)
+
+SYS_CLASS_PWM = "/sys/class/pwm"
+
+
+class SimulatedPwmBackend:
+    """Keeps duty cycles in memory; `writes` counts hardware updates"""
+
+    name = "simulated"
+
+    def __init__(self):
+        self.duties = {}
+        self.writes = 0
+
+    def open(self, channel):
+        self.duties.setdefault(channel, 0.0)
+
+    def set(self, channel, duty):
+        self.duties[channel] = duty
+        self.writes += 1
+
+    def close(self):
+        pass
+
+
+class GpioPwmBackend:
+    """Software PWM on BCM-numbered GPIO pins via RPi.GPIO"""
+
+    name = "gpio"
+
+    def __init__(self, frequency=800):
+        if GPIO is None:
+            raise RuntimeError("RPi.GPIO is not available")
+        self.frequency = frequency
+        self._pwm = {}
+        GPIO.setwarnings(False)
+        GPIO.setmode(GPIO.BCM)
+
+    def open(self, channel):
+        if channel not in self._pwm:
+            GPIO.setup(channel, GPIO.OUT)
+            pwm = GPIO.PWM(channel, self.frequency)
+            pwm.start(0)
+            self._pwm[channel] = pwm
+
+    def set(self, channel, duty):
+        self._pwm[channel].ChangeDutyCycle(duty)
+
+    def close(self):
+        for pwm in self._pwm.values():
+            pwm.stop()
+        self._pwm.clear()
+        GPIO.cleanup()
+
+
+class SysfsPwmBackend:
+    """Hardware PWM channels of one `/sys/class/pwm/pwmchipN`.
+
+    Channels are exported on first use; `duty_cycle` stays open and is
+    written with pwrite.
+    """
+
+    name = "sysfs"
+
+    def __init__(self, chip=os.path.join(SYS_CLASS_PWM, "pwmchip0"), period_ns=1000000):
+        if not os.path.isdir(chip):
+            raise RuntimeError(f"PWM chip {chip} not found")
+        self.chip = chip
+        self.period_ns = period_ns
+        self._fds = {}
+
+    def _write(self, path, value):
+        with open(path, "w") as f:
+            f.write(str(value))
+
+    def open(self, channel):
+        if channel in self._fds:
+            return
+        base = os.path.join(self.chip, f"pwm{channel}")
+        if not os.path.isdir(base):
+            try:
+                self._write(os.path.join(self.chip, "export"), channel)
+            except OSError as e:
+                if e.errno != errno.EBUSY:
+                    raise
+            # udev may need a moment to make the new attributes writable
+            for _ in range(20):
+                if os.access(os.path.join(base, "period"), os.W_OK):
+                    break
+                time.sleep(0.05)
+        # The kernel rejects a period shorter than the current duty cycle,
+        # so clear the duty cycle left by a previous user first
+        self._write(os.path.join(base, "duty_cycle"), 0)
+        self._write(os.path.join(base, "period"), self.period_ns)
+        self._write(os.path.join(base, "enable"), 1)
+        self._fds[channel] = os.open(os.path.join(base, "duty_cycle"), os.O_WRONLY)
+
+    def set(self, channel, duty):
+        value = int(self.period_ns * duty / 100.0)
+        os.pwrite(self._fds[channel], str(value).encode(), 0)
+
+    def close(self):
+        for channel, fd in self._fds.items():
+            try:
+                os.pwrite(fd, b"0", 0)
+                os.close(fd)
+            except OSError:
+                pass
+        self._fds.clear()
+
+
+def create_light_backend(preference="auto", **kwargs):
+    """"gpio", "sysfs", "simulated", or "auto" for the first that works"""
+    order = {
+        "auto": (GpioPwmBackend, SysfsPwmBackend),
+        "gpio": (GpioPwmBackend,),
+        "sysfs": (SysfsPwmBackend,),
+        "simulated": ()
+    }.get(preference, ())
+    for backend_class in order:
+        try:
+            return backend_class(**kwargs)
+        except Exception as e:
+            logger.info(f"{backend_class.name} PWM backend unavailable: {e}")
+    if preference not in ("auto", "simulated"):
+        logger.warning(f"{preference} PWM backend requested but unavailable, simulating")
+    return SimulatedPwmBackend()
+
+
+class FadeScheduler:
+    """One thread that runs every active fade.
+
+    `submit({channel: duty}, duration)` starts (or retargets) fades for a
+    batch of channels at once. The thread steps all of them every `tick`
+    seconds, writes a channel only when its rounded duty changes, and
+    sleeps while nothing is fading.
+    """
+
+    def __init__(self, backend, tick=0.02):
+        self.backend = backend
+        self.tick = tick
+        self._cond = threading.Condition()
+        self._duties = {}
+        self._fades = {}
+        self._thread = None
+        self._stopped = False
+
+    def current(self, channel):
+        with self._cond:
+            return self._duties.get(channel, 0.0)
+
+    def submit(self, targets, duration=0.0):
+        now = time.monotonic()
+        with self._cond:
+            for channel, duty in targets.items():
+                start = self._duties.get(channel, 0.0)
+                if duration <= 0 or start == duty:
+                    self._fades.pop(channel, None)
+                    self._apply(channel, duty)
+                else:
+                    self._fades[channel] = (start, duty, now, duration)
+            if self._fades and self._thread is None and not self._stopped:
+                self._thread = threading.Thread(target=self._run, name="light-fader", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    def _apply(self, channel, duty):
+        # Caller holds self._cond
+        duty = round(duty, 1)
+        if self._duties.get(channel) == duty:
+            return
+        self._duties[channel] = duty
+        try:
+            self.backend.set(channel, duty)
+        except Exception as e:
+            logger.error(f"PWM write to channel {channel} failed: {e}")
+
+    def _run(self):
+        with self._cond:
+            while not self._stopped:
+                if not self._fades:
+                    self._cond.wait()
+                    continue
+                now = time.monotonic()
+                for channel, (start, end, began, duration) in list(self._fades.items()):
+                    progress = min(1.0, (now - began) / duration)
+                    self._apply(channel, start + (end - start) * progress)
+                    if progress >= 1.0:
+                        del self._fades[channel]
+                self._cond.wait(self.tick)
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._fades.clear()
+            self._cond.notify()
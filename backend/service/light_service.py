@@ -1,75 +1,204 @@
+import copy
 import logging
-import subprocess
-import os
+import threading
+
+from .light_backends import FadeScheduler, create_light_backend
 
 logger = logging.getLogger(__name__)
 
+# Light -> output channels: "pin" for a single dimmable channel, or "pins"
+# with "red"/"green"/"blue" channels for an RGB light
+DEFAULT_LIGHTS = {
+    'main': {
+        'name': 'Main Light',
+        'pin': 17  # GPIO pin for main light
+    },
+    'secondary': {
+        'name': 'Secondary Light',
+        'pin': 18  # GPIO pin for secondary light
+    }
+}
+
+# Color -> (red, green, blue) channel levels, 0.0-1.0
+COLOR_MAP = {
+    'white': (1.0, 1.0, 1.0),
+    'warm': (1.0, 0.7, 0.35),
+    'cool': (0.75, 0.85, 1.0),
+    'red': (1.0, 0.0, 0.0),
+    'green': (0.0, 1.0, 0.0),
+    'blue': (0.0, 0.0, 1.0),
+    'yellow': (1.0, 0.85, 0.0),
+    'purple': (0.6, 0.0, 1.0)
+}
+
+def parse_light_pins(spec):
+    """Lights from "id=pin,id=red/green/blue,...", e.g. "main=17,strip=22/23/24".
+    
+    A single pin is a dimmable light, three pins make an RGB light. Raises
+    ValueError on a malformed entry.
+    """
+    lights = {}
+    for entry in spec.split(','):
+        entry = entry.strip()
+        if not entry:
+            continue
+        light_id, _, pins = entry.partition('=')
+        light_id = light_id.strip()
+        try:
+            pins = [int(pin) for pin in pins.split('/')]
+        except ValueError:
+            raise ValueError(f"Invalid pins for light {light_id!r}: {entry}")
+        if not light_id or len(pins) not in (1, 3):
+            raise ValueError(f"Light entry must be id=pin or id=red/green/blue: {entry}")
+        light = {'name': f"{light_id.replace('_', ' ').title()} Light"}
+        if len(pins) == 1:
+            light['pin'] = pins[0]
+        else:
+            light['pins'] = dict(zip(('red', 'green', 'blue'), pins))
+        lights[light_id] = light
+    return lights
+
 class LightService:
-    def __init__(self):
-        self.lights = {
-            'main': {
-                'name': 'Main Light',
-                'pin': 17,  # GPIO pin for main light
-                'state': False,
-                'brightness': 100,
-                'color': 'white'
-            },
-            'secondary': {
-                'name': 'Secondary Light', 
-                'pin': 18,  # GPIO pin for secondary light
-                'state': False,
-                'brightness': 100,
-                'color': 'white'
-            }
-        }
+    """PWM-dimmed lights, single-channel or RGB.
+    
+    Every change (toggle, brightness, color or a whole scene) is turned
+    into per-channel duty cycles and handed to one FadeScheduler, which
+    fades all affected channels together over `fade` seconds. Changes
+    are applied under one lock so concurrent requests cannot interleave
+    their read-modify-apply of a light's state.
+    """
+    
+    def __init__(self, lights=None, backend="auto", fade=0.3):
+        self.lights = copy.deepcopy(lights or DEFAULT_LIGHTS)
+        for light in self.lights.values():
+            light.setdefault('state', False)
+            light.setdefault('brightness', 100)
+            light.setdefault('color', 'white')
+        
+        if isinstance(backend, str):
+            backend = create_light_backend(backend)
+        self.backend = backend
+        self.fade = fade
+        self._lock = threading.RLock()
         self.gpio_available = self.check_gpio_availability()
         self.setup_gpio()
+        # After setup, which may have fallen back to the simulated backend
+        self.fader = FadeScheduler(self.backend)
     
     def check_gpio_availability(self):
-        """Check if GPIO is available on the system"""
-        try:
-            import RPi.GPIO as GPIO
-            return True
-        except (ImportError, RuntimeError):
-            logger.warning("RPi.GPIO not available, using simulated GPIO")
-            return False
+        """Whether lights are driven by real PWM hardware"""
+        return self.backend.name != "simulated"
     
     def setup_gpio(self):
-        """Setup GPIO pins for light control"""
-        if self.gpio_available:
+        """Open every output channel at 0% duty"""
+        try:
+            for light in self.lights.values():
+                for channel, _ in self._channels(light):
+                    self.backend.open(channel)
+            logger.info(f"Light PWM setup completed ({self.backend.name} backend)")
+        except Exception as e:
+            logger.error(f"Light PWM setup failed, simulating: {e}")
+            self.backend = create_light_backend("simulated")
+            self.gpio_available = False
+            for light in self.lights.values():
+                for channel, _ in self._channels(light):
+                    self.backend.open(channel)
+    
+    def _channels(self, light):
+        """(channel, level) pairs for a light's current color"""
+        pins = light.get('pins')
+        if not pins:
+            return [(light['pin'], 1.0)]
+        levels = COLOR_MAP.get(light['color'], COLOR_MAP['white'])
+        return [(pins[name], level) for name, level in zip(('red', 'green', 'blue'), levels)]
+    
+    def _targets(self, light):
+        scale = light['brightness'] if light['state'] else 0
+        return {channel: scale * level for channel, level in self._channels(light)}
+    
+    def _validate(self, light_id, change):
+        """Normalized copy of a scene entry; raises ValueError if it is invalid"""
+        if light_id not in self.lights:
+            raise ValueError(f"Light {light_id} not found")
+        normalized = {}
+        if 'state' in change:
+            if not isinstance(change['state'], bool):
+                raise ValueError("State must be true or false")
+            normalized['state'] = change['state']
+        if 'brightness' in change:
             try:
-                import RPi.GPIO as GPIO
-                GPIO.setmode(GPIO.BCM)
-                for light_id, light_config in self.lights.items():
-                    GPIO.setup(light_config['pin'], GPIO.OUT)
-                    GPIO.output(light_config['pin'], GPIO.LOW)
-                logger.info("GPIO setup completed successfully")
-            except Exception as e:
-                logger.error(f"GPIO setup failed: {e}")
-                self.gpio_available = False
-        else:
-            logger.info("Using simulated GPIO for light control")
+                brightness = int(change['brightness'])
+            except (TypeError, ValueError):
+                raise ValueError("Invalid brightness value")
+            if not 0 <= brightness <= 100:
+                raise ValueError("Brightness must be between 0 and 100")
+            normalized['brightness'] = brightness
+        if 'color' in change:
+            if change['color'] not in COLOR_MAP:
+                raise ValueError(f"Invalid color. Must be one of: {list(COLOR_MAP)}")
+            normalized['color'] = change['color']
+        return normalized
+    
+    def apply_scene(self, changes, fade=None):
+        """Apply {light_id: {"state", "brightness", "color"}} as one batch.
+        
+        Every entry is validated before anything changes; all affected
+        channels then fade together.
+        """
+        with self._lock:
+            return self._apply_scene(changes, fade)
+    
+    def _apply_scene(self, changes, fade):
+        # Caller holds self._lock
+        try:
+            validated = {light_id: self._validate(light_id, change) for light_id, change in changes.items()}
+        except ValueError as e:
+            return {"success": False, "error": str(e)}
+        
+        try:
+            targets = {}
+            for light_id, change in validated.items():
+                light = self.lights[light_id]
+                if change.get('brightness', 0) > 0 and 'state' not in change:
+                    light['state'] = True
+                light.update(change)
+                targets.update(self._targets(light))
+            self.fader.submit(targets, self.fade if fade is None else fade)
+            
+            return {
+                "success": True,
+                "lights": {light_id: self._light_status(light_id) for light_id in validated},
+                "message": f"Updated {len(validated)} light(s)"
+            }
+        
+        except Exception as e:
+            logger.error(f"Error applying light scene: {e}")
+            return {"success": False, "error": str(e)}
+    
+    def _light_status(self, light_id):
+        light = self.lights[light_id]
+        return {
+            'id': light_id,
+            'name': light['name'],
+            'state': light['state'],
+            'brightness': light['brightness'],
+            'color': light['color'],
+            'rgb': bool(light.get('pins')),
+            'gpio_available': self.gpio_available
+        }
     
     def get_status(self):
         """Get status of all lights"""
         try:
-            lights_status = []
-            for light_id, light_config in self.lights.items():
-                lights_status.append({
-                    'id': light_id,
-                    'name': light_config['name'],
-                    'state': light_config['state'],
-                    'brightness': light_config['brightness'],
-                    'color': light_config['color'],
-                    'gpio_available': self.gpio_available
-                })
+            lights_status = [self._light_status(light_id) for light_id in self.lights]
             
             return {
                 "lights": lights_status,
                 "gpio_available": self.gpio_available,
+                "backend": self.backend.name,
                 "total_lights": len(lights_status)
             }
-            
+        
         except Exception as e:
             logger.error(f"Error getting lights status: {e}")
             return {
@@ -80,103 +209,54 @@ class LightService:
     
     def toggle_light(self, light_id):
         """Toggle light on/off"""
-        try:
-            if light_id not in self.lights:
-                return {"success": False, "error": f"Light {light_id} not found"}
-            
-            light = self.lights[light_id]
-            new_state = not light['state']
-            
-            # Control actual GPIO if available
-            if self.gpio_available:
-                import RPi.GPIO as GPIO
-                GPIO.output(light['pin'], GPIO.HIGH if new_state else GPIO.LOW)
-            
-            light['state'] = new_state
-            
-            return {
-                "success": True,
-                "light_id": light_id,
-                "state": new_state,
-                "message": f"Light turned {'on' if new_state else 'off'}"
-            }
-            
-        except Exception as e:
-            logger.error(f"Error toggling light {light_id}: {e}")
-            return {
-                "success": False,
-                "error": str(e)
-            }
+        if light_id not in self.lights:
+            return {"success": False, "error": f"Light {light_id} not found"}
+        
+        with self._lock:
+            new_state = not self.lights[light_id]['state']
+            result = self._apply_scene({light_id: {'state': new_state}}, None)
+        if not result["success"]:
+            return result
+        
+        return {
+            "success": True,
+            "light_id": light_id,
+            "state": new_state,
+            "message": f"Light turned {'on' if new_state else 'off'}"
+        }
     
     def set_brightness(self, light_id, brightness):
         """Set light brightness (0-100)"""
-        try:
-            if light_id not in self.lights:
-                return {"success": False, "error": f"Light {light_id} not found"}
-            
-            brightness = int(brightness)
-            if not 0 <= brightness <= 100:
-                return {"success": False, "error": "Brightness must be between 0 and 100"}
-            
-            light = self.lights[light_id]
-            light['brightness'] = brightness
-            
-            # For real hardware, you would use PWM here
-            if self.gpio_available and brightness > 0:
-                light['state'] = True
-            
-            return {
-                "success": True,
-                "light_id": light_id,
-                "brightness": brightness,
-                "message": f"Brightness set to {brightness}%"
-            }
-            
-        except ValueError:
-            return {"success": False, "error": "Invalid brightness value"}
-        except Exception as e:
-            logger.error(f"Error setting brightness for {light_id}: {e}")
-            return {
-                "success": False,
-                "error": str(e)
-            }
+        result = self.apply_scene({light_id: {'brightness': brightness}})
+        if not result["success"]:
+            return result
+        
+        brightness = result["lights"][light_id]['brightness']
+        return {
+            "success": True,
+            "light_id": light_id,
+            "brightness": brightness,
+            "message": f"Brightness set to {brightness}%"
+        }
     
     def set_color(self, light_id, color):
-        """Set light color (for RGB lights)"""
-        try:
-            if light_id not in self.lights:
-                return {"success": False, "error": f"Light {light_id} not found"}
-            
-            valid_colors = ['white', 'warm', 'cool', 'red', 'green', 'blue', 'yellow', 'purple']
-            if color not in valid_colors:
-                return {"success": False, "error": f"Invalid color. Must be one of: {valid_colors}"}
-            
-            light = self.lights[light_id]
-            light['color'] = color
-            
-            # For real RGB LED control, you would set GPIO pins for each color channel
-            logger.info(f"Setting light {light_id} color to {color}")
-            
-            return {
-                "success": True,
-                "light_id": light_id,
-                "color": color,
-                "message": f"Color set to {color}"
-            }
-            
-        except Exception as e:
-            logger.error(f"Error setting color for {light_id}: {e}")
-            return {
-                "success": False,
-                "error": str(e)
-            }
+        """Set light color; drives the RGB channels of RGB lights"""
+        result = self.apply_scene({light_id: {'color': color}})
+        if not result["success"]:
+            return result
+        
+        return {
+            "success": True,
+            "light_id": light_id,
+            "color": color,
+            "message": f"Color set to {color}"
+        }
     
     def cleanup(self):
-        """Cleanup GPIO resources"""
-        if self.gpio_available:
-            try:
-                import RPi.GPIO as GPIO
-                GPIO.cleanup()
-                logger.info("GPIO cleanup completed")
-            except Exception as e:
-                logger.error(f"GPIO cleanup failed: {e}")
\ No newline at end of file
+        """Stop fades and release the PWM outputs"""
+        self.fader.stop()
+        try:
+            self.backend.close()
+            logger.info("Light PWM cleanup completed")
+        except Exception as e:
+            logger.error(f"Light PWM cleanup failed: {e}")
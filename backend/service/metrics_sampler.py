@@ -0,0 +1,138 @@
+import logging
+import math
+import threading
+import time
+from array import array
+
+logger = logging.getLogger(__name__)
+
+class MetricsSampler:
+    """Collects system metrics on a fixed interval into ring buffers.
+
+    Each metric is a preallocated `array('d')` of `capacity` samples sharing
+    one timestamp array; missing readings are stored as NaN. Reads only
+    look at the buffers and never trigger a collection.
+    """
+
+    def __init__(self, system_monitor, fan_service=None, interval=5.0, capacity=720):
+        self.system_monitor = system_monitor
+        self.fan_service = fan_service
+        self.interval = interval
+        self.capacity = capacity
+
+        self.metrics = ["cpu", "memory", "disk"]
+        self.metrics += sorted(system_monitor.get_thermal_zones())
+        if fan_service is not None:
+            self.metrics.append("fan_pwm")
+
+        self._lock = threading.Lock()
+        self._timestamps = array("d", [0.0]) * capacity
+        self._series = {name: array("d", [math.nan]) * capacity for name in self.metrics}
+        self._head = 0
+        self._count = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="metrics-sampler", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _collect(self):
+        sample = {}
+        collectors = {
+            "cpu": self.system_monitor.get_cpu_usage,
+            "memory": lambda: self.system_monitor.get_memory()["percent"],
+            "disk": lambda: self.system_monitor.get_disk()["percent"]
+        }
+        for name, collect in collectors.items():
+            try:
+                sample[name] = float(collect())
+            except Exception as e:
+                logger.debug(f"Sampling {name} failed: {e}")
+
+        sample.update(self.system_monitor.get_thermal_zones())
+
+        if self.fan_service is not None:
+            try:
+                sample["fan_pwm"] = float(self.fan_service.get_status()["pwm_value"])
+            except Exception as e:
+                logger.debug(f"Sampling fan_pwm failed: {e}")
+        return sample
+
+    def record(self, sample, timestamp=None):
+        with self._lock:
+            index = self._head
+            self._timestamps[index] = time.time() if timestamp is None else timestamp
+            for name, series in self._series.items():
+                series[index] = sample.get(name, math.nan)
+            self._head = (index + 1) % self.capacity
+            self._count = min(self._count + 1, self.capacity)
+
+    def _run(self):
+        while not self._stop.is_set():
+            started = time.monotonic()
+            try:
+                self.record(self._collect())
+            except Exception as e:
+                logger.error(f"Metrics sampling failed: {e}")
+            self._stop.wait(max(0.0, self.interval - (time.monotonic() - started)))
+
+    def _ordered(self, name):
+        """Timestamps and values of `name`, oldest first. Caller holds the lock."""
+        start = (self._head - self._count) % self.capacity
+        indexes = [(start + i) % self.capacity for i in range(self._count)]
+        series = self._series[name]
+        return [self._timestamps[i] for i in indexes], [series[i] for i in indexes]
+
+    def latest(self):
+        """The most recent sample, or None before the first collection"""
+        with self._lock:
+            if not self._count:
+                return None
+            index = (self._head - 1) % self.capacity
+            sample = {"timestamp": self._timestamps[index]}
+            for name, series in self._series.items():
+                value = series[index]
+                sample[name] = None if math.isnan(value) else value
+            return sample
+
+    def history(self, metric, window=600, buckets=60):
+        """Downsample the last `window` seconds of `metric` into `buckets`
+        buckets, each with min/max/avg over the samples it holds."""
+        if metric not in self._series:
+            raise KeyError(metric)
+
+        with self._lock:
+            timestamps, values = self._ordered(metric)
+
+        now = time.time()
+        since = now - window
+        width = window / float(buckets)
+        stats = {}
+        for ts, value in zip(timestamps, values):
+            if ts < since or math.isnan(value):
+                continue
+            bucket = min(int((ts - since) // width), buckets - 1)
+            entry = stats.get(bucket)
+            if entry is None:
+                stats[bucket] = [value, value, value, 1]
+            else:
+                entry[0] = min(entry[0], value)
+                entry[1] = max(entry[1], value)
+                entry[2] += value
+                entry[3] += 1
+
+        return [
+            {
+                "t": round(since + bucket * width, 3),
+                "min": entry[0],
+                "max": entry[1],
+                "avg": round(entry[2] / entry[3], 2),
+                "count": entry[3]
+            }
+            for bucket, entry in sorted(stats.items())
+        ]
@@ -0,0 +1,222 @@
+"""
+Interface, route and wireless link inspection without spawning processes.
+
+Addresses come from an rtnetlink RTM_GETADDR dump, routes from
+/proc/net/route and /proc/net/ipv6_route, and link statistics from
+/proc/net/wireless. Every path is a parameter so recorded procfs files
+can be used instead of the live ones.
+"""
+
+import logging
+import os
+import socket
+import struct
+
+logger = logging.getLogger(__name__)
+
+PROC_NET_ROUTE = "/proc/net/route"
+PROC_NET_IPV6_ROUTE = "/proc/net/ipv6_route"
+PROC_NET_IF_INET6 = "/proc/net/if_inet6"
+PROC_NET_WIRELESS = "/proc/net/wireless"
+PROC_NET_ARP = "/proc/net/arp"
+SYS_CLASS_NET = "/sys/class/net"
+
+# linux/netlink.h, linux/rtnetlink.h, linux/if_addr.h
+NETLINK_ROUTE = 0
+NLMSG_ERROR = 2
+NLMSG_DONE = 3
+NLM_F_REQUEST = 0x1
+NLM_F_DUMP = 0x300
+RTM_NEWADDR = 20
+RTM_GETADDR = 22
+IFA_ADDRESS = 1
+IFA_LOCAL = 2
+
+NLMSG_HDR = struct.Struct("=IHHII")
+IFADDRMSG = struct.Struct("=BBBBI")
+RTATTR = struct.Struct("=HH")
+
+# Seconds to wait for each rtnetlink reply before falling back to procfs
+NETLINK_TIMEOUT = 2.0
+
+
+def _align(length):
+    return (length + 3) & ~3
+
+
+def _netlink_addresses(index):
+    """Dump addresses for interface `index` over rtnetlink"""
+    ipv4, ipv6 = [], []
+    sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, NETLINK_ROUTE)
+    try:
+        # A dump that never reaches NLMSG_DONE must not hang a request thread
+        sock.settimeout(NETLINK_TIMEOUT)
+        sock.bind((0, 0))
+        payload = IFADDRMSG.pack(socket.AF_UNSPEC, 0, 0, 0, 0)
+        sock.send(NLMSG_HDR.pack(
+            NLMSG_HDR.size + len(payload), RTM_GETADDR, NLM_F_REQUEST | NLM_F_DUMP, 1, 0
+        ) + payload)
+
+        while True:
+            data = sock.recv(65536)
+            offset = 0
+            while offset + NLMSG_HDR.size <= len(data):
+                length, msg_type, _, _, _ = NLMSG_HDR.unpack_from(data, offset)
+                if length < NLMSG_HDR.size:
+                    return ipv4, ipv6
+                if msg_type == NLMSG_DONE:
+                    return ipv4, ipv6
+                if msg_type == NLMSG_ERROR:
+                    raise OSError("rtnetlink returned an error")
+                if msg_type == RTM_NEWADDR:
+                    family, prefixlen, _, _, if_index = IFADDRMSG.unpack_from(
+                        data, offset + NLMSG_HDR.size
+                    )
+                    if if_index == index:
+                        attrs = {}
+                        attr = offset + NLMSG_HDR.size + IFADDRMSG.size
+                        while attr + RTATTR.size <= offset + length:
+                            rta_len, rta_type = RTATTR.unpack_from(data, attr)
+                            if rta_len < RTATTR.size:
+                                break
+                            attrs[rta_type] = data[attr + RTATTR.size:attr + rta_len]
+                            attr += _align(rta_len)
+                        # IFA_LOCAL is the interface's own address on point-to-point links
+                        raw = attrs.get(IFA_LOCAL) or attrs.get(IFA_ADDRESS)
+                        if raw:
+                            address = f"{socket.inet_ntop(family, raw)}/{prefixlen}"
+                            (ipv4 if family == socket.AF_INET else ipv6).append(address)
+                offset += _align(length)
+    finally:
+        sock.close()
+
+
+def _proc_ipv6_addresses(iface, path=PROC_NET_IF_INET6):
+    addresses = []
+    with open(path, "r") as f:
+        for line in f:
+            fields = line.split()
+            if len(fields) >= 6 and fields[5] == iface:
+                raw = bytes.fromhex(fields[0])
+                addresses.append(f"{socket.inet_ntop(socket.AF_INET6, raw)}/{int(fields[2], 16)}")
+    return addresses
+
+
+def get_addresses(iface):
+    """IPv4/IPv6 addresses of `iface` as CIDR strings"""
+    try:
+        ipv4, ipv6 = _netlink_addresses(socket.if_nametoindex(iface))
+        return {"ipv4": ipv4, "ipv6": ipv6}
+    except OSError as e:
+        logger.debug(f"rtnetlink address dump failed for {iface}: {e}")
+
+    try:
+        ipv6 = _proc_ipv6_addresses(iface)
+    except OSError:
+        ipv6 = []
+    return {"ipv4": [], "ipv6": ipv6}
+
+
+def get_default_routes(route_path=PROC_NET_ROUTE, ipv6_route_path=PROC_NET_IPV6_ROUTE):
+    """Default routes sorted by metric, lowest (preferred) first"""
+    routes = []
+    try:
+        with open(route_path, "r") as f:
+            next(f, None)
+            for line in f:
+                fields = line.split()
+                if len(fields) < 8 or fields[1] != "00000000" or fields[7] != "00000000":
+                    continue
+                routes.append({
+                    "family": "ipv4",
+                    "iface": fields[0],
+                    "gateway": socket.inet_ntoa(struct.pack("<I", int(fields[2], 16))),
+                    "metric": int(fields[6])
+                })
+    except OSError as e:
+        logger.debug(f"Cannot read {route_path}: {e}")
+
+    try:
+        with open(ipv6_route_path, "r") as f:
+            for line in f:
+                fields = line.split()
+                if len(fields) < 10 or fields[0] != "0" * 32 or fields[1] != "00":
+                    continue
+                if fields[9] == "lo":
+                    continue
+                routes.append({
+                    "family": "ipv6",
+                    "iface": fields[9],
+                    "gateway": socket.inet_ntop(socket.AF_INET6, bytes.fromhex(fields[4])),
+                    "metric": int(fields[5], 16)
+                })
+    except OSError as e:
+        logger.debug(f"Cannot read {ipv6_route_path}: {e}")
+
+    routes.sort(key=lambda r: r["metric"])
+    return routes
+
+
+def get_wireless_link(iface, path=PROC_NET_WIRELESS):
+    """Link quality, signal and noise for `iface`, or None if not listed"""
+    try:
+        with open(path, "r") as f:
+            for line in f:
+                name, sep, rest = line.partition(":")
+                if not sep or name.strip() != iface:
+                    continue
+                fields = rest.split()
+                return {
+                    "status": fields[0],
+                    "quality": float(fields[1].rstrip(".")),
+                    "level": float(fields[2].rstrip(".")),
+                    "noise": float(fields[3].rstrip("."))
+                }
+    except (OSError, ValueError, IndexError) as e:
+        logger.debug(f"Cannot read wireless stats for {iface}: {e}")
+    return None
+
+
+def get_neighbors(iface=None, path=PROC_NET_ARP):
+    """IPv4 neighbour table as {ip: mac}, optionally limited to `iface`"""
+    neighbors = {}
+    try:
+        with open(path, "r") as f:
+            next(f, None)
+            for line in f:
+                fields = line.split()
+                if len(fields) < 6 or (iface and fields[5] != iface):
+                    continue
+                # Flags 0x0 marks an incomplete entry
+                if int(fields[2], 16) == 0 or fields[3] == "00:00:00:00:00:00":
+                    continue
+                neighbors[fields[0]] = fields[3].lower()
+    except (OSError, ValueError) as e:
+        logger.debug(f"Cannot read neighbour table: {e}")
+    return neighbors
+
+
+def get_operstate(iface, sys_class_net=SYS_CLASS_NET):
+    try:
+        with open(os.path.join(sys_class_net, iface, "operstate"), "r") as f:
+            return f.read().strip()
+    except OSError:
+        return "unknown"
+
+
+def inspect_interface(iface):
+    """Structured state of `iface` plus the system's default routes"""
+    addresses = get_addresses(iface)
+    routes = get_default_routes()
+    default = routes[0] if routes else None
+    return {
+        "interface": iface,
+        "operstate": get_operstate(iface),
+        "ipv4": addresses["ipv4"],
+        "ipv6": addresses["ipv6"],
+        "gateway": default["gateway"] if default else None,
+        "gateway_iface": default["iface"] if default else None,
+        "metric": default["metric"] if default else None,
+        "default_routes": routes,
+        "wireless": get_wireless_link(iface)
+    }
@@ -0,0 +1,97 @@
+import logging
+import shlex
+
+from .connection_snapshot import ConnectionSnapshot, WIFI_TYPES, split_terse
+
+logger = logging.getLogger(__name__)
+
+class NmcliBackend:
+    """NetworkManager access through the nmcli command line tool"""
+
+    name = "nmcli"
+
+    def __init__(self, run_command):
+        self.run_command = run_command
+
+    def scan(self, iface, timeout=15):
+        code, out, err = self.run_command(
+            f"nmcli -t -f BSSID,SSID,SIGNAL,SECURITY dev wifi list ifname {iface}",
+            timeout=timeout
+        )
+
+        networks = []
+        if code == 0 and out:
+            for line in out.splitlines():
+                parts = split_terse(line)
+                if len(parts) >= 4:
+                    bssid, ssid, signal, security = parts[0], parts[1], parts[2], parts[3]
+                    if ssid and ssid != "--":
+                        networks.append({
+                            "ssid": ssid,
+                            "bssid": bssid.lower(),
+                            "signal": int(signal) if signal.isdigit() else None,
+                            "security": security
+                        })
+        return networks
+
+    def connect(self, iface, ssid, password="", timeout=40, progress=None):
+        ssid_escaped = shlex.quote(ssid)
+
+        if password:
+            pwd_escaped = shlex.quote(password)
+            cmd = f"nmcli --wait 40 dev wifi connect {ssid_escaped} password {pwd_escaped} ifname {iface}"
+        else:
+            cmd = f"nmcli --wait 40 dev wifi connect {ssid_escaped} ifname {iface}"
+
+        code, _, _ = self.run_command(cmd, timeout=timeout)
+        return code == 0
+
+    def load_snapshot(self):
+        """Two nmcli calls regardless of profile count: a listing and one
+        bulk detail query for every WiFi profile's SSID."""
+        code, listing, err = self.run_command("nmcli -t -f NAME,UUID,TYPE,DEVICE connection show")
+        if code != 0:
+            raise RuntimeError(err or "Failed to list connections")
+
+        wifi_uuids = []
+        for line in listing.splitlines():
+            parts = split_terse(line)
+            if len(parts) >= 4 and parts[2] in WIFI_TYPES:
+                wifi_uuids.append(parts[1])
+
+        details = ""
+        if wifi_uuids:
+            args = " ".join(f"uuid {shlex.quote(uuid)}" for uuid in wifi_uuids)
+            code, details, _ = self.run_command(
+                f"nmcli -t -f connection.uuid,802-11-wireless.ssid connection show {args}"
+            )
+            if code != 0:
+                details = ""
+
+        snapshot = ConnectionSnapshot.from_nmcli(listing, details)
+        for conn in snapshot.wifi_connections():
+            if conn["device"]:
+                conn["bssid"] = self._active_bssid(conn["device"])
+        return snapshot
+
+    def _active_bssid(self, iface):
+        """BSSID of the AP `iface` is associated with, from the cached scan list"""
+        code, out, _ = self.run_command(
+            f"nmcli -t -f IN-USE,BSSID dev wifi list ifname {iface} --rescan no", timeout=5
+        )
+        if code == 0:
+            for line in out.splitlines():
+                parts = split_terse(line)
+                if len(parts) >= 2 and parts[0] == "*":
+                    return parts[1].lower()
+        return None
+
+    def delete_connection(self, uuid):
+        code, _, _ = self.run_command(f"nmcli connection delete uuid {shlex.quote(uuid)}")
+        return code == 0
+
+    def set_managed(self, iface, managed):
+        code, _, _ = self.run_command(
+            f"nmcli device set {iface} managed {'yes' if managed else 'no'}", timeout=5
+        )
+        return code == 0
@@ -0,0 +1,53 @@
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+logger = logging.getLogger(__name__)
+
+class ProbeExecutor:
+    """Run independent status probes concurrently with per-probe deadlines.
+
+    A probe that misses its deadline is reported as "timeout" and left to
+    finish in the background; its own command timeout bounds how long it
+    can hold a worker.
+    """
+
+    def __init__(self, max_workers=8):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="probe")
+
+    def run(self, probes, default_deadline=3.0):
+        """Run `probes` ({name: callable or (callable, deadline)}).
+
+        Returns {name: {"status": "ok" | "timeout" | "error", "value": ...,
+        "elapsed_ms": ...}}. Total latency is the slowest probe, capped by
+        its deadline.
+        """
+        start = time.monotonic()
+        pending = {}
+        for name, probe in probes.items():
+            fn, deadline = probe if isinstance(probe, tuple) else (probe, default_deadline)
+            pending[name] = (self._pool.submit(self._timed, fn), start + deadline)
+
+        results = {}
+        for name, (future, deadline_at) in pending.items():
+            try:
+                value, elapsed = future.result(timeout=max(0.0, deadline_at - time.monotonic()))
+                results[name] = {"status": "ok", "value": value, "elapsed_ms": elapsed}
+            except TimeoutError:
+                results[name] = {
+                    "status": "timeout",
+                    "value": None,
+                    "elapsed_ms": round((deadline_at - start) * 1000)
+                }
+            except Exception as e:
+                logger.error(f"Probe {name} failed: {e}")
+                results[name] = {"status": "error", "value": None, "error": str(e)}
+        return results
+
+    def _timed(self, fn):
+        start = time.monotonic()
+        value = fn()
+        return value, round((time.monotonic() - start) * 1000)
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False)
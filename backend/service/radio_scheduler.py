@@ -0,0 +1,109 @@
+import itertools
+import threading
+import time
+
+class RadioScheduler:
+    """Serializes operations on one radio.
+
+    Kinds, highest priority first: "connect", "mutate", "scan". One
+    operation holds the radio at a time; waiting operations are granted in
+    priority order, FIFO within a kind. Calls with the same kind and `key`
+    made while one is pending coalesce onto that call's result.
+
+    Read-only queries (profile listing, link signal) don't go through the
+    scheduler at all, so they never wait behind a connect or scan.
+    """
+
+    PRIORITY = {"connect": 0, "mutate": 1, "scan": 2}
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._seq = itertools.count()
+        self._waiting = []
+        self._busy = False
+        self._inflight = {}
+        self._stats = {
+            kind: {"count": 0, "coalesced": 0, "wait_ms_total": 0.0, "wait_ms_max": 0.0}
+            for kind in self.PRIORITY
+        }
+
+    def run(self, kind, fn, key=None):
+        """Run `fn()` as a `kind` operation once the radio is available"""
+        if kind not in self.PRIORITY:
+            raise ValueError(f"Unknown radio operation kind: {kind}")
+        if key is None:
+            return self._execute(kind, fn)
+
+        with self._cond:
+            entry = self._inflight.get((kind, key))
+            owner = entry is None
+            if owner:
+                entry = {"done": threading.Event(), "result": None, "error": None}
+                self._inflight[(kind, key)] = entry
+            else:
+                self._stats[kind]["coalesced"] += 1
+
+        if not owner:
+            entry["done"].wait()
+            if entry["error"] is not None:
+                raise entry["error"]
+            return entry["result"]
+
+        try:
+            entry["result"] = self._execute(kind, fn)
+            return entry["result"]
+        except Exception as e:
+            entry["error"] = e
+            raise
+        finally:
+            with self._cond:
+                self._inflight.pop((kind, key), None)
+            entry["done"].set()
+
+    def _execute(self, kind, fn):
+        self._acquire(kind)
+        try:
+            return fn()
+        finally:
+            self._release(kind)
+
+    def _acquire(self, kind):
+        ticket = (self.PRIORITY[kind], next(self._seq))
+        started = time.monotonic()
+        with self._cond:
+            self._waiting.append(ticket)
+            while not self._can_run(kind, ticket):
+                self._cond.wait()
+            self._waiting.remove(ticket)
+            self._busy = True
+
+            waited = (time.monotonic() - started) * 1000
+            stats = self._stats[kind]
+            stats["count"] += 1
+            stats["wait_ms_total"] += waited
+            stats["wait_ms_max"] = max(stats["wait_ms_max"], waited)
+
+    def _can_run(self, kind, ticket):
+        # Caller holds self._cond
+        return not self._busy and ticket == min(self._waiting)
+
+    def _release(self, kind):
+        with self._cond:
+            self._busy = False
+            self._cond.notify_all()
+
+    def metrics(self):
+        with self._cond:
+            kinds = {}
+            for kind, stats in self._stats.items():
+                kinds[kind] = {
+                    "count": stats["count"],
+                    "coalesced": stats["coalesced"],
+                    "wait_ms_avg": round(stats["wait_ms_total"] / stats["count"], 1) if stats["count"] else 0.0,
+                    "wait_ms_max": round(stats["wait_ms_max"], 1)
+                }
+            return {
+                "queue_depth": len(self._waiting),
+                "exclusive_active": self._busy,
+                "kinds": kinds
+            }
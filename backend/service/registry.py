@@ -0,0 +1,45 @@
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+class ServiceRegistry:
+    """Services constructed on first use instead of at import time.
+
+    `register(name, factory)` records how to build a service; `get(name)`
+    builds it once and returns the same instance afterwards. Each service
+    has its own lock, so a slow constructor (probing hardware, running a
+    CLI) only blocks callers of that service.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._factories = {}
+        self._locks = {}
+        self._instances = {}
+
+    def register(self, name, factory):
+        with self._lock:
+            self._factories[name] = factory
+            self._locks[name] = threading.Lock()
+
+    def get(self, name):
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+        with self._lock:
+            factory = self._factories[name]
+            lock = self._locks[name]
+        with lock:
+            instance = self._instances.get(name)
+            if instance is None:
+                logger.info(f"Starting {name} service")
+                instance = self._instances[name] = factory()
+            return instance
+
+    def peek(self, name):
+        """The service if it was already created, else None"""
+        return self._instances.get(name)
+
+    def created(self):
+        return sorted(self._instances)
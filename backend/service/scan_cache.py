@@ -0,0 +1,85 @@
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+class ScanCache:
+    """TTL cache with single-flight refresh and stale-while-revalidate.
+
+    `fetch` is called with no arguments and must return a result dict with
+    a "success" key. Only successful results are cached; a failed refresh
+    keeps serving the previous result.
+    """
+
+    def __init__(self, fetch, ttl=20.0):
+        self.fetch = fetch
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._result = None
+        self._fetched_at = None
+        self._inflight = None
+
+    def get(self, refresh=False, timeout=None):
+        """Return `(result, age)`.
+
+        A fresh result is returned as is. A stale one is returned
+        immediately while a background refresh runs. With no cached
+        result, or with `refresh=True`, the caller waits for the in-flight
+        scan, which is shared by every concurrent caller.
+        """
+        with self._lock:
+            result = self._result
+            age = None if self._fetched_at is None else time.monotonic() - self._fetched_at
+            if result is not None and not refresh:
+                if age > self.ttl:
+                    self._start_refresh()
+                return result, age
+            inflight = self._start_refresh()
+
+        inflight["done"].wait(timeout)
+        with self._lock:
+            if inflight["done"].is_set():
+                result = inflight["result"]
+                if result.get("success") or self._result is None:
+                    return result, 0.0
+            if self._result is not None:
+                return self._result, time.monotonic() - self._fetched_at
+        return {"success": False, "error": "Scan timed out"}, None
+
+    def peek(self):
+        """Return `(result, age)` of the cached scan without ever scanning"""
+        with self._lock:
+            if self._result is None:
+                return None, None
+            return self._result, time.monotonic() - self._fetched_at
+
+    def invalidate(self):
+        """Mark the cached result stale so the next read revalidates it"""
+        with self._lock:
+            if self._fetched_at is not None:
+                self._fetched_at = time.monotonic() - self.ttl - 1
+
+    def _start_refresh(self):
+        # Caller holds self._lock
+        if self._inflight is None:
+            self._inflight = {"done": threading.Event(), "result": None}
+            threading.Thread(
+                target=self._refresh, args=(self._inflight,), name="scan-refresh", daemon=True
+            ).start()
+        return self._inflight
+
+    def _refresh(self, inflight):
+        try:
+            result = self.fetch()
+        except Exception as e:
+            logger.error(f"Scan refresh failed: {e}")
+            result = {"success": False, "error": str(e)}
+
+        with self._lock:
+            if result.get("success"):
+                self._result = result
+                self._fetched_at = time.monotonic()
+            inflight["result"] = result
+            self._inflight = None
+        inflight["done"].set()
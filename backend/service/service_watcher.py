@@ -0,0 +1,150 @@
+import logging
+import threading
+import time
+
+try:
+    import dbus
+except ImportError:
+    dbus = None
+
+logger = logging.getLogger(__name__)
+
+SYSTEMD_BUS = "org.freedesktop.systemd1"
+SYSTEMD_PATH = "/org/freedesktop/systemd1"
+SYSTEMD_MANAGER_IFACE = SYSTEMD_BUS + ".Manager"
+SYSTEMD_UNIT_IFACE = SYSTEMD_BUS + ".Unit"
+PROPS_IFACE = "org.freedesktop.DBus.Properties"
+
+
+def unit_name(unit):
+    return unit if "." in unit else f"{unit}.service"
+
+
+def parse_systemctl_show(output):
+    """Parse `systemctl show -p Id,ActiveState,SubState u1 u2 ...` output"""
+    states = {}
+    for block in output.split("\n\n"):
+        fields = {}
+        for line in block.splitlines():
+            key, sep, value = line.partition("=")
+            if sep:
+                fields[key.strip()] = value.strip()
+        if fields.get("Id"):
+            states[fields["Id"]] = {
+                "active_state": fields.get("ActiveState", "unknown"),
+                "sub_state": fields.get("SubState", "unknown")
+            }
+    return states
+
+
+class ServiceStateWatcher:
+    """Cached ActiveState/SubState for a set of systemd units.
+
+    A background thread refreshes every unit at once every `interval`
+    seconds, over the systemd D-Bus API when dbus-python is available
+    (no process spawned) and otherwise with one batched `systemctl show`.
+    `kick()` forces an early refresh after the portal itself starts or
+    restarts a unit. Readers only ever touch the in-memory table.
+    """
+
+    def __init__(self, run_command, units=("hostapd", "dnsmasq", "NetworkManager"),
+                 interval=10.0, backend="auto", bus=None):
+        self.run_command = run_command
+        self.units = [unit_name(u) for u in units]
+        self.interval = interval
+        self._bus = bus
+        self._use_dbus = backend in ("auto", "dbus") and (bus is not None or dbus is not None)
+        self._unit_paths = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._states = {}
+        self._refreshed_mono = None
+
+    def start(self):
+        if self._thread is None:
+            self.refresh()
+            self._thread = threading.Thread(
+                target=self._run, name="service-watcher", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def kick(self):
+        self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            if not self._stop.is_set():
+                self.refresh()
+
+    def refresh(self):
+        states = None
+        if self._use_dbus:
+            try:
+                states = self._read_dbus()
+            except Exception as e:
+                logger.warning(f"systemd D-Bus query failed, using systemctl: {e}")
+                self._use_dbus = False
+        if states is None:
+            states = self._read_systemctl()
+
+        with self._lock:
+            for unit, state in states.items():
+                previous = self._states.get(unit)
+                if previous and previous["active_state"] != state["active_state"]:
+                    logger.info(f"{unit}: {previous['active_state']} -> {state['active_state']}")
+                self._states[unit] = state
+            self._refreshed_mono = time.monotonic()
+
+    def _read_dbus(self):
+        if self._bus is None:
+            self._bus = dbus.SystemBus()
+        manager = self._bus.get_object(SYSTEMD_BUS, SYSTEMD_PATH)
+        states = {}
+        for unit in self.units:
+            path = self._unit_paths.get(unit)
+            if path is None:
+                path = manager.LoadUnit(unit, dbus_interface=SYSTEMD_MANAGER_IFACE)
+                self._unit_paths[unit] = path
+            props = self._bus.get_object(SYSTEMD_BUS, path).GetAll(
+                SYSTEMD_UNIT_IFACE, dbus_interface=PROPS_IFACE
+            )
+            states[unit] = {
+                "active_state": str(props.get("ActiveState", "unknown")),
+                "sub_state": str(props.get("SubState", "unknown"))
+            }
+        return states
+
+    def _read_systemctl(self):
+        code, out, err = self.run_command(
+            "systemctl show -p Id,ActiveState,SubState " + " ".join(self.units), timeout=5
+        )
+        if code != 0:
+            logger.error(f"systemctl show failed: {err}")
+            return {}
+        return parse_systemctl_show(out)
+
+    def get(self, unit):
+        """Cached state of `unit`, or None if it has never been read"""
+        with self._lock:
+            state = self._states.get(unit_name(unit))
+            if state is None:
+                return None
+            state = dict(state)
+            state["active"] = state["active_state"] == "active"
+            state["age"] = round(time.monotonic() - self._refreshed_mono, 1)
+        return state
+
+    def is_active(self, unit):
+        state = self.get(unit)
+        return state["active"] if state else None
+
+    def snapshot(self):
+        return {unit: self.get(unit) for unit in self.units}
@@ -0,0 +1,79 @@
+import re
+import subprocess
+import threading
+import time
+
+from . import instrumentation
+from .net_inspect import PROC_NET_WIRELESS, get_wireless_link
+
+
+def dbm_to_percent(dbm):
+    """Map RSSI in dBm to 0-100 the same way NetworkManager does"""
+    return max(0, min(100, 2 * (int(dbm) + 100)))
+
+
+class SignalTable:
+    """Latest signal strength per BSSID, filled in by the scan path.
+
+    Lookups by SSID resolve to the strongest BSSID seen for it and are
+    O(1). Entries older than `max_age` seconds are treated as missing.
+    """
+
+    def __init__(self, max_age=45.0):
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._by_bssid = {}
+        self._best_by_ssid = {}
+
+    def update(self, networks):
+        """Replace the table with the APs from one scan"""
+        now = time.monotonic()
+        by_bssid = {}
+        best_by_ssid = {}
+        for net in networks:
+            bssid = net.get("bssid")
+            signal = net.get("signal")
+            if not bssid or signal is None:
+                continue
+            entry = (net.get("ssid"), signal, now)
+            by_bssid[bssid] = entry
+            best = best_by_ssid.get(entry[0])
+            if best is None or by_bssid[best][1] < signal:
+                best_by_ssid[entry[0]] = bssid
+        with self._lock:
+            self._by_bssid = by_bssid
+            self._best_by_ssid = best_by_ssid
+
+    def lookup(self, ssid=None, bssid=None):
+        with self._lock:
+            if bssid is None:
+                bssid = self._best_by_ssid.get(ssid)
+            entry = self._by_bssid.get(bssid)
+        if entry is None or time.monotonic() - entry[2] > self.max_age:
+            return None
+        return entry[1]
+
+
+def read_link_signal(iface, proc_path=PROC_NET_WIRELESS):
+    """Signal of the associated link as 0-100, or None.
+
+    Reads /proc/net/wireless first and only forks `iw dev <iface> link`
+    when the driver does not report there.
+    """
+    link = get_wireless_link(iface, proc_path)
+    if link is not None:
+        if link["level"] < 0:
+            return dbm_to_percent(link["level"])
+        if link["quality"] > 0:
+            return max(0, min(100, int(link["quality"] * 100 / 70)))
+
+    try:
+        result = instrumentation.run(
+            ["iw", "dev", iface, "link"], capture_output=True, text=True, timeout=3
+        )
+        match = re.search(r"signal:\s*(-?\d+)\s*dBm", result.stdout)
+        if match:
+            return dbm_to_percent(match.group(1))
+    except (subprocess.TimeoutExpired, OSError):
+        pass
+    return None
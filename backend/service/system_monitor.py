@@ -1,43 +1,160 @@
-import subprocess
+import glob
 import os
+import threading
+import time
 
 class SystemMonitor:
-    def __init__(self):
-        pass
-    
-    def _run_cmd(self, cmd):
+    def __init__(self, disk_path="/mnt/data", proc_path="/proc", thermal_path="/sys/class/thermal"):
+        self.disk_path = disk_path
+        self.proc_path = proc_path
+        self.thermal_path = thermal_path
+        self._cpu_lock = threading.Lock()
+        self._last_cpu = None
+
+    def _read(self, path):
+        with open(path, "r") as f:
+            return f.read()
+
+    def _format_bytes(self, value, suffix):
+        """Human readable size, `free -h` (suffix "i") / `df -h` (suffix "") style"""
+        for unit in ("B", "K", "M", "G", "T"):
+            if value < 1024 or unit == "T":
+                break
+            value /= 1024.0
+        if unit == "B":
+            return f"{int(value)}B"
+        number = f"{value:.1f}" if value < 10 else f"{value:.0f}"
+        return f"{number}{unit}{suffix}"
+
+    def _read_cpu_times(self):
+        """Return (total, idle) jiffies from the aggregate line of /proc/stat"""
+        fields = self._read(os.path.join(self.proc_path, "stat")).split("\n", 1)[0].split()
+        values = [int(v) for v in fields[1:9]]
+        idle = values[3] + values[4]
+        return sum(values), idle
+
+    def get_cpu_usage(self):
+        """CPU usage in percent since the previous call.
+
+        The last /proc/stat sample is kept across calls; only the very first
+        call has to take two samples a short moment apart.
+        """
+        with self._cpu_lock:
+            previous = self._last_cpu
+            if previous is None:
+                previous = self._read_cpu_times()
+                time.sleep(0.1)
+            current = self._read_cpu_times()
+            self._last_cpu = current
+
+        total = current[0] - previous[0]
+        idle = current[1] - previous[1]
+        if total <= 0:
+            return 0.0
+        return round(100.0 * (total - idle) / total, 1)
+
+    def get_memory(self):
+        meminfo = {}
+        for line in self._read(os.path.join(self.proc_path, "meminfo")).splitlines():
+            key, _, rest = line.partition(":")
+            fields = rest.split()
+            if fields:
+                meminfo[key] = int(fields[0]) * 1024
+
+        total = meminfo["MemTotal"]
+        available = meminfo.get("MemAvailable", meminfo.get("MemFree", 0))
+        used = total - available
+        return {
+            "total": total,
+            "used": used,
+            "available": available,
+            "percent": round(100.0 * used / total, 1) if total else 0.0
+        }
+
+    def get_disk(self):
+        st = os.statvfs(self.disk_path)
+        total = st.f_blocks * st.f_frsize
+        used = (st.f_blocks - st.f_bfree) * st.f_frsize
+        return {
+            "total": total,
+            "used": used,
+            "available": st.f_bavail * st.f_frsize,
+            "percent": round(100.0 * used / total, 1) if total else 0.0
+        }
+
+    def get_thermal_zones(self):
+        """Temperatures of all thermal zones in degrees Celsius"""
+        zones = {}
+        for zone in sorted(glob.glob(os.path.join(self.thermal_path, "thermal_zone*"))):
+            try:
+                zones[os.path.basename(zone)] = int(self._read(os.path.join(zone, "temp"))) / 1000.0
+            except (OSError, ValueError):
+                continue
+        return zones
+
+    def get_temperature(self):
+        zone = os.path.join(self.thermal_path, "thermal_zone0")
+        temperature = int(self._read(os.path.join(zone, "temp"))) / 1000.0
         try:
-            result = subprocess.run(cmd, shell=True, capture_output=True, text=True, timeout=5)
-            return result.stdout.strip()
-        except Exception:
-            return ""
-    
-    def get_system_info(self):
+            label = self._read(os.path.join(zone, "type")).strip()
+        except OSError:
+            label = "System Temperature"
+        return {
+            "temperature": round(temperature, 2),
+            "source": "thermal_zone0",
+            "label": label
+        }
+
+    def get_uptime(self):
+        return float(self._read(os.path.join(self.proc_path, "uptime")).split()[0])
+
+    def get_system_info(self, cpu_usage=None):
+        """Current system summary.
+
+        get_cpu_usage() measures since its previous call, so when something
+        else samples CPU periodically pass its latest reading as `cpu_usage`
+        instead of taking another delta here.
+        """
         try:
-            cpu_output = self._run_cmd(
-                "top -bn1 | grep 'Cpu(s)' | awk '{print 100 - $8}'"
-            )
-            cpu_usage = float(cpu_output) if cpu_output else 0.0
-            
-            mem_output = self._run_cmd("free -h | awk 'NR==2 {printf \"%s/%s\", $3, $2}'")
-            
-            disk_output = self._run_cmd(
-                "df -h --output=used,size /mnt/data | awk 'NR==2 {printf \"%s/%s\", $1, $2}'"
-            )
-            temp_output = self._run_cmd("awk '{printf \"%.2f\", $1/1000}' /sys/class/thermal/thermal_zone0/temp")
-            temperature = float(temp_output) if temp_output else 0.0
-            
-            uptime_output = self._run_cmd(
-                "awk '{printf \"%dh %dm\", int($1/3600), int(($1%3600)/60)}' /proc/uptime"
-            )
-            uptime_formatted = uptime_output or "N/A"
-            
+            if cpu_usage is None:
+                cpu_usage = self.get_cpu_usage()
+
+            try:
+                memory = self.get_memory()
+                mem_output = f"{self._format_bytes(memory['used'], 'i')}/{self._format_bytes(memory['total'], 'i')}"
+            except (OSError, KeyError, ValueError):
+                memory, mem_output = None, None
+
+            try:
+                disk = self.get_disk()
+                disk_output = f"{self._format_bytes(disk['used'], '')}/{self._format_bytes(disk['total'], '')}"
+            except OSError:
+                disk, disk_output = None, None
+
+            try:
+                temperature = self.get_temperature()["temperature"]
+            except (OSError, ValueError):
+                temperature = 0.0
+
+            try:
+                uptime_seconds = self.get_uptime()
+                uptime_formatted = f"{int(uptime_seconds // 3600)}h {int((uptime_seconds % 3600) // 60)}m"
+            except (OSError, ValueError, IndexError):
+                uptime_seconds, uptime_formatted = None, None
+
             return {
                 "cpu_usage": cpu_usage,
                 "memory": mem_output or "N/A",
+                "memory_used": memory["used"] if memory else None,
+                "memory_total": memory["total"] if memory else None,
+                "memory_percent": memory["percent"] if memory else None,
                 "disk": disk_output or "N/A",
+                "disk_used": disk["used"] if disk else None,
+                "disk_total": disk["total"] if disk else None,
+                "disk_percent": disk["percent"] if disk else None,
                 "temperature": temperature,
-                "uptime": uptime_formatted
+                "uptime": uptime_formatted or "N/A",
+                "uptime_seconds": uptime_seconds
             }
         except Exception as e:
             return {"error": f"Failed to get system info: {str(e)}"}
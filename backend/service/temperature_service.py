@@ -1,13 +1,13 @@
 import subprocess
 import re
 import logging
-from system_monitor import SystemMonitor
+from .system_monitor import SystemMonitor
 
 logger = logging.getLogger(__name__)
 
 class TemperatureService:
-    def __init__(self):
-        self.system_monitor = SystemMonitor()
+    def __init__(self, system_monitor=None):
+        self.system_monitor = system_monitor or SystemMonitor()
         self.target_temperature = 23.0
     
     def get_status(self):
@@ -2,14 +2,54 @@ import logging
 import subprocess
 import shlex
 import re
+import threading
+import time
+
+from .connection_snapshot import WIFI_TYPES
+from .connection_tracker import ConnectionTracker
+from .instrumentation import timed_command
+from .dbus_backend import DBusBackend
+from .net_inspect import get_addresses
+from .nmcli_backend import NmcliBackend
+from .radio_scheduler import RadioScheduler
+from .scan_cache import ScanCache
+from .signal_table import SignalTable, read_link_signal
 
 logger = logging.getLogger(__name__)
 
+def create_backend(preference, run_command):
+    """Pick a NetworkManager backend: "dbus", "nmcli" or "auto".
+    
+    "auto" uses D-Bus when dbus-python is installed and NetworkManager
+    answers on the system bus, and falls back to nmcli otherwise.
+    """
+    if preference in ("auto", "dbus") and DBusBackend.is_available():
+        return DBusBackend()
+    if preference == "dbus":
+        logger.warning("D-Bus backend requested but unavailable, using nmcli")
+    return NmcliBackend(run_command)
+
 class WiFiService:
-    def __init__(self, client_iface="wlan0", ap_iface="p2p0"):
+    def __init__(self, client_iface="wlan0", ap_iface="p2p0", snapshot_ttl=2.0, backend="auto",
+                 scan_ttl=20.0, scan_timeout=15, signal_max_age=45.0):
         self.client_iface = client_iface
         self.ap_iface = ap_iface
+        if isinstance(backend, str):
+            backend = create_backend(backend, self.run_command)
+        self.backend = backend
+        self.radio = RadioScheduler()
+        logger.info(f"Using {self.backend.name} NetworkManager backend")
+        self.snapshot_ttl = snapshot_ttl
+        self._snapshot = None
+        self._snapshot_lock = threading.Lock()
+        self._snapshot_load_lock = threading.Lock()
+        self._snapshot_generation = 0
+        self.scan_timeout = scan_timeout
+        self.signal_table = SignalTable(max_age=signal_max_age)
+        self.scan_cache = ScanCache(lambda: self.scan_networks(timeout=self.scan_timeout), ttl=scan_ttl)
+        self.tracker = ConnectionTracker(client_iface, resolve=self._resolve_active)
     
+    @timed_command
     def run_command(self, cmd, timeout=30):
         p = None
         try:
@@ -48,29 +88,40 @@ class WiFiService:
             return None
         return name
     
+    def get_connection_snapshot(self, max_age=None):
+        """Return an indexed snapshot of all NetworkManager profiles.
+        
+        Listing profiles only talks to NetworkManager, not the radio, so it
+        does not go through the radio scheduler and never waits behind a
+        connect or scan. Concurrent callers share one load.
+        """
+        if max_age is None:
+            max_age = self.snapshot_ttl
+        with self._snapshot_load_lock:
+            with self._snapshot_lock:
+                snapshot = self._snapshot
+                generation = self._snapshot_generation
+            if snapshot is not None and snapshot.age() <= max_age:
+                return snapshot
+            snapshot = self.backend.load_snapshot()
+            with self._snapshot_lock:
+                # Keep it only if nothing invalidated the cache meanwhile
+                if generation == self._snapshot_generation:
+                    self._snapshot = snapshot
+            return snapshot
+    
+    def invalidate_snapshot(self):
+        with self._snapshot_lock:
+            self._snapshot = None
+            self._snapshot_generation += 1
+    
     def scan_networks(self, timeout=15):
         """Scan for available WiFi networks"""
         try:
-            code, out, err = self.run_command(
-                f"nmcli -t -f SSID,SIGNAL,SECURITY dev wifi list ifname {self.client_iface}",
-                timeout=timeout
+            networks = self.radio.run(
+                "scan", lambda: self.backend.scan(self.client_iface, timeout=timeout), key="scan"
             )
-            
-            networks = []
-            if code == 0 and out:
-                for line in out.splitlines():
-                    parts = line.split(":")
-                    if len(parts) >= 3:
-                        security = parts[-1]
-                        signal = parts[-2]
-                        ssid = ":".join(parts[:-2])
-                        if ssid and ssid != "--":
-                            networks.append({
-                                "ssid": ssid,
-                                "signal": int(signal) if signal.isdigit() else None,
-                                "security": security
-                            })
-            
+            self.signal_table.update(networks)
             networks.sort(key=lambda x: x["signal"] or 0, reverse=True)
             return {"success": True, "networks": networks}
         
@@ -78,8 +129,25 @@ class WiFiService:
             logger.error(f"Error scanning networks: {e}")
             return {"success": False, "error": str(e)}
     
-    def connect_network(self, ssid, password="", timeout=40):
-        """Connect to WiFi network"""
+    def get_scan_results(self, refresh=False):
+        """Scan results served from the shared scan cache.
+        
+        Returns the last scan immediately (refreshing it in the background
+        once older than the TTL); only the very first call or `refresh=True`
+        waits for the radio.
+        """
+        result, age = self.scan_cache.get(refresh=refresh, timeout=self.scan_timeout + 5)
+        result = dict(result)
+        result["age"] = round(age, 1) if age is not None else None
+        return result
+    
+    def connect_network(self, ssid, password="", timeout=40, progress=None):
+        """Connect to WiFi network.
+        
+        `progress(phase)` is called as the connect moves through "managed",
+        "associating", "dhcp" and "verified".
+        """
+        report = progress or (lambda phase: None)
         try:
             # Validate inputs
             if not self.sanitize_ssid(ssid):
@@ -88,55 +156,78 @@ class WiFiService:
             if not self.sanitize_password(password):
                 return {"success": False, "error": "Invalid password"}
             
-            # Set interface management
-            self.run_command(f"nmcli device set {self.client_iface} managed yes", timeout=5)
-            self.run_command(f"nmcli device set {self.ap_iface} managed no", timeout=5)
+            def associate():
+                # Interface setup and association hold the radio as one unit
+                for iface, managed in ((self.client_iface, True), (self.ap_iface, False)):
+                    try:
+                        self.backend.set_managed(iface, managed)
+                    except Exception as e:
+                        logger.warning(f"Could not set {iface} managed={managed}: {e}")
+                report("managed")
+                
+                report("associating")
+                return self.backend.connect(
+                    self.client_iface, ssid, password, timeout=timeout, progress=report
+                )
             
-            # Build connection command
-            ssid_escaped = shlex.quote(ssid)
+            connected = self.radio.run("connect", associate)
+            self.invalidate_snapshot()
             
-            if password:
-                pwd_escaped = shlex.quote(password)
-                cmd = f"nmcli --wait 40 dev wifi connect {ssid_escaped} password {pwd_escaped} ifname {self.client_iface}"
-            else:
-                cmd = f"nmcli --wait 40 dev wifi connect {ssid_escaped} ifname {self.client_iface}"
+            if not connected:
+                return {"success": False, "error": "Connection failed. Please try again"}
             
-            code, out, err = self.run_command(cmd, timeout=timeout)
+            report("dhcp")
+            if not self._wait_for_address(timeout=10):
+                logger.warning(f"No IPv4 address on {self.client_iface} after connecting to {ssid}")
             
-            if code == 0:
-                return {"success": True, "message": "Connected successfully"}
-            else:
-                return {"success": False, "error": "Connection failed. Please try again"}
+            active = self.get_connection_snapshot(max_age=0).active_on(self.client_iface)
+            if not active or active.get("ssid") != ssid:
+                return {"success": False, "error": "Connection could not be verified"}
+            report("verified")
+            
+            return {"success": True, "message": "Connected successfully"}
         
         except Exception as e:
             logger.error(f"Error connecting to network: {e}")
             return {"success": False, "error": str(e)}
     
+    def _wait_for_address(self, timeout=10):
+        deadline = time.monotonic() + timeout
+        while True:
+            if get_addresses(self.client_iface)["ipv4"]:
+                return True
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.5)
+    
+    def _resolve_active(self):
+        return self.get_connection_snapshot(max_age=0).active_on(self.client_iface)
+    
     def get_current_connection(self):
-        """Get currently connected WiFi network"""
+        """Get currently connected WiFi network.
+        
+        Answered from the connection tracker while it follows NetworkManager;
+        the snapshot and iwconfig are only consulted when it is not running.
+        """
         try:
-            # Check active connection on client interface
-            code, out, _ = self.run_command("nmcli -t -f NAME,TYPE,DEVICE connection show --active")
+            tracked = self.tracker.get()
+            if tracked["live"] and (tracked["state"] != "connected" or tracked["ssid"]):
+                if tracked["state"] != "connected":
+                    return {"success": True, "connected": False}
+                return {
+                    "success": True,
+                    "connected": True,
+                    "ssid": tracked["ssid"],
+                    "signal": self._get_signal_strength(tracked["ssid"]),
+                    "interface": self.client_iface
+                }
+            
+            snapshot = self.get_connection_snapshot()
             
             current_ssid = None
-            if code == 0 and out:
-                for line in out.splitlines():
-                    parts = line.split(":")
-                    if len(parts) >= 3 and parts[2] == self.client_iface:
-                        conn_name = parts[0]
-                        safe_conn_name = self.sanitize_connection_name(conn_name)
-                        if not safe_conn_name:
-                            continue
-                        
-                        # Get SSID from connection
-                        code2, out2, _ = self.run_command(
-                            f"nmcli -t -f 802-11-wireless.ssid connection show {shlex.quote(safe_conn_name)}"
-                        )
-                        if code2 == 0 and out2:
-                            ssid_line = out2.split(":", 1)
-                            if len(ssid_line) > 1:
-                                current_ssid = ssid_line[1].strip()
-                        break
+            active = snapshot.active_on(self.client_iface)
+            if active:
+                current_ssid = active.get("ssid")
             
             # Fallback: check iwconfig
             if not current_ssid:
@@ -165,49 +256,40 @@ class WiFiService:
             return {"success": False, "error": str(e)}
     
     def _get_signal_strength(self, ssid):
-        """Get signal strength for specific SSID"""
+        """Get signal strength for specific SSID.
+        
+        Served from the signal table the scan path keeps up to date, keyed
+        on the BSSID the interface is associated with: another AP of the
+        same SSID may be stronger but is not the one in use. When the BSSID
+        is unknown or its entry stale, the associated link itself is queried.
+        """
+        signal = None
         try:
-            code, out, _ = self.run_command(f"nmcli -t -f SSID,SIGNAL dev wifi list ifname {self.client_iface}")
-            if code == 0 and out:
-                for line in out.splitlines():
-                    parts = line.split(":")
-                    if len(parts) >= 2:
-                        scan_ssid = ":".join(parts[:-1])
-                        sig = parts[-1]
-                        if scan_ssid == ssid and sig.isdigit():
-                            return int(sig)
-            return None
-        except:
-            return None
+            active = self.get_connection_snapshot().active_on(self.client_iface)
+        except Exception as e:
+            logger.debug(f"No snapshot for signal lookup: {e}")
+            active = None
+        if active and active.get("ssid") == ssid and active.get("bssid"):
+            signal = self.signal_table.lookup(bssid=active["bssid"])
+        if signal is None:
+            signal = read_link_signal(self.client_iface)
+        return signal
     
     def get_saved_networks(self):
         """Get list of saved WiFi networks"""
         try:
-            code, out, _ = self.run_command("nmcli -t -f NAME,TYPE connection show")
+            snapshot = self.get_connection_snapshot()
             
             saved_networks = []
-            if code == 0 and out:
-                for line in out.splitlines():
-                    parts = line.split(":")
-                    if len(parts) >= 2 and "wifi" in parts[1].lower():
-                        conn_name = parts[0]
-                        safe_conn_name = self.sanitize_connection_name(conn_name)
-                        if not safe_conn_name:
-                            continue
-                        
-                        # Get SSID from connection
-                        code2, out2, _ = self.run_command(
-                            f"nmcli -t -f 802-11-wireless.ssid connection show {shlex.quote(safe_conn_name)}"
-                        )
-                        if code2 == 0 and out2:
-                            ssid_line = out2.split(":", 1)
-                            if len(ssid_line) > 1:
-                                ssid = ssid_line[1].strip()
-                                if ssid and ssid not in [n["ssid"] for n in saved_networks]:
-                                    saved_networks.append({
-                                        "ssid": ssid,
-                                        "connection_name": conn_name
-                                    })
+            seen = set()
+            for conn in snapshot.wifi_connections():
+                ssid = conn.get("ssid")
+                if ssid and ssid not in seen:
+                    seen.add(ssid)
+                    saved_networks.append({
+                        "ssid": ssid,
+                        "connection_name": conn["name"]
+                    })
             
             return {"success": True, "networks": saved_networks}
         
@@ -221,31 +303,17 @@ class WiFiService:
             if not ssid:
                 return {"success": False, "error": "SSID required"}
             
-            code, out, _ = self.run_command("nmcli -t -f NAME,TYPE connection show")
+            snapshot = self.get_connection_snapshot(max_age=0)
             
             deleted = False
-            if code == 0 and out:
-                for line in out.splitlines():
-                    parts = line.split(":")
-                    if len(parts) >= 2 and "wifi" in parts[1].lower():
-                        conn_name = parts[0]
-                        safe_conn_name = self.sanitize_connection_name(conn_name)
-                        if not safe_conn_name:
-                            continue
-                        
-                        code2, out2, _ = self.run_command(
-                            f"nmcli -t -f 802-11-wireless.ssid connection show {shlex.quote(safe_conn_name)}"
-                        )
-                        if code2 == 0 and out2:
-                            ssid_line = out2.split(":", 1)
-                            if len(ssid_line) > 1 and ssid_line[1].strip() == ssid:
-                                # Delete this connection
-                                code3, _, _ = self.run_command(
-                                    f"nmcli connection delete {shlex.quote(safe_conn_name)}"
-                                )
-                                if code3 == 0:
-                                    deleted = True
-                                    break
+            for conn in snapshot.by_ssid.get(ssid, []):
+                if conn["type"] not in WIFI_TYPES:
+                    continue
+                if self.radio.run("mutate", lambda: self.backend.delete_connection(conn["uuid"])):
+                    deleted = True
+                    break
+            
+            self.invalidate_snapshot()
             
             if deleted:
                 return {"success": True, "message": f"Forgot network: {ssid}"}
@@ -259,26 +327,17 @@ class WiFiService:
     def disconnect_current(self):
         """Disconnect and forget current WiFi connection"""
         try:
-            code, out, _ = self.run_command("nmcli -t -f NAME,TYPE,DEVICE connection show --active")
+            snapshot = self.get_connection_snapshot(max_age=0)
+            active = snapshot.active_on(self.client_iface)
             
-            current_conn_name = None
-            if code == 0 and out:
-                for line in out.splitlines():
-                    parts = line.split(":")
-                    if len(parts) >= 3 and parts[2] == self.client_iface:
-                        conn_name = parts[0]
-                        safe_conn_name = self.sanitize_connection_name(conn_name)
-                        if safe_conn_name:
-                            current_conn_name = safe_conn_name
-                            break
-            
-            if not current_conn_name:
+            if not active:
                 return {"success": False, "error": "No active connection"}
             
             # Disconnect and delete
-            code, _, _ = self.run_command(f"nmcli connection delete {shlex.quote(current_conn_name)}")
+            deleted = self.radio.run("mutate", lambda: self.backend.delete_connection(active["uuid"]))
+            self.invalidate_snapshot()
             
-            if code == 0:
+            if deleted:
                 return {"success": True, "message": "Disconnected and forgot current network"}
             else:
                 return {"success": False, "error": "Failed to disconnect"}
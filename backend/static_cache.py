@@ -0,0 +1,172 @@
+"""
+In-memory cache for the portal frontend.
+
+Every file under the frontend directory is loaded once, together with
+gzip (and, when the `brotli` module is installed, brotli) variants of the
+text assets, and served with a strong ETag. Conditional requests are
+answered with 304 from memory; files are re-read only when a throttled
+mtime check sees them change.
+"""
+
+import gzip
+import hashlib
+import logging
+import mimetypes
+import os
+import posixpath
+import threading
+import time
+
+from flask import Response
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+COMPRESSIBLE_TYPES = (
+    "text/", "application/javascript", "application/json", "image/svg+xml"
+)
+
+
+class StaticAsset:
+    __slots__ = ("path", "mimetype", "mtime", "size", "etag", "variants")
+
+    def __init__(self, path):
+        self.path = path
+        stat = os.stat(path)
+        self.mtime = stat.st_mtime
+        self.size = stat.st_size
+        self.mimetype = mimetypes.guess_type(path)[0] or "application/octet-stream"
+
+        with open(path, "rb") as f:
+            body = f.read()
+        self.etag = hashlib.sha1(body).hexdigest()[:20]
+
+        # Encoding -> body, only kept where compression actually helps
+        self.variants = {"identity": body}
+        if self.mimetype.startswith(COMPRESSIBLE_TYPES):
+            compressed = gzip.compress(body, compresslevel=9, mtime=0)
+            if len(compressed) < len(body):
+                self.variants["gzip"] = compressed
+            if brotli is not None:
+                compressed = brotli.compress(body)
+                if len(compressed) < len(body):
+                    self.variants["br"] = compressed
+
+
+class StaticAssetCache:
+    def __init__(self, root, check_interval=2.0, html_cache_control="no-cache",
+                 asset_cache_control="public, max-age=3600"):
+        self.root = os.path.abspath(root)
+        self.check_interval = check_interval
+        self.html_cache_control = html_cache_control
+        self.asset_cache_control = asset_cache_control
+        self._lock = threading.Lock()
+        self._assets = {}
+        self._checked = {}
+        self._load_all()
+
+    def _load_all(self):
+        for dirpath, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                full_path = os.path.join(dirpath, filename)
+                relpath = os.path.relpath(full_path, self.root).replace(os.sep, "/")
+                try:
+                    self._assets[relpath] = StaticAsset(full_path)
+                    self._checked[relpath] = time.monotonic()
+                except OSError as e:
+                    logger.warning(f"Cannot cache {full_path}: {e}")
+        logger.info(f"Cached {len(self._assets)} frontend assets from {self.root}")
+
+    def normalize(self, path):
+        """Map a request path to a cache key, or None if it escapes the root"""
+        path = posixpath.normpath("/" + path).lstrip("/")
+        if not path or path.startswith("..") or "\0" in path:
+            return None
+        return path
+
+    def get(self, relpath):
+        """Return the cached asset for `relpath`, reloading it if changed"""
+        key = self.normalize(relpath)
+        if key is None:
+            return None
+
+        now = time.monotonic()
+        with self._lock:
+            asset = self._assets.get(key)
+            if asset is not None and now - self._checked.get(key, 0.0) < self.check_interval:
+                return asset
+            self._checked[key] = now
+
+        full_path = os.path.join(self.root, *key.split("/"))
+        try:
+            stat = os.stat(full_path)
+        except OSError:
+            with self._lock:
+                self._assets.pop(key, None)
+            return None
+        if not os.path.isfile(full_path):
+            return None
+        if asset is not None and stat.st_mtime == asset.mtime and stat.st_size == asset.size:
+            return asset
+
+        try:
+            asset = StaticAsset(full_path)
+        except OSError as e:
+            logger.error(f"Cannot reload {full_path}: {e}")
+            return asset
+        with self._lock:
+            self._assets[key] = asset
+        return asset
+
+    def _choose_encoding(self, asset, accept_encoding):
+        accepted = set()
+        for part in accept_encoding.split(","):
+            coding, _, params = part.strip().partition(";")
+            if params.replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+                continue
+            accepted.add(coding.strip().lower())
+        for encoding in ("br", "gzip"):
+            if encoding in asset.variants and encoding in accepted:
+                return encoding
+        return "identity"
+
+    def response(self, relpath, request):
+        """Build a Flask response for `relpath`, or None if it is not cached"""
+        asset = self.get(relpath)
+        if asset is None:
+            return None
+
+        encoding = self._choose_encoding(asset, request.headers.get("Accept-Encoding", ""))
+        etag = asset.etag if encoding == "identity" else f"{asset.etag}-{encoding}"
+        cache_control = (
+            self.html_cache_control if asset.mimetype == "text/html" else self.asset_cache_control
+        )
+        headers = {
+            "ETag": f'"{etag}"',
+            "Cache-Control": cache_control,
+            "Vary": "Accept-Encoding"
+        }
+
+        if_none_match = request.headers.get("If-None-Match", "")
+        if if_none_match:
+            tags = set()
+            for tag in if_none_match.split(","):
+                tag = tag.strip()
+                if tag.startswith("W/"):
+                    tag = tag[2:]
+                tags.add(tag.strip('"'))
+            if "*" in tags or etag in tags:
+                return Response(status=304, headers=headers)
+
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        body = asset.variants[encoding]
+        if request.method == "HEAD":
+            body = b""
+        response = Response(body, mimetype=asset.mimetype, headers=headers)
+        response.content_length = len(asset.variants[encoding])
+        return response
@@ -0,0 +1,67 @@
+import os
+import sys
+
+import pytest
+
+# The app imports its modules relative to backend/ (`from service import ...`)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from service.hwmon import SysfsAttr
+
+
+class FakeHwmonTree:
+    """hwmon and thermal sysfs directories made of plain files under tmp_path.
+
+    Every SysfsAttr write is recorded in `writes` as (path, value).
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.hwmon_root = os.path.join(root, "hwmon")
+        self.thermal_root = os.path.join(root, "thermal")
+        self.writes = []
+        os.makedirs(self.hwmon_root)
+        os.makedirs(self.thermal_root)
+
+    def add_device(self, index, name, **attrs):
+        path = os.path.join(self.hwmon_root, f"hwmon{index}")
+        os.makedirs(path)
+        self.write(os.path.join(path, "name"), name)
+        for attr, value in attrs.items():
+            self.write(os.path.join(path, attr), value)
+        return path
+
+    def set_temperature(self, celsius, zone=0):
+        path = os.path.join(self.thermal_root, f"thermal_zone{zone}")
+        os.makedirs(path, exist_ok=True)
+        self.write(os.path.join(path, "temp"), int(celsius * 1000))
+
+    @staticmethod
+    def write(path, value):
+        with open(path, "w") as f:
+            f.write(f"{value}\n")
+
+    @staticmethod
+    def read(path):
+        with open(path) as f:
+            return f.read().strip()
+
+    def writes_to(self, name):
+        return [value for path, value in self.writes if os.path.basename(path) == name]
+
+
+@pytest.fixture
+def hwmon_tree(tmp_path, monkeypatch):
+    tree = FakeHwmonTree(str(tmp_path))
+    original = SysfsAttr.write_int
+
+    def write_int(attr, value):
+        original(attr, value)
+        # A sysfs store replaces the whole value; a plain file keeps the
+        # old trailing bytes after a shorter pwrite, so cut them off here
+        path = os.path.join(attr.device.path, attr.name)
+        os.truncate(path, len(str(int(value))))
+        tree.writes.append((path, int(value)))
+
+    monkeypatch.setattr(SysfsAttr, "write_int", write_int)
+    return tree
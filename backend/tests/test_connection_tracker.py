@@ -0,0 +1,167 @@
+import os
+
+import pytest
+
+from service import connection_tracker
+from service.connection_tracker import ConnectionTracker
+
+# Recorded `nmcli device monitor wlan0` output: connect to "Home" with an
+# authentication retry, switch to "Office 5G", the adapter being unplugged
+# and replugged, a reconnect to "Home" and finally the device being set
+# unmanaged. The p2p0 line comes from the AP interface and must be ignored.
+TRANSCRIPT = os.path.join(os.path.dirname(__file__), "fixtures", "nmcli_device_monitor_wlan0.txt")
+
+SSIDS = {"Home": "Home", "Office 5G": "OfficeNet"}
+
+
+class FakeNetworkManager:
+    """resolve() source that follows the profile the monitor reported"""
+
+    def __init__(self):
+        self.active = None
+        self.fail = False
+
+    def resolve(self):
+        if self.fail:
+            raise RuntimeError("nmcli timed out")
+        if self.active is None:
+            return None
+        return {"name": self.active, "ssid": SSIDS[self.active]}
+
+
+@pytest.fixture
+def addresses(monkeypatch):
+    current = {"ipv4": []}
+    monkeypatch.setattr(connection_tracker, "get_addresses", lambda iface: dict(current))
+    return current
+
+
+@pytest.fixture
+def nm():
+    return FakeNetworkManager()
+
+
+@pytest.fixture
+def tracker(nm):
+    tracker = ConnectionTracker("wlan0", resolve=nm.resolve)
+    tracker.transitions = []
+    tracker.on_change(lambda state: tracker.transitions.append(
+        (state["state"], state["connection"], state["ssid"])
+    ))
+    return tracker
+
+
+def replay(tracker, nm, addresses, lines):
+    for line in lines:
+        # NetworkManager has switched profiles by the time it reports them
+        if "using connection '" in line:
+            nm.active = line.split("'")[1]
+            addresses["ipv4"] = ["192.168.1.23/24"]
+        tracker.feed(line)
+
+
+def read_transcript():
+    with open(TRANSCRIPT) as f:
+        return f.read().splitlines()
+
+
+def test_replay_transcript_state_transitions(tracker, nm, addresses):
+    replay(tracker, nm, addresses, read_transcript())
+
+    states = []
+    for transition in tracker.transitions:
+        if not states or states[-1] != transition:
+            states.append(transition)
+    assert states == [
+        ("disconnected", None, None),
+        ("connecting", None, None),
+        ("connecting", "Home", None),
+        ("connected", "Home", "Home"),
+        ("deactivating", "Home", "Home"),
+        ("disconnected", None, None),
+        ("connecting", None, None),
+        ("connecting", "Office 5G", None),
+        ("connected", "Office 5G", "OfficeNet"),
+        ("unavailable", None, None),
+        ("disconnected", None, None),
+        ("connecting", None, None),
+        ("connecting", "Home", None),
+        ("connected", "Home", "Home"),
+        ("unmanaged", None, None),
+    ]
+
+
+def test_connected_state_carries_ssid_and_addresses(tracker, nm, addresses):
+    lines = read_transcript()
+    replay(tracker, nm, addresses, lines[:lines.index("wlan0: connected") + 1])
+
+    state = tracker.get()
+    assert state["state"] == "connected"
+    assert state["connection"] == "Home"
+    assert state["ssid"] == "Home"
+    assert state["ipv4"] == ["192.168.1.23/24"]
+    assert state["detail"] is None
+    assert state["live"] is False
+
+
+def test_connecting_detail_follows_monitor(tracker, nm, addresses):
+    replay(tracker, nm, addresses, [
+        "wlan0: connecting (prepare)",
+        "wlan0: connecting (need authentication)",
+    ])
+
+    assert tracker.get()["detail"] == "need authentication"
+
+
+def test_device_removed_clears_connection(tracker, nm, addresses):
+    replay(tracker, nm, addresses, [
+        "wlan0: using connection 'Office 5G'",
+        "wlan0: connected",
+        "wlan0: device removed",
+    ])
+
+    state = tracker.get()
+    assert state["state"] == "unavailable"
+    assert (state["connection"], state["ssid"], state["ipv4"]) == (None, None, [])
+
+
+def test_unmanaged_clears_connection(tracker, nm, addresses):
+    replay(tracker, nm, addresses, [
+        "wlan0: using connection 'Home'",
+        "wlan0: connected",
+        "wlan0: unmanaged",
+    ])
+
+    state = tracker.get()
+    assert state["state"] == "unmanaged"
+    assert (state["connection"], state["ssid"], state["ipv4"]) == (None, None, [])
+
+
+def test_other_interfaces_and_noise_are_ignored(tracker, nm, addresses):
+    for line in ("p2p0: connected", "p2p0: unmanaged", "", "wlan0 disconnected",
+                 "wlan0: something NetworkManager added later (really)"):
+        tracker.feed(line)
+
+    assert tracker.transitions == []
+    assert tracker.get()["state"] == "unknown"
+
+
+def test_resolve_failure_keeps_monitor_connection_name(tracker, nm, addresses):
+    replay(tracker, nm, addresses, ["wlan0: using connection 'Home'"])
+    nm.fail = True
+    tracker.feed("wlan0: connected")
+
+    state = tracker.get()
+    assert state["state"] == "connected"
+    assert state["connection"] == "Home"
+    assert state["ssid"] is None
+
+
+def test_seed_reads_current_connection(tracker, nm, addresses):
+    nm.active = "Office 5G"
+    addresses["ipv4"] = ["10.0.0.7/24"]
+
+    tracker.seed()
+
+    assert tracker.transitions == [("connected", "Office 5G", "OfficeNet")]
+    assert tracker.get()["ipv4"] == ["10.0.0.7/24"]
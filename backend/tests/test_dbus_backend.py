@@ -0,0 +1,402 @@
+import itertools
+
+import pytest
+
+from service import dbus_backend, wifi_service
+from service.dbus_backend import (
+    ACTIVE_STATE_ACTIVATED,
+    ACTIVE_STATE_DEACTIVATED,
+    NM_AP_IFACE,
+    NM_BUS,
+    NM_CONNECTION_IFACE,
+    NM_DEVICE_IFACE,
+    NM_IFACE,
+    NM_PATH,
+    NM_SETTINGS_IFACE,
+    NM_SETTINGS_PATH,
+    NM_WIRELESS_IFACE,
+    PROPS_IFACE,
+    DBusBackend,
+)
+from service.wifi_service import WiFiService
+
+
+class FakeDBusError(Exception):
+    pass
+
+
+class FakeNetworkManager:
+    """In-memory NetworkManager object tree behind a fake system bus.
+
+    `activation` is the state new active connections end up in.
+    """
+
+    def __init__(self, activation=ACTIVE_STATE_ACTIVATED):
+        self.activation = activation
+        self.ids = itertools.count(1)
+        self.calls = []
+        self.devices = {}
+        self.access_points = {}
+        self.connections = {}
+        self.active = {}
+        self.scan_requests = 0
+
+    # Tree setup
+
+    def add_device(self, iface):
+        path = f"/org/freedesktop/NetworkManager/Devices/{next(self.ids)}"
+        self.devices[path] = {"Interface": iface, "Managed": True, "State": 30,
+                              "LastScan": 1000, "AccessPoints": [], "ActiveAccessPoint": "/"}
+        return path
+
+    def add_access_point(self, device_path, ssid, strength, flags=0, wpa=0, rsn=0,
+                         bssid="AA:BB:CC:DD:EE:01"):
+        path = f"/org/freedesktop/NetworkManager/AccessPoint/{next(self.ids)}"
+        self.access_points[path] = {"Ssid": list(ssid.encode()), "Strength": strength,
+                                    "Flags": flags, "WpaFlags": wpa, "RsnFlags": rsn,
+                                    "HwAddress": bssid}
+        self.devices[device_path]["AccessPoints"].append(path)
+        return path
+
+    def add_connection(self, settings):
+        path = f"/org/freedesktop/NetworkManager/Settings/{next(self.ids)}"
+        self.connections[path] = settings
+        return path
+
+    def activate(self, conn_path, device_path, state=None):
+        path = f"/org/freedesktop/NetworkManager/ActiveConnection/{next(self.ids)}"
+        self.active[path] = {"Connection": conn_path, "Devices": [device_path],
+                             "State": self.activation if state is None else state}
+        return path
+
+    # Bus
+
+    def get_object(self, service, path):
+        assert service == NM_BUS
+        return FakeProxy(self, path)
+
+
+class FakeProxy:
+    def __init__(self, nm, path):
+        self.nm = nm
+        self.path = path
+
+    def _props(self, iface):
+        nm = self.nm
+        if self.path == NM_PATH:
+            return {"Version": "1.42.0", "ActiveConnections": list(nm.active)}
+        for table in (nm.devices, nm.access_points, nm.active):
+            if self.path in table:
+                return table[self.path]
+        raise FakeDBusError(f"No such object {self.path}")
+
+    def Get(self, iface, prop, dbus_interface=None):
+        assert dbus_interface == PROPS_IFACE
+        return self._props(iface)[prop]
+
+    def GetAll(self, iface, dbus_interface=None):
+        assert (iface, dbus_interface) == (NM_AP_IFACE, PROPS_IFACE)
+        return dict(self._props(iface))
+
+    def Set(self, iface, prop, value, dbus_interface=None):
+        assert (iface, dbus_interface) == (NM_DEVICE_IFACE, PROPS_IFACE)
+        self.nm.calls.append(("Set", self.path, prop, value))
+        self._props(iface)[prop] = value
+
+    def GetDeviceByIpIface(self, iface, dbus_interface=None):
+        assert dbus_interface == NM_IFACE
+        for path, props in self.nm.devices.items():
+            if props["Interface"] == iface:
+                return path
+        raise FakeDBusError(f"No device {iface}")
+
+    def GetAllAccessPoints(self, dbus_interface=None):
+        assert dbus_interface == NM_WIRELESS_IFACE
+        return list(self.nm.devices[self.path]["AccessPoints"])
+
+    def RequestScan(self, options, dbus_interface=None):
+        assert dbus_interface == NM_WIRELESS_IFACE
+        self.nm.scan_requests += 1
+        self.nm.devices[self.path]["LastScan"] += 1
+
+    def ActivateConnection(self, conn_path, device_path, specific, dbus_interface=None):
+        assert dbus_interface == NM_IFACE
+        self.nm.calls.append(("ActivateConnection", conn_path, device_path))
+        return self.nm.activate(conn_path, device_path)
+
+    def AddAndActivateConnection(self, settings, device_path, ap_path, dbus_interface=None):
+        assert dbus_interface == NM_IFACE
+        self.nm.calls.append(("AddAndActivateConnection", settings, device_path, ap_path))
+        conn_path = self.nm.add_connection(settings)
+        return conn_path, self.nm.activate(conn_path, device_path)
+
+    def ListConnections(self, dbus_interface=None):
+        assert (self.path, dbus_interface) == (NM_SETTINGS_PATH, NM_SETTINGS_IFACE)
+        return list(self.nm.connections)
+
+    def GetConnectionByUuid(self, uuid, dbus_interface=None):
+        assert dbus_interface == NM_SETTINGS_IFACE
+        for path, settings in self.nm.connections.items():
+            if settings["connection"]["uuid"] == uuid:
+                return path
+        raise FakeDBusError(f"No connection {uuid}")
+
+    def GetSettings(self, dbus_interface=None):
+        assert dbus_interface == NM_CONNECTION_IFACE
+        return self.nm.connections[self.path]
+
+    def Update(self, settings, dbus_interface=None):
+        assert dbus_interface == NM_CONNECTION_IFACE
+        self.nm.calls.append(("Update", self.path, settings))
+        self.nm.connections[self.path] = settings
+
+    def Delete(self, dbus_interface=None):
+        assert dbus_interface == NM_CONNECTION_IFACE
+        self.nm.calls.append(("Delete", self.path))
+        del self.nm.connections[self.path]
+
+
+def wifi_settings(name, uuid, ssid):
+    return {
+        "connection": {"id": name, "uuid": uuid, "type": "802-11-wireless"},
+        "802-11-wireless": {"ssid": list(ssid.encode()), "mode": "infrastructure"}
+    }
+
+
+@pytest.fixture
+def nm():
+    nm = FakeNetworkManager()
+    nm.wlan0 = nm.add_device("wlan0")
+    nm.p2p0 = nm.add_device("p2p0")
+    return nm
+
+
+@pytest.fixture
+def backend(nm):
+    return DBusBackend(bus=nm, poll_interval=0.001)
+
+
+def test_scan_requests_scan_and_reports_access_points(nm, backend):
+    nm.add_access_point(nm.wlan0, "Home", 80, flags=0x1, rsn=0x100, bssid="AA:BB:CC:DD:EE:01")
+    nm.add_access_point(nm.wlan0, "Cafe", 40)
+    nm.add_access_point(nm.wlan0, "", 70)
+    nm.add_access_point(nm.wlan0, "Corp", 60, flags=0x1, wpa=0x200, rsn=0x200)
+
+    networks = backend.scan("wlan0", timeout=1)
+
+    assert nm.scan_requests == 1
+    assert networks == [
+        {"ssid": "Home", "bssid": "aa:bb:cc:dd:ee:01", "signal": 80, "security": "WPA2"},
+        {"ssid": "Cafe", "bssid": "aa:bb:cc:dd:ee:01", "signal": 40, "security": ""},
+        {"ssid": "Corp", "bssid": "aa:bb:cc:dd:ee:01", "signal": 60,
+         "security": "WPA1 WPA2 802.1X"},
+    ]
+
+
+def test_scan_keeps_cached_results_when_scan_is_refused(nm, backend, monkeypatch):
+    nm.add_access_point(nm.wlan0, "Home", 80)
+
+    def refuse(self, options, dbus_interface=None):
+        raise FakeDBusError("Scanning not allowed immediately following previous scan")
+    monkeypatch.setattr(FakeProxy, "RequestScan", refuse)
+
+    networks = backend.scan("wlan0", timeout=1)
+
+    assert [n["ssid"] for n in networks] == ["Home"]
+
+
+def test_connect_new_network_creates_and_activates_profile(nm, backend):
+    ap = nm.add_access_point(nm.wlan0, "Home", 80, flags=0x1, rsn=0x100)
+    nm.devices[nm.wlan0]["State"] = 100
+    phases = []
+
+    assert backend.connect("wlan0", "Home", "secret123", timeout=1, progress=phases.append)
+
+    name, settings, device_path, ap_path = nm.calls[-1]
+    assert name == "AddAndActivateConnection"
+    assert (device_path, ap_path) == (nm.wlan0, ap)
+    assert bytes(settings["802-11-wireless"]["ssid"]) == b"Home"
+    assert settings["802-11-wireless-security"] == {"key-mgmt": "wpa-psk", "psk": "secret123"}
+    assert len(nm.connections) == 1
+    assert phases == ["dhcp"]
+
+
+def test_connect_reuses_saved_profile_without_password(nm, backend):
+    saved = nm.add_connection(wifi_settings("Home", "uuid-home", "Home"))
+
+    assert backend.connect("wlan0", "Home", "", timeout=1)
+
+    assert nm.calls[-1] == ("ActivateConnection", saved, nm.wlan0)
+    assert list(nm.connections) == [saved]
+
+
+def test_connect_with_password_updates_saved_profile(nm, backend):
+    saved = nm.add_connection(wifi_settings("Home", "uuid-home", "Home"))
+    nm.add_access_point(nm.wlan0, "Home", 80, flags=0x1, rsn=0x100)
+
+    assert backend.connect("wlan0", "Home", "newsecret", timeout=1)
+
+    assert list(nm.connections) == [saved]
+    assert not any(call[0] == "AddAndActivateConnection" for call in nm.calls)
+    assert nm.connections[saved]["802-11-wireless-security"] == {
+        "key-mgmt": "wpa-psk", "psk": "newsecret"
+    }
+    assert [call[0] for call in nm.calls] == ["Update", "ActivateConnection"]
+
+
+def test_connect_secured_network_without_password_raises(nm, backend):
+    nm.add_access_point(nm.wlan0, "Home", 80, flags=0x1, rsn=0x100)
+
+    with pytest.raises(ValueError, match="Password required"):
+        backend.connect("wlan0", "Home", "", timeout=1)
+    assert nm.connections == {}
+
+
+def test_connect_enterprise_network_raises(nm, backend):
+    nm.add_access_point(nm.wlan0, "Corp", 60, flags=0x1, rsn=0x200)
+
+    with pytest.raises(ValueError, match="802.1X"):
+        backend.connect("wlan0", "Corp", "secret123", timeout=1)
+    assert nm.calls == []
+
+
+@pytest.mark.parametrize("flags, wpa, rsn, password, expected", [
+    (0x1, 0, 0, "abcde", {"key-mgmt": "none", "wep-key0": "abcde", "wep-key-type": 1}),
+    (0x1, 0, 0, "0123456789", {"key-mgmt": "none", "wep-key0": "0123456789", "wep-key-type": 1}),
+    (0x1, 0, 0, "a passphrase", {"key-mgmt": "none", "wep-key0": "a passphrase", "wep-key-type": 2}),
+    (0x1, 0, 0x400, "secret123", {"key-mgmt": "sae", "psk": "secret123"}),
+    (0x1, 0, 0x500, "secret123", {"key-mgmt": "wpa-psk", "psk": "secret123"}),
+    (0x1, 0x100, 0, "secret123", {"key-mgmt": "wpa-psk", "psk": "secret123"}),
+])
+def test_connect_maps_access_point_security(nm, backend, flags, wpa, rsn, password, expected):
+    nm.add_access_point(nm.wlan0, "Home", 80, flags=flags, wpa=wpa, rsn=rsn)
+
+    assert backend.connect("wlan0", "Home", password, timeout=1)
+
+    settings = nm.calls[-1][1]
+    assert settings["802-11-wireless-security"] == expected
+
+
+def test_connect_open_network_ignores_password(nm, backend):
+    nm.add_access_point(nm.wlan0, "Cafe", 40)
+
+    assert backend.connect("wlan0", "Cafe", "unused", timeout=1)
+
+    assert "802-11-wireless-security" not in nm.calls[-1][1]
+
+
+def test_failed_connect_deletes_the_profile_it_created(nm, backend):
+    nm.activation = ACTIVE_STATE_DEACTIVATED
+    other = nm.add_connection(wifi_settings("Office", "uuid-office", "Office"))
+    nm.add_access_point(nm.wlan0, "Home", 80, flags=0x1, rsn=0x100)
+
+    assert not backend.connect("wlan0", "Home", "wrongpass", timeout=1)
+
+    created = [call for call in nm.calls if call[0] == "AddAndActivateConnection"]
+    deleted = [call[1] for call in nm.calls if call[0] == "Delete"]
+    assert len(created) == 1 and len(deleted) == 1
+    assert list(nm.connections) == [other]
+
+
+def test_failed_connect_keeps_an_existing_profile(nm, backend):
+    nm.activation = ACTIVE_STATE_DEACTIVATED
+    saved = nm.add_connection(wifi_settings("Home", "uuid-home", "Home"))
+
+    assert not backend.connect("wlan0", "Home", "", timeout=1)
+
+    assert list(nm.connections) == [saved]
+    assert not any(call[0] == "Delete" for call in nm.calls)
+
+
+def test_connect_fails_when_active_connection_vanishes(nm, backend):
+    nm.add_access_point(nm.wlan0, "Home", 80)
+    original = nm.activate
+
+    def activate_and_vanish(conn_path, device_path, state=None):
+        path = original(conn_path, device_path, state)
+        del nm.active[path]
+        return path
+    nm.activate = activate_and_vanish
+
+    assert not backend.connect("wlan0", "Home", "", timeout=1)
+    assert nm.connections == {}
+
+
+def test_load_snapshot_maps_active_devices_and_ssids(nm, backend):
+    home = nm.add_connection(wifi_settings("Home", "uuid-home", "Home"))
+    nm.add_connection(wifi_settings("Office", "uuid-office", "Office"))
+    nm.add_connection({"connection": {"id": "Wired", "uuid": "uuid-eth", "type": "802-3-ethernet"}})
+    nm.activate(home, nm.wlan0, state=ACTIVE_STATE_ACTIVATED)
+    # Active connection without devices is skipped without failing the load
+    nm.active["/org/freedesktop/NetworkManager/ActiveConnection/99"] = {
+        "Connection": "/gone", "Devices": [], "State": ACTIVE_STATE_ACTIVATED
+    }
+
+    snapshot = backend.load_snapshot()
+
+    assert [c["name"] for c in snapshot.wifi_connections()] == ["Home", "Office"]
+    assert snapshot.active_on("wlan0")["uuid"] == "uuid-home"
+    assert snapshot.active_on("p2p0") is None
+    assert snapshot.ssid_for("Office") == "Office"
+    assert snapshot.by_name["Wired"]["ssid"] is None
+    assert snapshot.by_name["Home"]["path"] == home
+
+
+def test_load_snapshot_reports_associated_bssid(nm, backend):
+    home = nm.add_connection(wifi_settings("Home", "uuid-home", "Home"))
+    nm.add_access_point(nm.wlan0, "Home", 90, bssid="AA:BB:CC:DD:EE:01")
+    nm.devices[nm.wlan0]["ActiveAccessPoint"] = nm.add_access_point(
+        nm.wlan0, "Home", 50, bssid="AA:BB:CC:DD:EE:02"
+    )
+    nm.activate(home, nm.wlan0, state=ACTIVE_STATE_ACTIVATED)
+
+    snapshot = backend.load_snapshot()
+
+    assert snapshot.active_on("wlan0")["bssid"] == "aa:bb:cc:dd:ee:02"
+
+
+def test_signal_strength_uses_associated_bssid_not_strongest(nm, backend, monkeypatch):
+    home = nm.add_connection(wifi_settings("Home", "uuid-home", "Home"))
+    nm.add_access_point(nm.wlan0, "Home", 90, bssid="AA:BB:CC:DD:EE:01")
+    nm.devices[nm.wlan0]["ActiveAccessPoint"] = nm.add_access_point(
+        nm.wlan0, "Home", 50, bssid="AA:BB:CC:DD:EE:02"
+    )
+    nm.activate(home, nm.wlan0, state=ACTIVE_STATE_ACTIVATED)
+    monkeypatch.setattr(wifi_service, "read_link_signal", lambda iface: 42)
+    wifi = WiFiService(client_iface="wlan0", backend=backend)
+    wifi.scan_networks(timeout=1)
+
+    assert wifi._get_signal_strength("Home") == 50
+
+    # Without an associated BSSID the link itself is asked, not the strongest AP
+    nm.devices[nm.wlan0]["ActiveAccessPoint"] = "/"
+    wifi.invalidate_snapshot()
+    assert wifi._get_signal_strength("Home") == 42
+
+
+def test_delete_connection_removes_profile_by_uuid(nm, backend):
+    keep = nm.add_connection(wifi_settings("Home", "uuid-home", "Home"))
+    nm.add_connection(wifi_settings("Office", "uuid-office", "Office"))
+
+    assert backend.delete_connection("uuid-office")
+
+    assert list(nm.connections) == [keep]
+
+
+def test_delete_unknown_connection_raises(nm, backend):
+    with pytest.raises(FakeDBusError):
+        backend.delete_connection("uuid-missing")
+
+
+def test_set_managed_sets_device_property(nm, backend):
+    assert backend.set_managed("p2p0", False)
+
+    assert nm.devices[nm.p2p0]["Managed"] is False
+    assert nm.devices[nm.wlan0]["Managed"] is True
+    assert ("Set", nm.p2p0, "Managed", False) in nm.calls
+
+
+def test_is_available_without_dbus_python(monkeypatch):
+    monkeypatch.setattr(dbus_backend, "dbus", None)
+
+    assert not DBusBackend.is_available()
@@ -0,0 +1,143 @@
+import pytest
+
+from service.fan_service import FanService
+
+
+@pytest.fixture
+def fan(hwmon_tree):
+    hwmon_tree.add_device(0, "cpu_thermal")
+    hwmon_tree.path = hwmon_tree.add_device(1, "pwmfan", pwm1=0, pwm1_enable=2, fan1_input=0)
+    hwmon_tree.set_temperature(40)
+    service = FanService(hwmon_root=hwmon_tree.hwmon_root, thermal_path=hwmon_tree.thermal_root)
+    # Drive control_step() directly instead of the background loop
+    service._auto = True
+    return service
+
+
+def run(fan, hwmon_tree, temperatures):
+    applied = []
+    for celsius in temperatures:
+        hwmon_tree.set_temperature(celsius)
+        applied.append(fan.control_step())
+    return applied
+
+
+def test_enables_manual_control_on_start(fan, hwmon_tree):
+    assert hwmon_tree.writes_to("pwm1_enable") == [1]
+
+
+def test_max_step_limits_ramp_up(fan, hwmon_tree):
+    applied = run(fan, hwmon_tree, [80] * 10)
+
+    assert applied == [60, 85, 110, 135, 160, 185, 210, 235, 255, 255]
+    assert hwmon_tree.writes_to("pwm1") == applied[:-1]
+
+
+def test_hysteresis_does_not_flap(fan, hwmon_tree):
+    run(fan, hwmon_tree, [65] * 8)
+    assert fan._pwm == 170
+    before = len(hwmon_tree.writes)
+
+    applied = run(fan, hwmon_tree, [63, 65, 63, 64, 63, 65])
+
+    assert applied == [170] * 6
+    assert len(hwmon_tree.writes) == before
+
+    # Falling past the band does slow the fan down
+    assert run(fan, hwmon_tree, [60]) == [153]
+
+
+def test_min_spin_floor(fan, hwmon_tree):
+    # Curve asks for ~17 at 47C; the fan starts straight at the minimum
+    assert run(fan, hwmon_tree, [47, 47]) == [60, 60]
+
+    # Cooling stops the fan instead of dropping it below its stall point
+    assert run(fan, hwmon_tree, [44]) == [60]
+    assert run(fan, hwmon_tree, [41]) == [0]
+    assert hwmon_tree.writes_to("pwm1") == [60, 0]
+
+
+def test_no_write_when_target_is_unchanged(fan, hwmon_tree):
+    run(fan, hwmon_tree, [40] * 5)
+    assert hwmon_tree.writes_to("pwm1") == []
+
+    run(fan, hwmon_tree, [80] * 9)
+    writes = len(hwmon_tree.writes)
+    run(fan, hwmon_tree, [80] * 3)
+
+    assert len(hwmon_tree.writes) == writes
+
+
+def test_step_does_nothing_when_auto_mode_switched_off(fan, hwmon_tree, monkeypatch):
+    def read_and_switch_off():
+        # Manual control arrives while the step is reading the sensors
+        fan.set_auto(False)
+        return 80.0
+    monkeypatch.setattr(fan, "_read_temperature", read_and_switch_off)
+
+    assert fan.control_step() is None
+    assert hwmon_tree.writes_to("pwm1") == []
+    assert fan.get_status()["target_pwm"] is None
+
+
+def test_missing_thermal_zone_runs_fan_at_full_speed(fan, hwmon_tree):
+    fan.thermal_path = hwmon_tree.root + "/missing"
+
+    assert fan.control_step() == 255
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def tach(fan, monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr("service.fan_tach.time.monotonic", clock)
+    fan.tach.clock = clock
+    return fan.tach
+
+
+def sample(tach, hwmon_tree, pwm, rpm, seconds=1):
+    hwmon_tree.write(hwmon_tree.path + "/pwm1", pwm)
+    hwmon_tree.write(hwmon_tree.path + "/fan1_input", rpm)
+    tach.sample()
+    tach.clock.now += seconds
+    return tach.latest()[0]
+
+
+def test_tach_reports_stall_once_tach_reads_zero_long_enough(tach, hwmon_tree):
+    states = [sample(tach, hwmon_tree, 255, 0)["health"] for _ in range(5)]
+
+    assert states == ["ok", "ok", "ok", "stalled", "stalled"]
+
+
+def test_tach_settles_after_pwm_change(tach, hwmon_tree):
+    sample(tach, hwmon_tree, 170, 1800)
+    states = [sample(tach, hwmon_tree, 255, 2600)["health"] for _ in range(4)]
+
+    assert states == ["settling", "settling", "settling", "ok"]
+
+
+def test_tach_reports_degraded_against_calibration(tach, hwmon_tree):
+    tach.calibration = {1: [(128, 1500), (255, 3000)]}
+
+    healthy = sample(tach, hwmon_tree, 255, 2800)
+    assert (healthy["health"], healthy["expected_rpm"]) == ("ok", 3000)
+
+    for _ in range(9):
+        state = sample(tach, hwmon_tree, 255, 1000)
+    assert state["health"] == "degraded"
+    assert state["rpm"] < 3000 * tach.degraded_ratio
+
+
+def test_tach_stopped_and_no_tach(tach, hwmon_tree):
+    assert sample(tach, hwmon_tree, 0, 0)["health"] == "stopped"
+
+    hwmon_tree.write(hwmon_tree.path + "/fan1_input", "")
+    tach.sample()
+    assert tach.latest()[0]["health"] == "no_tach"
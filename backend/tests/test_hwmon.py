@@ -0,0 +1,40 @@
+import os
+
+import pytest
+
+from service.hwmon import HwmonDevice, NoDeviceError, find_hwmon
+
+
+def test_find_hwmon_prefers_name_over_pwm_fallback(hwmon_tree):
+    hwmon_tree.add_device(0, "cpu_thermal")
+    hwmon_tree.add_device(1, "other", pwm1=0)
+    fan = hwmon_tree.add_device(10, "pwmfan", pwm1=0)
+
+    assert find_hwmon(("pwmfan",), root=hwmon_tree.hwmon_root) == fan
+    assert find_hwmon(("missing",), root=hwmon_tree.hwmon_root).endswith("hwmon1")
+
+
+def test_write_then_read_shorter_value(hwmon_tree):
+    path = hwmon_tree.add_device(0, "pwmfan", pwm1=255)
+    device = HwmonDevice(("pwmfan",), root=hwmon_tree.hwmon_root)
+
+    device.attr("pwm1").write_int(78)
+
+    assert device.attr("pwm1").read_int() == 78
+    assert hwmon_tree.read(os.path.join(path, "pwm1")) == "78"
+    assert hwmon_tree.writes_to("pwm1") == [78]
+
+
+def test_missing_device_fails_fast_and_rescans_after_interval(hwmon_tree, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("service.hwmon.time.monotonic", lambda: now[0])
+    device = HwmonDevice(("pwmfan",), root=hwmon_tree.hwmon_root, rescan_interval=30)
+
+    with pytest.raises(NoDeviceError):
+        device.attr("pwm1").read_int()
+
+    path = hwmon_tree.add_device(0, "pwmfan", pwm1=10)
+    assert device.path is None
+    now[0] += 30
+    assert device.path == path
+    assert device.attr("pwm1").read_int() == 10
@@ -0,0 +1,61 @@
+import threading
+
+from service.job_manager import JobManager
+
+
+def wait_for(manager, job_id):
+    for _ in range(200):
+        job = manager.get(job_id)
+        if job["status"] not in JobManager.ACTIVE:
+            return job
+        threading.Event().wait(0.01)
+    raise AssertionError("job did not finish")
+
+
+def test_duplicate_submit_joins_job_and_runs_every_on_done():
+    manager = JobManager()
+    release = threading.Event()
+    calls = []
+    finished = []
+
+    def work(progress):
+        calls.append(1)
+        release.wait(2)
+        return {"success": True}
+
+    first, created = manager.submit("connect", "Home", work, on_done=lambda r: finished.append("a"))
+    second, joined = manager.submit("connect", "Home", work, on_done=lambda r: finished.append("b"))
+    release.set()
+    wait_for(manager, first["id"])
+
+    assert created and not joined
+    assert second["id"] == first["id"]
+    assert calls == [1]
+    assert sorted(finished) == ["a", "b"]
+    manager.shutdown()
+
+
+def test_different_keys_run_separately():
+    manager = JobManager(workers=2)
+
+    first, _ = manager.submit("connect", ("Home", "k1"), lambda p: {"success": False})
+    second, created = manager.submit("connect", ("Home", "k2"), lambda p: {"success": True})
+
+    assert created and first["id"] != second["id"]
+    assert wait_for(manager, first["id"])["status"] == "failed"
+    assert wait_for(manager, second["id"])["status"] == "succeeded"
+    manager.shutdown()
+
+
+def test_lane_jobs_do_not_block_default_workers():
+    manager = JobManager(workers=1, lanes={"device": (1, ("fan_calibrate",))})
+    release = threading.Event()
+
+    sweep, _ = manager.submit("fan_calibrate", "fan", lambda p: {"success": release.wait(2)})
+    connect, _ = manager.submit("connect", "Home", lambda p: {"success": True})
+
+    assert wait_for(manager, connect["id"])["status"] == "succeeded"
+    assert manager.get(sweep["id"])["status"] == "running"
+    release.set()
+    assert wait_for(manager, sweep["id"])["status"] == "succeeded"
+    manager.shutdown()
@@ -0,0 +1,77 @@
+import os
+import threading
+
+import pytest
+
+from service.light_backends import SimulatedPwmBackend, SysfsPwmBackend
+from service.light_service import LightService, parse_light_pins
+
+
+def test_parse_light_pins_single_and_rgb():
+    lights = parse_light_pins("main=17, strip=22/23/24,")
+
+    assert lights == {
+        "main": {"name": "Main Light", "pin": 17},
+        "strip": {"name": "Strip Light", "pins": {"red": 22, "green": 23, "blue": 24}},
+    }
+
+
+@pytest.mark.parametrize("spec", ["main", "main=a", "main=1/2", "=17"])
+def test_parse_light_pins_rejects_malformed_entries(spec):
+    with pytest.raises(ValueError):
+        parse_light_pins(spec)
+
+
+@pytest.fixture
+def lights():
+    service = LightService(lights=parse_light_pins("main=17,strip=22/23/24"),
+                           backend=SimulatedPwmBackend(), fade=0)
+    yield service
+    service.cleanup()
+
+
+def test_rgb_color_drives_each_channel(lights):
+    lights.apply_scene({"strip": {"state": True, "brightness": 50, "color": "purple"}})
+
+    assert lights.backend.duties == {17: 0.0, 22: 30.0, 23: 0.0, 24: 50.0}
+    assert lights.get_status()["lights"][1]["rgb"] is True
+
+
+def test_concurrent_toggles_do_not_lose_updates(lights):
+    # An even number of toggles must leave the light off
+    barrier = threading.Barrier(8)
+
+    def toggle():
+        barrier.wait()
+        for _ in range(25):
+            lights.toggle_light("main")
+
+    threads = [threading.Thread(target=toggle) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert lights.lights["main"]["state"] is False
+    assert lights.backend.duties[17] == 0.0
+
+
+def test_sysfs_backend_clears_duty_cycle_before_setting_period(tmp_path, monkeypatch):
+    chip = tmp_path / "pwmchip0"
+    (chip / "pwm0").mkdir(parents=True)
+    for name in ("period", "duty_cycle", "enable"):
+        (chip / "pwm0" / name).write_text("0")
+    writes = []
+    original = SysfsPwmBackend._write
+
+    def record(self, path, value):
+        writes.append(os.path.basename(path))
+        original(self, path, value)
+    monkeypatch.setattr(SysfsPwmBackend, "_write", record)
+
+    backend = SysfsPwmBackend(chip=str(chip), period_ns=500000)
+    backend.open(0)
+    backend.close()
+
+    assert writes == ["duty_cycle", "period", "enable"]
+    assert (chip / "pwm0" / "period").read_text() == "500000"
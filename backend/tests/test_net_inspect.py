@@ -0,0 +1,180 @@
+import os
+import socket
+
+import pytest
+
+from service import net_inspect
+from service.net_inspect import (
+    IFADDRMSG,
+    IFA_ADDRESS,
+    IFA_LOCAL,
+    NLMSG_DONE,
+    NLMSG_HDR,
+    RTATTR,
+    RTM_NEWADDR,
+    get_addresses,
+    get_default_routes,
+    get_neighbors,
+    get_wireless_link,
+)
+
+# Recorded from a Raspberry Pi acting as AP (p2p0) and client (wlan0), with
+# an extra wired uplink (eth0) to get competing default routes
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+def fixture(name):
+    return os.path.join(FIXTURES, name)
+
+
+def routes():
+    return get_default_routes(
+        route_path=fixture("proc_net_route.txt"),
+        ipv6_route_path=fixture("proc_net_ipv6_route.txt")
+    )
+
+
+def test_ipv4_default_gateways_decode_little_endian_hex():
+    ipv4 = {r["iface"]: r["gateway"] for r in routes() if r["family"] == "ipv4"}
+
+    # 0101A8C0 -> 192.168.1.1, 0100000A -> 10.0.0.1
+    assert ipv4 == {"wlan0": "192.168.1.1", "eth0": "10.0.0.1"}
+
+
+def test_default_routes_sorted_by_metric():
+    ordered = [(r["family"], r["iface"], r["metric"]) for r in routes()]
+
+    # Stable sort: IPv4 before IPv6 at equal metric
+    assert ordered == [
+        ("ipv4", "eth0", 100),
+        ("ipv4", "wlan0", 600),
+        ("ipv6", "wlan0", 600),
+        ("ipv6", "eth0", 1024),
+    ]
+    assert routes()[0]["gateway"] == "10.0.0.1"
+
+
+def test_ipv6_default_routes_skip_loopback_and_prefix_routes():
+    ipv6 = [r for r in routes() if r["family"] == "ipv6"]
+
+    assert [(r["iface"], r["gateway"]) for r in ipv6] == [
+        ("wlan0", "fe80::211:2233:4455:6677"),
+        ("eth0", "fe80::1"),
+    ]
+
+
+def test_missing_route_files_give_no_routes(tmp_path):
+    assert get_default_routes(str(tmp_path / "route"), str(tmp_path / "ipv6_route")) == []
+
+
+def test_wireless_link_skips_header_and_strips_trailing_dots():
+    link = get_wireless_link("wlan0", path=fixture("proc_net_wireless.txt"))
+
+    assert link == {"status": "0000", "quality": 54.0, "level": -56.0, "noise": -256.0}
+
+
+def test_wireless_link_without_dots_and_unknown_interface():
+    path = fixture("proc_net_wireless.txt")
+
+    assert get_wireless_link("p2p0", path=path)["quality"] == 0.0
+    # "face" from the second header line must not match an interface
+    assert get_wireless_link("face", path=path) is None
+    assert get_wireless_link("wlan1", path=path) is None
+
+
+def test_neighbors_skip_incomplete_entries_and_lowercase_macs():
+    path = fixture("proc_net_arp.txt")
+
+    assert get_neighbors("p2p0", path=path) == {"192.168.4.23": "3a:1f:9c:00:11:22"}
+    assert get_neighbors(path=path) == {
+        "192.168.4.23": "3a:1f:9c:00:11:22",
+        "192.168.1.1": "b8:27:eb:aa:bb:cc",
+    }
+
+
+def test_proc_ipv6_addresses():
+    path = fixture("proc_net_if_inet6.txt")
+
+    assert net_inspect._proc_ipv6_addresses("wlan0", path=path) == [
+        "fe80::ba27:ebff:fe12:3456/64",
+        "fd00::42/64",
+    ]
+
+
+class FakeNetlinkSocket:
+    """Replays canned rtnetlink replies; raises timeout once they run out"""
+
+    def __init__(self, replies):
+        self.replies = list(replies)
+        self.timeout = None
+        self.closed = False
+
+    def settimeout(self, timeout):
+        self.timeout = timeout
+
+    def bind(self, address):
+        pass
+
+    def send(self, data):
+        return len(data)
+
+    def recv(self, size):
+        if not self.replies:
+            raise socket.timeout("timed out")
+        return self.replies.pop(0)
+
+    def close(self):
+        self.closed = True
+
+
+def newaddr(family, index, prefixlen, attrs):
+    body = IFADDRMSG.pack(family, prefixlen, 0, 0, index)
+    for rta_type, value in attrs:
+        attr = RTATTR.pack(RTATTR.size + len(value), rta_type) + value
+        body += attr + b"\0" * (-len(attr) % 4)
+    return NLMSG_HDR.pack(NLMSG_HDR.size + len(body), RTM_NEWADDR, 2, 1, 0) + body
+
+
+def done():
+    return NLMSG_HDR.pack(NLMSG_HDR.size + 4, NLMSG_DONE, 2, 1, 0) + b"\0" * 4
+
+
+@pytest.fixture
+def netlink(monkeypatch):
+    sockets = []
+
+    def install(replies):
+        def make(*args):
+            sock = FakeNetlinkSocket(replies)
+            sockets.append(sock)
+            return sock
+        monkeypatch.setattr(net_inspect.socket, "socket", make)
+        monkeypatch.setattr(net_inspect.socket, "if_nametoindex", lambda iface: 3)
+        monkeypatch.setattr(
+            net_inspect, "_proc_ipv6_addresses",
+            lambda iface: ["fe80::ba27:ebff:fe12:3456/64"]
+        )
+        return sockets
+    return install
+
+
+def test_netlink_dump_filters_by_interface_index(netlink):
+    netlink([
+        newaddr(socket.AF_INET, 1, 8, [(IFA_ADDRESS, socket.inet_aton("127.0.0.1"))]) +
+        newaddr(socket.AF_INET, 3, 24, [(IFA_ADDRESS, socket.inet_aton("192.168.1.23")),
+                                        (IFA_LOCAL, socket.inet_aton("192.168.1.23"))]),
+        newaddr(socket.AF_INET6, 3, 64,
+                [(IFA_ADDRESS, socket.inet_pton(socket.AF_INET6, "fd00::42"))]) + done(),
+    ])
+
+    assert get_addresses("wlan0") == {"ipv4": ["192.168.1.23/24"], "ipv6": ["fd00::42/64"]}
+
+
+def test_netlink_dump_without_done_times_out_and_falls_back(netlink):
+    sockets = netlink([
+        newaddr(socket.AF_INET, 3, 24, [(IFA_ADDRESS, socket.inet_aton("192.168.1.23"))]),
+    ])
+
+    assert get_addresses("wlan0") == {"ipv4": [], "ipv6": ["fe80::ba27:ebff:fe12:3456/64"]}
+    assert sockets[0].timeout == net_inspect.NETLINK_TIMEOUT
+    assert sockets[0].closed
@@ -0,0 +1,57 @@
+from probe_responder import CaptiveProbeResponder
+
+
+class Clients:
+    def __init__(self, *provisioned):
+        self.provisioned = set(provisioned)
+
+    def is_provisioned(self, ip):
+        return ip in self.provisioned
+
+
+def downstream(environ, start_response):
+    start_response("200 OK", [("Content-Type", "text/plain")])
+    return [b"app"]
+
+
+def call(responder, path, host="example.com", ip="192.168.4.10", method="GET"):
+    environ = {"REQUEST_METHOD": method, "PATH_INFO": path, "HTTP_HOST": host,
+               "REMOTE_ADDR": ip}
+    started = []
+    body = b"".join(responder(environ, lambda status, headers: started.append((status, headers))))
+    status, headers = started[0]
+    return status, dict(headers), body
+
+
+def test_probe_redirects_unprovisioned_client_to_portal():
+    responder = CaptiveProbeResponder(downstream, portal_url="/", clients=Clients())
+
+    status, headers, body = call(responder, "/generate_204", host="connectivitycheck.gstatic.com")
+
+    assert status == "302 Found"
+    assert headers["Location"] == "/"
+
+
+def test_probe_answers_provisioned_client_with_success():
+    responder = CaptiveProbeResponder(downstream, clients=Clients("192.168.4.10"))
+
+    assert call(responder, "/generate_204")[0] == "204 No Content"
+    assert call(responder, "/ncsi.txt")[2] == b"Microsoft NCSI"
+    assert call(responder, "/hotspot-detect.html")[2].endswith(b"Success</BODY></HTML>")
+    assert call(responder, "/generate_204", ip="192.168.4.11")[0] == "302 Found"
+
+
+def test_provisioned_check_is_usable_without_the_middleware():
+    responder = CaptiveProbeResponder(downstream, clients=Clients("192.168.4.10"))
+
+    assert responder.provisioned({"REMOTE_ADDR": "192.168.4.10"})
+    assert not responder.provisioned({"REMOTE_ADDR": "192.168.4.11"})
+    assert not CaptiveProbeResponder(downstream).provisioned({"REMOTE_ADDR": "192.168.4.10"})
+
+
+def test_head_probe_has_no_body_and_other_requests_pass_through():
+    responder = CaptiveProbeResponder(downstream, clients=Clients())
+
+    assert call(responder, "/ncsi.txt", method="HEAD")[2] == b""
+    assert call(responder, "/api/status") == ("200 OK", {"Content-Type": "text/plain"}, b"app")
+    assert call(responder, "/generate_204", method="POST")[2] == b"app"
@@ -0,0 +1,110 @@
+import threading
+import time
+
+import pytest
+
+from service.radio_scheduler import RadioScheduler
+
+
+def start(target, *args):
+    thread = threading.Thread(target=target, args=args, daemon=True)
+    thread.start()
+    return thread
+
+
+def wait_until(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "condition not reached"
+        time.sleep(0.005)
+
+
+def test_waiting_operations_run_in_priority_then_fifo_order():
+    radio = RadioScheduler()
+    release = threading.Event()
+    order = []
+
+    holder = start(radio.run, "scan", release.wait)
+    wait_until(lambda: radio.metrics()["exclusive_active"])
+
+    threads = []
+    for kind, name in (("scan", "scan-1"), ("mutate", "mutate-1"), ("connect", "connect-1"),
+                       ("mutate", "mutate-2"), ("connect", "connect-2")):
+        threads.append(start(radio.run, kind, lambda name=name: order.append(name)))
+        wait_until(lambda n=len(threads): radio.metrics()["queue_depth"] == n)
+
+    release.set()
+    for thread in [holder] + threads:
+        thread.join(2)
+
+    assert order == ["connect-1", "connect-2", "mutate-1", "mutate-2", "scan-1"]
+
+
+def test_operations_never_overlap():
+    radio = RadioScheduler()
+    active = []
+    overlaps = []
+
+    def work():
+        active.append(1)
+        if len(active) > 1:
+            overlaps.append(len(active))
+        time.sleep(0.005)
+        active.pop()
+
+    threads = [start(radio.run, kind, work) for kind in ("scan", "mutate", "connect") * 4]
+    for thread in threads:
+        thread.join(2)
+
+    assert overlaps == []
+    assert sum(k["count"] for k in radio.metrics()["kinds"].values()) == 12
+
+
+def test_same_key_coalesces_onto_one_call():
+    radio = RadioScheduler()
+    release = threading.Event()
+    calls = []
+    results = []
+
+    def scan():
+        calls.append(1)
+        release.wait(2)
+        return ["Home"]
+
+    threads = [start(lambda: results.append(radio.run("scan", scan, key="scan"))) for _ in range(4)]
+    wait_until(lambda: radio.metrics()["kinds"]["scan"]["coalesced"] == 3)
+    release.set()
+    for thread in threads:
+        thread.join(2)
+
+    assert calls == [1]
+    assert results == [["Home"]] * 4
+
+
+def test_coalesced_callers_get_the_error():
+    radio = RadioScheduler()
+    release = threading.Event()
+    errors = []
+
+    def scan():
+        release.wait(2)
+        raise RuntimeError("device busy")
+
+    def call():
+        try:
+            radio.run("scan", scan, key="scan")
+        except RuntimeError as e:
+            errors.append(str(e))
+
+    threads = [start(call) for _ in range(3)]
+    wait_until(lambda: radio.metrics()["kinds"]["scan"]["coalesced"] == 2)
+    release.set()
+    for thread in threads:
+        thread.join(2)
+
+    assert errors == ["device busy"] * 3
+
+
+def test_unknown_kind_is_rejected():
+    with pytest.raises(ValueError):
+        RadioScheduler().run("read", lambda: None)
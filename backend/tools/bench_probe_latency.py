@@ -0,0 +1,115 @@
+"""
+Measure captive-probe latency while a long /api/connect is in flight.
+
+Run against a live portal:
+
+    python3 tools/bench_probe_latency.py --url http://192.168.4.1 \
+        --ssid SomeNetwork --password secret123
+
+With --ssid omitted only the baseline (no concurrent connect) is measured.
+"""
+
+import argparse
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+
+
+class NoRedirect(urllib.request.HTTPRedirectHandler):
+    """Time the probe response itself, not the page it redirects to"""
+
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+opener = urllib.request.build_opener(NoRedirect)
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(pct / 100.0 * (len(values) - 1))))
+    return values[index]
+
+
+def hammer(url, deadline, latencies, errors):
+    while time.monotonic() < deadline:
+        start = time.monotonic()
+        try:
+            with opener.open(url, timeout=10) as resp:
+                resp.read()
+        except urllib.error.HTTPError:
+            # Redirects and 204s still count as answered probes
+            pass
+        except Exception:
+            errors.append(1)
+            continue
+        latencies.append((time.monotonic() - start) * 1000)
+
+
+def run_phase(base_url, paths, clients, duration):
+    latencies, errors = [], []
+    deadline = time.monotonic() + duration
+    threads = [
+        threading.Thread(target=hammer, args=(base_url + paths[i % len(paths)], deadline, latencies, errors))
+        for i in range(clients)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return {
+        "requests": len(latencies),
+        "errors": len(errors),
+        "rps": round(len(latencies) / duration, 1),
+        "p50_ms": round(percentile(latencies, 50) or 0, 1),
+        "p95_ms": round(percentile(latencies, 95) or 0, 1),
+        "max_ms": round(max(latencies) if latencies else 0, 1)
+    }
+
+
+def start_connect(base_url, ssid, password):
+    body = json.dumps({"ssid": ssid, "password": password}).encode()
+    request = urllib.request.Request(
+        base_url + "/api/connect", data=body, headers={"Content-Type": "application/json"}
+    )
+
+    def worker():
+        start = time.monotonic()
+        try:
+            with urllib.request.urlopen(request, timeout=120) as resp:
+                resp.read()
+        except Exception:
+            pass
+        print(f"connect request finished after {time.monotonic() - start:.1f}s")
+
+    thread = threading.Thread(target=worker, daemon=True)
+    thread.start()
+    return thread
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", default="http://127.0.0.1")
+    parser.add_argument("--paths", default="/generate_204,/hotspot-detect.html,/ncsi.txt,/api/health")
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--ssid")
+    parser.add_argument("--password", default="")
+    args = parser.parse_args()
+
+    base_url = args.url.rstrip("/")
+    paths = [p.strip() for p in args.paths.split(",") if p.strip()]
+
+    print("baseline:", run_phase(base_url, paths, args.clients, args.duration))
+    if args.ssid:
+        start_connect(base_url, args.ssid, args.password)
+        time.sleep(0.5)
+        print("during connect:", run_phase(base_url, paths, args.clients, args.duration))
+
+
+if __name__ == "__main__":
+    main()
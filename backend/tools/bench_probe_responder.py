@@ -0,0 +1,84 @@
+"""
+Compare captive-probe throughput with and without the probe responder.
+
+Runs in-process against the WSGI callables, so it measures the request
+handling cost alone without sockets or a server in the way. The Flask
+side is a stub app with the same redirecting probe routes as app.py, so
+no portal services are started:
+
+    python3 tools/bench_probe_responder.py --requests 20000
+"""
+
+import argparse
+import os
+import sys
+import time
+from wsgiref.util import setup_testing_defaults
+
+from flask import Flask, redirect
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from probe_responder import PROBE_PATHS, CaptiveProbeResponder
+
+PROBES = [
+    ("connectivitycheck.gstatic.com", "/generate_204"),
+    ("captive.apple.com", "/hotspot-detect.html"),
+    ("www.msftncsi.com", "/ncsi.txt"),
+    ("www.msftconnecttest.com", "/connecttest.txt"),
+    ("detectportal.firefox.com", "/success.txt"),
+    ("detectportal.firefox.com", "/canonical.html")
+]
+
+
+def make_stub_app():
+    """Flask app answering every probe path with a redirect to the portal"""
+    app = Flask(__name__)
+    for path in PROBE_PATHS:
+        app.add_url_rule(path, path, lambda: redirect("/", code=302))
+    return app
+
+
+def make_environ(host, path):
+    environ = {"HTTP_HOST": host, "PATH_INFO": path, "REQUEST_METHOD": "GET"}
+    setup_testing_defaults(environ)
+    return environ
+
+
+def start_response(status, headers, exc_info=None):
+    return None
+
+
+def run(wsgi_app, count):
+    environs = [make_environ(host, path) for host, path in PROBES]
+    start = time.perf_counter()
+    for i in range(count):
+        environ = dict(environs[i % len(environs)])
+        result = wsgi_app(environ, start_response)
+        for _ in result:
+            pass
+        if hasattr(result, "close"):
+            result.close()
+    elapsed = time.perf_counter() - start
+    return {
+        "requests": count,
+        "seconds": round(elapsed, 3),
+        "rps": round(count / elapsed, 1),
+        "us_per_request": round(elapsed / count * 1e6, 1)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20000)
+    args = parser.parse_args()
+
+    flask_only = make_stub_app().wsgi_app
+    with_responder = CaptiveProbeResponder(flask_only)
+
+    print("flask routes:   ", run(flask_only, args.requests))
+    print("probe responder:", run(with_responder, args.requests))
+
+
+if __name__ == "__main__":
+    main()
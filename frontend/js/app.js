@@ -27,29 +27,31 @@ async function loadSystemMonitor() {
     let data = await res.json()
 
     if (data.ok && data.system) {
-      const sys = data.system
-      
-      // Update metrics
-      document.getElementById('cpuUsage').textContent = 
-        sys.cpu_usage ? `${sys.cpu_usage}%` : 'N/A'
-      
-      document.getElementById('memoryInfo').textContent = 
-        sys.memory || 'N/A'
-      
-      document.getElementById('diskInfo').textContent = 
-        sys.disk || 'N/A'
-      
-      document.getElementById('temperature').textContent = 
-        sys.temperature ? `${sys.temperature.toFixed(1)}°C` : 'N/A'
-      
-      document.getElementById('uptime').textContent = 
-        sys.uptime || 'N/A'
+      renderSystemMonitor(data.system)
     }
   } catch (e) {
     console.error('Failed to load system monitor:', e)
   }
 }
 
+function renderSystemMonitor(sys) {
+  // Update metrics
+  document.getElementById('cpuUsage').textContent = 
+    sys.cpu_usage ? `${sys.cpu_usage}%` : 'N/A'
+  
+  document.getElementById('memoryInfo').textContent = 
+    sys.memory || 'N/A'
+  
+  document.getElementById('diskInfo').textContent = 
+    sys.disk || 'N/A'
+  
+  document.getElementById('temperature').textContent = 
+    sys.temperature ? `${sys.temperature.toFixed(1)}°C` : 'N/A'
+  
+  document.getElementById('uptime').textContent = 
+    sys.uptime || 'N/A'
+}
+
 // System Tab - AP Management
 async function loadAPInfo() {
   try {
@@ -172,31 +174,10 @@ async function loadFanStatus() {
     let res = await fetch('/api/fan/status')
     let data = await res.json()
 
-    const statusEl = document.getElementById('fanStatus')
-    
     if (data.ok && data.fan) {
-      const fan = data.fan
-      const statusIcon = fan.running ? '🌀' : '⏸'
-      const statusColor = fan.running ? '#00bd8f' : '#a0a6b0'
-      
-      statusEl.innerHTML = `
-        <span style="color: ${statusColor}">
-          ${statusIcon} <strong>Status:</strong> ${fan.speed_label} 
-          ${fan.auto_mode ? '(Auto Mode)' : '(Manual)'}
-        </span>
-      `
-      
-      // Update speed button active states
-      document.querySelectorAll('.speed-btn').forEach(btn => {
-        const speed = parseInt(btn.dataset.speed)
-        if (speed === fan.speed) {
-          btn.classList.add('active')
-        } else {
-          btn.classList.remove('active')
-        }
-      })
+      renderFanStatus(data.fan)
     } else {
-      statusEl.innerHTML = 'Failed to load fan status'
+      document.getElementById('fanStatus').innerHTML = 'Failed to load fan status'
     }
   } catch (e) {
     console.error('Failed to load fan status:', e)
@@ -204,6 +185,34 @@ async function loadFanStatus() {
   }
 }
 
+function renderFanStatus(fan) {
+  const statusEl = document.getElementById('fanStatus')
+  const statusIcon = fan.running ? '🌀' : '⏸'
+  const statusColor = fan.running ? '#00bd8f' : '#a0a6b0'
+  
+  statusEl.innerHTML = `
+    <span style="color: ${statusColor}">
+      ${statusIcon} <strong>Status:</strong> ${fan.speed_label} 
+      ${fan.auto_mode ? '(Auto Mode)' : '(Manual)'}
+    </span>
+    ${fan.rpm != null ? `<br><span style="color: ${fan.health === 'stalled' || fan.health === 'degraded' ? '#ff6b6b' : '#a0a6b0'}">
+      ${fan.rpm} RPM (${fan.health})
+    </span>` : ''}
+  `
+  
+  // Update speed button active states
+  document.querySelectorAll('.speed-btn').forEach(btn => {
+    const active = btn.dataset.speed === 'auto'
+      ? fan.auto_mode
+      : !fan.auto_mode && parseInt(btn.dataset.speed) === fan.speed
+    if (active) {
+      btn.classList.add('active')
+    } else {
+      btn.classList.remove('active')
+    }
+  })
+}
+
 async function toggleFan() {
   const btn = document.getElementById('fanToggleBtn')
   const successEl = document.getElementById('fanSuccess')
@@ -292,72 +301,121 @@ async function setFanSpeed(speed) {
   }
 }
 
+async function setFanAuto() {
+  const successEl = document.getElementById('fanSuccess')
+  const errorEl = document.getElementById('fanError')
+  
+  // Clear messages
+  successEl.innerText = ''
+  errorEl.innerText = ''
+  errorEl.style.animation = 'none'
+  successEl.style.animation = 'none'
+  void errorEl.offsetWidth
+  void successEl.offsetWidth
+  
+  try {
+    let res = await fetch('/api/fan/auto', {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ enabled: true }),
+    })
+    
+    let data = await res.json()
+    
+    if (data.ok) {
+      successEl.innerHTML = `✓ ${data.fan.message}`
+      successEl.style.animation = 'fadeIn 0.5s forwards'
+      await loadFanStatus()
+      
+      setTimeout(() => {
+        successEl.style.animation = 'fadeOut 0.5s forwards'
+      }, 2000)
+    } else {
+      errorEl.innerHTML = data.error || 'Failed to enable auto mode'
+      errorEl.className = 'err'
+      errorEl.style.animation = 'fadeIn 0.5s forwards'
+    }
+  } catch (e) {
+    errorEl.innerHTML = 'Error enabling auto mode'
+    errorEl.className = 'err'
+    errorEl.style.animation = 'fadeIn 0.5s forwards'
+  }
+}
+
 // WiFi Tab - Connection Management
 async function loadCurrentConnection() {
   try {
     let res = await fetch('/api/current-connection')
     let data = await res.json()
 
-    const container = document.getElementById('currentConnection')
-
-    if (data.ok && data.connected) {
-      const signalIcon = createSignalIcon(data.signal)
-      container.innerHTML = `
-        <div class="current-connection">
-          <div class="current-connection-info">
-            <div class="current-connection-icon">✓</div>
-            <div class="current-connection-text">
-              <div class="current-connection-ssid">${data.ssid}</div>
-              <div class="current-connection-status">Connected</div>
-            </div>
-          </div>
-          <div style="display: flex; align-items: center; gap: 6px;">
-            ${signalIcon}
-            <button class="disconnect-btn" onclick="showDisconnectModal()" title="Disconnect">
-              <svg width="14" height="14" viewBox="0 0 24 24" fill="none" xmlns="http://www.w3.org/2000/svg">
-                <path d="M19 13H5v-2h14v2z" fill="currentColor"/>
-              </svg>
-            </button>
-          </div>
-        </div>
-      `
-      container.style.display = 'block'
-    } else {
-      container.style.display = 'none'
-    }
+    renderCurrentConnection(data)
   } catch (e) {
     console.error('Failed to load current connection:', e)
   }
 }
 
+function renderCurrentConnection(data) {
+  const container = document.getElementById('currentConnection')
+
+  if (data.ok && data.connected) {
+    const signalIcon = createSignalIcon(data.signal)
+    container.innerHTML = `
+      <div class="current-connection">
+        <div class="current-connection-info">
+          <div class="current-connection-icon">✓</div>
+          <div class="current-connection-text">
+            <div class="current-connection-ssid">${data.ssid}</div>
+            <div class="current-connection-status">Connected</div>
+          </div>
+        </div>
+        <div style="display: flex; align-items: center; gap: 6px;">
+          ${signalIcon}
+          <button class="disconnect-btn" onclick="showDisconnectModal()" title="Disconnect">
+            <svg width="14" height="14" viewBox="0 0 24 24" fill="none" xmlns="http://www.w3.org/2000/svg">
+              <path d="M19 13H5v-2h14v2z" fill="currentColor"/>
+            </svg>
+          </button>
+        </div>
+      </div>
+    `
+    container.style.display = 'block'
+  } else {
+    container.style.display = 'none'
+  }
+}
+
 async function loadSavedNetworks() {
   try {
     let res = await fetch('/api/saved-networks')
     let data = await res.json()
 
-    const section = document.getElementById('savedNetworksSection')
-    const list = document.getElementById('savedNetworksList')
-
-    if (data.ok && data.networks && data.networks.length > 0) {
-      list.innerHTML = data.networks
-        .map(
-          (net) => `
-        <div class="saved-network">
-          <div class="saved-network-name">${net.ssid}</div>
-          <button class="forget-btn" onclick="forgetNetwork('${net.ssid.replace(/'/g, "\\'")}')">Forget</button>
-        </div>
-      `
-        )
-        .join('')
-      section.style.display = 'block'
-    } else {
-      section.style.display = 'none'
-    }
+    renderSavedNetworks(data)
   } catch (e) {
     console.error('Failed to load saved networks:', e)
   }
 }
 
+function renderSavedNetworks(data) {
+  const section = document.getElementById('savedNetworksSection')
+  const list = document.getElementById('savedNetworksList')
+
+  if (data.ok && data.networks && data.networks.length > 0) {
+    list.innerHTML = data.networks
+      .map(
+        (net) => `
+      <div class="saved-network">
+        <div class="saved-network-name">${net.ssid}</div>
+        <button class="forget-btn" onclick="forgetNetwork('${net.ssid.replace(/'/g, "\\'")}')">Forget</button>
+      </div>
+    `
+      )
+      .join('')
+    section.style.display = 'block'
+  } else {
+    section.style.display = 'none'
+  }
+}
+
 async function forgetNetwork(ssid) {
   if (!confirm(`Forget network "${ssid}"?`)) return
 
@@ -490,6 +548,7 @@ async function scan() {
   const ssidList = document.getElementById('ssidList')
   const scanningOverlay = document.getElementById('scanningOverlay')
 
+  scanInProgress = true
   scanBtn.disabled = true
   scanBtn.classList.add('loading')
   ssidList.classList.add('scanning')
@@ -501,25 +560,7 @@ async function scan() {
     let res = await fetch('/api/scan')
     let data = await res.json()
 
-    // Remove duplicate networks before storing
-    currentNetworks = removeDuplicateNetworks(data.networks || [])
-
-    let list = ''
-    if (currentNetworks.length > 0) {
-      for (let n of currentNetworks) {
-        const signalIcon = createSignalIcon(n.signal)
-        list += `
-          <div class="ssid" onclick="selectSSID('${n.ssid.replace(/'/g, "\\'")}')">
-            <div class="ssid-info">
-              <b>${n.ssid}</b>
-            </div>
-            ${signalIcon}
-          </div>`
-      }
-      ssidList.innerHTML = list
-    } else {
-      ssidList.innerHTML = '<div class="empty-state">No networks found. Try again.</div>'
-    }
+    renderNetworkList(data.networks || [])
   } catch (e) {
     console.error('Scan error:', e)
     ssidList.innerHTML = '<div class="empty-state">Unable to scan Wi-Fi networks</div>'
@@ -528,11 +569,78 @@ async function scan() {
     scanBtn.classList.remove('loading')
     ssidList.classList.remove('scanning')
     scanningOverlay.classList.remove('active')
+    scanInProgress = false
 
-    // Refresh connection status after scan
+    // The event stream keeps these current; poll only without it
+    if (!liveUpdates) {
+      loadCurrentConnection()
+      loadSavedNetworks()
+    }
+  }
+}
+
+function renderNetworkList(networks) {
+  const ssidList = document.getElementById('ssidList')
+
+  // Remove duplicate networks before storing
+  currentNetworks = removeDuplicateNetworks(networks)
+
+  let list = ''
+  if (currentNetworks.length > 0) {
+    for (let n of currentNetworks) {
+      const signalIcon = createSignalIcon(n.signal)
+      list += `
+        <div class="ssid" onclick="selectSSID('${n.ssid.replace(/'/g, "\\'")}')">
+          <div class="ssid-info">
+            <b>${n.ssid}</b>
+          </div>
+          ${signalIcon}
+        </div>`
+    }
+    ssidList.innerHTML = list
+  } else {
+    ssidList.innerHTML = '<div class="empty-state">No networks found. Try again.</div>'
+  }
+}
+
+// Live updates: one EventSource replaces per-widget polling. Each event
+// carries only the keys that changed, merged into liveState per topic.
+const liveState = { system: {}, fan: {}, connection: {}, saved: {}, scan: {} }
+let scanInProgress = false
+let liveUpdates = false
+
+function startEventStream() {
+  if (!window.EventSource) return false
+
+  const source = new EventSource('/api/events')
+  const handlers = {
+    system: (state) => renderSystemMonitor(state),
+    fan: (state) => renderFanStatus(state),
+    connection: (state) => renderCurrentConnection(state),
+    saved: (state) => renderSavedNetworks(state),
+    scan: (state) => {
+      if (scanInProgress || !state.networks) return
+      const current = liveState.connection.connected ? liveState.connection.ssid : null
+      renderNetworkList(state.networks.filter((n) => n.ssid !== current))
+    },
+  }
+
+  Object.keys(handlers).forEach((topic) => {
+    source.addEventListener(topic, (event) => {
+      Object.assign(liveState[topic], JSON.parse(event.data))
+      handlers[topic](liveState[topic])
+    })
+  })
+
+  // The server refuses the stream (503) when too many are open; the
+  // browser then closes it for good, so go back to fetch-based loading
+  source.onerror = () => {
+    if (source.readyState !== EventSource.CLOSED || !liveUpdates) return
+    liveUpdates = false
     loadCurrentConnection()
     loadSavedNetworks()
   }
+  return true
 }
 
 function selectSSID(ssid) {
@@ -555,6 +663,31 @@ function togglePassword() {
   }
 }
 
+const CONNECT_PHASE_LABELS = {
+  queued: 'Waiting...',
+  managed: 'Preparing interface...',
+  associating: 'Connecting...',
+  dhcp: 'Getting IP address...',
+  verified: 'Connected',
+}
+
+// Poll a background job until it finishes; resolves to { ok, error }
+async function waitForJob(jobId, labelEl) {
+  while (true) {
+    await new Promise((resolve) => setTimeout(resolve, 1000))
+
+    let res = await fetch(`/api/jobs/${jobId}`)
+    let data = await res.json()
+    if (!data.ok) return { ok: false, error: data.error }
+
+    const job = data.job
+    if (labelEl) labelEl.textContent = CONNECT_PHASE_LABELS[job.phase] || 'Connecting...'
+
+    if (job.status === 'succeeded') return { ok: true }
+    if (job.status === 'failed') return { ok: false, error: job.error }
+  }
+}
+
 // WiFi connection
 async function connect() {
   clearMessages()
@@ -592,6 +725,7 @@ async function connect() {
   connectionError.style.display = 'none'
   connectionError.style.animation = ''
   connectingSsid.textContent = ssid
+  connectingStatus.querySelector('.connecting-label').textContent = 'Connecting...'
   connectingStatus.style.display = 'flex'
 
   try {
@@ -603,7 +737,11 @@ async function connect() {
 
     let data = await res.json()
 
-    if (res.status === 200 && data.ok) {
+    if (res.status === 202 && data.ok) {
+      data = await waitForJob(data.job_id, connectingStatus.querySelector('.connecting-label'))
+    }
+
+    if (data.ok) {
       window.location.href = '/success.html'
     } else {
       const errorMsg = data.error || 'Unable to join this network. Please try again.'
@@ -654,8 +792,11 @@ document.addEventListener('DOMContentLoaded', function () {
   document.getElementById('changeAPPasswordBtn').onclick = changeAPPassword
 
   // Load initial data
-  loadCurrentConnection()
-  loadSavedNetworks()
+  liveUpdates = startEventStream()
+  if (!liveUpdates) {
+    loadCurrentConnection()
+    loadSavedNetworks()
+  }
   scan()
 
   document.getElementById('pwdInput').addEventListener('keypress', function (e) {